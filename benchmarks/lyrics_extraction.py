@@ -0,0 +1,73 @@
+import os
+import sys
+import time
+import argparse
+import tracemalloc
+
+from bs4 import BeautifulSoup
+from services.lyrics_extraction import LYRICS_CONTAINER, extract_lyrics, trim_header
+
+
+def extract_lyrics_soup(html: str) -> str | None:
+    """The previous full BeautifulSoup extraction, the baseline of the benchmark."""
+    soup = BeautifulSoup(html, 'lxml')
+    lyrics_div = soup.find_all('div', attrs={"class": LYRICS_CONTAINER})
+    if not lyrics_div:
+        return None
+
+    full_text = "\n".join(div.get_text(separator="\n").strip() for div in lyrics_div)
+    return trim_header(full_text)
+
+
+def measure(func, html) -> tuple[float, int, str | None]:
+    tracemalloc.start()
+    started_at = time.perf_counter()
+    result = func(html)
+    elapsed = time.perf_counter() - started_at
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def benchmark(paths: list[str], repeat: int):
+    """Compare parse time per page and peak memory of both extractions on saved pages."""
+    print(f"{'page':40} {'soup ms':>9} {'soup KiB':>9} {'lxml ms':>9} {'lxml KiB':>9} same")
+    totals = {"soup": [0.0, 0], "lxml": [0.0, 0]}
+
+    for path in paths:
+        with open(path, "rb") as file:
+            html = file.read()
+
+        row = {}
+        for name, func, data in (("soup", extract_lyrics_soup, html.decode("utf-8")), ("lxml", extract_lyrics, html)):
+            runs = [measure(func, data) for _ in range(repeat)]
+            elapsed = min(run[0] for run in runs)
+            peak = max(run[1] for run in runs)
+            row[name] = (elapsed, peak, runs[0][2])
+            totals[name][0] += elapsed
+            totals[name][1] = max(totals[name][1], peak)
+
+        same = row["soup"][2] == row["lxml"][2]
+        print(f"{os.path.basename(path)[:40]:40} {row['soup'][0] * 1000:9.2f} {row['soup'][1] / 1024:9.0f} "
+              f"{row['lxml'][0] * 1000:9.2f} {row['lxml'][1] / 1024:9.0f} {'yes' if same else 'NO'}")
+
+    pages = len(paths) or 1
+    print(f"{'mean ms / max KiB':40} {totals['soup'][0] * 1000 / pages:9.2f} {totals['soup'][1] / 1024:9.0f} "
+          f"{totals['lxml'][0] * 1000 / pages:9.2f} {totals['lxml'][1] / 1024:9.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Genius lyrics extraction on saved song pages")
+    parser.add_argument("source", nargs="?", default=os.path.join("tests", "fixtures", "genius"),
+                        help="directory of saved Genius song pages (.html)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    paths = sorted(os.path.join(args.source, name) for name in os.listdir(args.source) if name.endswith(".html"))
+    if not paths:
+        sys.exit(f"No .html pages in {args.source}")
+    benchmark(paths, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import time
+import asyncio
+
+from collections import OrderedDict
+from typing import Awaitable, Callable
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from core.logger import logger
+from core.single_flight import SingleFlight
+
+
+class Uncached(str):
+    """A loader result handed to the callers but not stored, like a payload that is still incomplete."""
+
+
+class LocalCache:
+    """In-process LRU cache where every entry also expires after ttl seconds."""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data: OrderedDict[str, tuple[float, object]] = OrderedDict()
+
+    def get(self, key: str):
+        item = self._data.get(key)
+        if item is None:
+            return None
+
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: str, value):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def delete(self, key: str):
+        self._data.pop(key, None)
+
+
+class LayeredCache:
+    """
+    Read-through cache of serialized payloads: a LocalCache in front of Redis.
+
+    Redis keeps each entry for ttl + stale_ttl seconds as "<fresh_until>|<payload>".
+    A fresh entry is served as is. A stale one is served too, while a single
+    background refresh revalidates it. Misses are loaded once per key no matter
+    how many requests are waiting on it.
+    """
+
+    def __init__(self, redis_client: Redis, namespace: str, ttl: int, stale_ttl: int,
+                 local: LocalCache):
+        self.redis_client = redis_client
+        self.namespace = namespace
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.local = local
+        self._single_flight = SingleFlight()
+        self._refreshes: set[asyncio.Task] = set()
+
+    def _redis_key(self, key: str) -> str:
+        return f"cache:{self.namespace}:{key}"
+
+    async def _get_entry(self, key: str) -> tuple[float, str] | None:
+        entry = self.local.get(key)
+        if entry is not None:
+            return entry
+
+        try:
+            raw = await self.redis_client.get(self._redis_key(key))
+        except RedisError as e:
+            logger.warning(f"Cache read failed for {key}: {e}")
+            return None
+
+        if not isinstance(raw, str):
+            return None
+
+        fresh_until, sep, payload = raw.partition("|")
+        if not sep:
+            return None
+        try:
+            entry = (float(fresh_until), payload)
+        except ValueError:
+            return None
+
+        self.local.set(key, entry)
+        return entry
+
+    async def set(self, key: str, payload: str):
+        fresh_until = time.time() + self.ttl
+        self.local.set(key, (fresh_until, payload))
+        try:
+            await self.redis_client.setex(self._redis_key(key), self.ttl + self.stale_ttl,
+                                          f"{fresh_until}|{payload}")
+        except RedisError as e:
+            logger.warning(f"Cache write failed for {key}: {e}")
+
+    async def invalidate(self, *keys: str):
+        for key in keys:
+            self.local.delete(key)
+        if not keys:
+            return
+        try:
+            await self.redis_client.delete(*(self._redis_key(key) for key in keys))
+        except RedisError as e:
+            # Called after the database write committed, the entry just lives until its TTL
+            logger.warning(f"Cache invalidation failed for {', '.join(keys)}: {e}")
+
+    async def _load(self, key: str, loader: Callable[[], Awaitable[str | None]]) -> str | None:
+        payload = await loader()
+        if payload is not None and not isinstance(payload, Uncached):
+            await self.set(key, payload)
+        return payload
+
+    def _revalidate(self, key: str, refresher: Callable[[], Awaitable[str | None]]):
+        if self._single_flight.in_flight(key):
+            return
+
+        async def refresh():
+            try:
+                await self._single_flight.do(key, lambda: self._load(key, refresher))
+            except Exception as e:
+                logger.exception(f"Background refresh failed for {key}: {e}")
+
+        task = asyncio.create_task(refresh())
+        self._refreshes.add(task)
+        task.add_done_callback(self._refreshes.discard)
+
+    async def get_or_load(self, key: str, loader: Callable[[], Awaitable[str | None]],
+                          refresher: Callable[[], Awaitable[str | None]] | None = None) -> str | None:
+        entry = await self._get_entry(key)
+
+        if entry is not None:
+            fresh_until, payload = entry
+            if fresh_until < time.time():
+                self._revalidate(key, refresher or loader)
+            return payload
+
+        return await self._single_flight.do(key, lambda: self._load(key, loader))
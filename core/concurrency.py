@@ -0,0 +1,28 @@
+import asyncio
+
+from typing import Any, Awaitable
+
+
+def _first_leaf(error: BaseException) -> BaseException:
+    while isinstance(error, BaseExceptionGroup):
+        error = error.exceptions[0]
+    return error
+
+
+async def gather_branches(*branches: Awaitable) -> list[Any]:
+    """
+    Run independent branches concurrently inside one task group.
+
+    Timeouts belong to the branches themselves, around each upstream call, so
+    a chain of calls or a throttle wait isn't cut short by a single budget.
+    The policy is fail-fast: the first failing branch cancels its siblings and
+    its exception is re-raised as is, so callers keep seeing HTTPException and
+    friends instead of an ExceptionGroup.
+    """
+    try:
+        async with asyncio.TaskGroup() as tg:
+            tasks = [tg.create_task(branch) for branch in branches]
+    except BaseExceptionGroup as eg:
+        raise _first_leaf(eg)
+
+    return [task.result() for task in tasks]
@@ -17,8 +17,107 @@ REDIS_PORT = os.environ.get("REDIS_PORT")
 SECRET = os.environ.get("SECRET")
 
 GENIUS_ACCESS = os.environ.get("GENIUS_ACCESS")
-SPOTIFY_ACCESS = os.environ.get("SPOTIFY_ACCESS")
 SPOTIFY_ID = os.environ.get("SPOTIFY_ID")
 SPOTIFY_SECRET = os.environ.get("SPOTIFY_SECRET")
+# Optional user refresh token, the client credentials grant is used without it
+SPOTIFY_REFRESH = os.environ.get("SPOTIFY_REFRESH")
+# Seconds before its expiry the shared access token is replaced
+SPOTIFY_TOKEN_REFRESH_MARGIN = float(os.environ.get("SPOTIFY_TOKEN_REFRESH_MARGIN", 300))
 
 OPENAI_API_TOKEN = os.environ.get("OPENAI_API_TOKEN")
+
+HTTP_POOL_LIMIT = int(os.environ.get("HTTP_POOL_LIMIT", 100))
+HTTP_POOL_LIMIT_PER_HOST = int(os.environ.get("HTTP_POOL_LIMIT_PER_HOST", 20))
+HTTP_KEEPALIVE_TIMEOUT = float(os.environ.get("HTTP_KEEPALIVE_TIMEOUT", 30))
+HTTP_DNS_CACHE_TTL = int(os.environ.get("HTTP_DNS_CACHE_TTL", 300))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("HTTP_CONNECT_TIMEOUT", 5))
+HTTP_TOTAL_TIMEOUT = float(os.environ.get("HTTP_TOTAL_TIMEOUT", 20))
+
+# Upstream response cache: redis, disk or none
+HTTP_CACHE_BACKEND = os.environ.get("HTTP_CACHE_BACKEND", "redis").lower()
+HTTP_CACHE_DIR = os.environ.get("HTTP_CACHE_DIR", ".http_cache")
+# How long a stale response is kept around to be revalidated
+HTTP_CACHE_RETENTION = int(os.environ.get("HTTP_CACHE_RETENTION", 7 * 86400))
+HTTP_CACHE_TTL_GENIUS_ARTIST = int(os.environ.get("HTTP_CACHE_TTL_GENIUS_ARTIST", 86400))
+HTTP_CACHE_TTL_SPOTIFY_ARTIST = int(os.environ.get("HTTP_CACHE_TTL_SPOTIFY_ARTIST", 6 * 3600))
+HTTP_CACHE_TTL_SPOTIFY_TOP_TRACKS = int(os.environ.get("HTTP_CACHE_TTL_SPOTIFY_TOP_TRACKS", 6 * 3600))
+HTTP_CACHE_TTL_TUNEBAT = int(os.environ.get("HTTP_CACHE_TTL_TUNEBAT", 30 * 86400))
+
+UPSTREAM_TIMEOUT = float(os.environ.get("UPSTREAM_TIMEOUT", 10))
+
+SCRAPER_MAX_WORKERS = int(os.environ.get("SCRAPER_MAX_WORKERS", 4))
+TUNEBAT_MIN_DELAY = float(os.environ.get("TUNEBAT_MIN_DELAY", 1))
+TUNEBAT_MAX_DELAY = float(os.environ.get("TUNEBAT_MAX_DELAY", 2))
+
+OPENAI_BASE_URL = os.environ.get("OPENAI_BASE_URL")
+OPENAI_MAX_CONCURRENCY = int(os.environ.get("OPENAI_MAX_CONCURRENCY", 100))
+OPENAI_MAX_CONNECTIONS = int(os.environ.get("OPENAI_MAX_CONNECTIONS", 100))
+OPENAI_TIMEOUT = float(os.environ.get("OPENAI_TIMEOUT", 60))
+
+REDIS_MAX_CONNECTIONS = int(os.environ.get("REDIS_MAX_CONNECTIONS", 50))
+REDIS_HEALTH_CHECK_INTERVAL = int(os.environ.get("REDIS_HEALTH_CHECK_INTERVAL", 30))
+
+ARTIST_CACHE_TTL = int(os.environ.get("ARTIST_CACHE_TTL", 3600))
+ARTIST_CACHE_STALE_TTL = int(os.environ.get("ARTIST_CACHE_STALE_TTL", 86400))
+LOCAL_CACHE_TTL = float(os.environ.get("LOCAL_CACHE_TTL", 10))
+LOCAL_CACHE_MAX_SIZE = int(os.environ.get("LOCAL_CACHE_MAX_SIZE", 1024))
+
+COALESCE_LOCK_TIMEOUT = float(os.environ.get("COALESCE_LOCK_TIMEOUT", 30))
+COALESCE_WAIT_TIMEOUT = float(os.environ.get("COALESCE_WAIT_TIMEOUT", 30))
+
+IMPORT_CONCURRENCY = int(os.environ.get("IMPORT_CONCURRENCY", 8))
+IMPORT_BATCH_SIZE = int(os.environ.get("IMPORT_BATCH_SIZE", 50))
+GENIUS_RATE_LIMIT = float(os.environ.get("GENIUS_RATE_LIMIT", 5))
+SPOTIFY_RATE_LIMIT = float(os.environ.get("SPOTIFY_RATE_LIMIT", 5))
+
+TRACK_CACHE_TTL = int(os.environ.get("TRACK_CACHE_TTL", 3600))
+TRACK_CACHE_STALE_TTL = int(os.environ.get("TRACK_CACHE_STALE_TTL", 86400))
+
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 20))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "true").lower() == "true"
+# asyncpg's own statement cache, set to 0 behind pgbouncer in transaction mode
+DB_STATEMENT_CACHE_SIZE = int(os.environ.get("DB_STATEMENT_CACHE_SIZE", 100))
+DB_PREPARED_STATEMENT_CACHE_SIZE = int(os.environ.get("DB_PREPARED_STATEMENT_CACHE_SIZE", 500))
+# Comma separated host:port list, the replicas use the primary's credentials and database
+DB_REPLICA_HOSTS = [host.strip() for host in os.environ.get("DB_REPLICA_HOSTS", "").split(",") if host.strip()]
+
+TOP_WORDS_COUNT = int(os.environ.get("TOP_WORDS_COUNT", 20))
+
+# Weights of the artist similarity graph, each signal is scaled to 0..1
+SIMILARITY_GENRE_WEIGHT = float(os.environ.get("SIMILARITY_GENRE_WEIGHT", 0.5))
+SIMILARITY_LIKES_WEIGHT = float(os.environ.get("SIMILARITY_LIKES_WEIGHT", 0.3))
+SIMILARITY_COLLABORATION_WEIGHT = float(os.environ.get("SIMILARITY_COLLABORATION_WEIGHT", 0.2))
+SIMILARITY_TOP_K = int(os.environ.get("SIMILARITY_TOP_K", 100))
+
+ENRICHMENT_QUEUE_ENABLED = os.environ.get("ENRICHMENT_QUEUE_ENABLED", "true").lower() == "true"
+# How long a track request waits for its enrichment job, 0 answers "pending" right away
+ENRICHMENT_WAIT_TIMEOUT = float(os.environ.get("ENRICHMENT_WAIT_TIMEOUT", 3))
+ENRICHMENT_CONCURRENCY = int(os.environ.get("ENRICHMENT_CONCURRENCY", 4))
+ENRICHMENT_MAX_ATTEMPTS = int(os.environ.get("ENRICHMENT_MAX_ATTEMPTS", 5))
+ENRICHMENT_RETRY_BASE_DELAY = float(os.environ.get("ENRICHMENT_RETRY_BASE_DELAY", 30))
+ENRICHMENT_RETRY_MAX_DELAY = float(os.environ.get("ENRICHMENT_RETRY_MAX_DELAY", 3600))
+ENRICHMENT_JOB_TIMEOUT = float(os.environ.get("ENRICHMENT_JOB_TIMEOUT", 90))
+# Outlasts the job timeout, so a slow job is failed by its own worker before another one takes it
+ENRICHMENT_LEASE_TIMEOUT = float(os.environ.get("ENRICHMENT_LEASE_TIMEOUT", 120))
+# Processes the worker parses Genius pages in. The default 0 parses them on the event loop as they
+# stream and stops the download at the end of the lyrics, a pool has to download whole pages first
+ENRICHMENT_PARSE_PROCESSES = int(os.environ.get("ENRICHMENT_PARSE_PROCESSES", 0))
+
+# Background refresh of stored artists, `python -m services.refresh`
+REFRESH_INTERVAL = float(os.environ.get("REFRESH_INTERVAL", 600))
+# An artist isn't refreshed again until this many seconds after its parse_date
+REFRESH_MIN_AGE = float(os.environ.get("REFRESH_MIN_AGE", 86400))
+# Upstream requests one run may spend, an artist costs 1 Genius and 2 or 3 Spotify requests
+REFRESH_GENIUS_BUDGET = int(os.environ.get("REFRESH_GENIUS_BUDGET", 200))
+REFRESH_SPOTIFY_BUDGET = int(os.environ.get("REFRESH_SPOTIFY_BUDGET", 500))
+REFRESH_CONCURRENCY = int(os.environ.get("REFRESH_CONCURRENCY", 4))
+REFRESH_CANDIDATES = int(os.environ.get("REFRESH_CANDIDATES", 1000))
+REFRESH_REQUESTS_HALF_LIFE = float(os.environ.get("REFRESH_REQUESTS_HALF_LIFE", 86400))
+# Artist requests are counted in-process and added to the shared counts this often
+REFRESH_REQUESTS_FLUSH_INTERVAL = float(os.environ.get("REFRESH_REQUESTS_FLUSH_INTERVAL", 10))
+
+# Share of the typed trigrams a misspelt name must contain to be suggested
+AUTOCOMPLETE_MIN_SIMILARITY = float(os.environ.get("AUTOCOMPLETE_MIN_SIMILARITY", 0.5))
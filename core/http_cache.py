@@ -0,0 +1,241 @@
+import os
+import json
+import time
+import zlib
+import base64
+import asyncio
+import hashlib
+import aiohttp
+
+from dataclasses import dataclass, asdict, replace
+from typing import Awaitable, Callable, Mapping
+from urllib.parse import urlsplit, parse_qsl, urlencode
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from core import config
+from core.logger import logger
+
+
+# Credentials don't change the response, they stay out of the cache key
+IGNORED_PARAMS = {"access_token"}
+
+
+@dataclass
+class UpstreamResponse:
+    status: int
+    body: str
+    etag: str | None = None
+    last_modified: str | None = None
+    cache_control: str | None = None
+    fresh_until: float = 0.0
+
+    @classmethod
+    def from_headers(cls, status: int, headers: Mapping[str, str], body: str) -> "UpstreamResponse":
+        return cls(status=status, body=body, etag=headers.get("ETag"),
+                   last_modified=headers.get("Last-Modified"), cache_control=headers.get("Cache-Control"))
+
+    def json(self):
+        return json.loads(self.body)
+
+    def validators(self) -> dict[str, str]:
+        """Conditional request headers, empty if the response can't be revalidated."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+    def dumps(self) -> str:
+        return base64.b64encode(zlib.compress(json.dumps(asdict(self)).encode())).decode()
+
+    @classmethod
+    def loads(cls, raw: str) -> "UpstreamResponse":
+        return cls(**json.loads(zlib.decompress(base64.b64decode(raw))))
+
+
+Fetch = Callable[[dict[str, str]], Awaitable[UpstreamResponse]]
+
+
+async def fetch_response(session: aiohttp.ClientSession, url: str, params: dict | None = None,
+                         headers: dict | None = None) -> UpstreamResponse:
+    async with session.get(url=url, params=params, headers=headers) as response:
+        body = await response.text()
+        return UpstreamResponse.from_headers(response.status, response.headers, body)
+
+
+async def cached_get(http_cache: "HttpCache | None", session: aiohttp.ClientSession, endpoint: str, url: str,
+                     params: dict | None = None, headers: dict | None = None) -> UpstreamResponse:
+    """GET through the cache when there is one."""
+    async def fetch(validators: dict[str, str]) -> UpstreamResponse:
+        return await fetch_response(session, url, params=params, headers={**(headers or {}), **validators})
+
+    if http_cache is None:
+        return await fetch({})
+    return await http_cache.get(endpoint, url, params, fetch)
+
+
+def cache_key(url: str, params: dict | None = None) -> str:
+    """The URL with a lower-cased host and its query, params included, sorted."""
+    parts = urlsplit(url)
+    query = parse_qsl(parts.query) + [(name, str(value)) for name, value in (params or {}).items()]
+    query = sorted((name, value) for name, value in query if name not in IGNORED_PARAMS)
+    return f"{parts.netloc.lower()}{parts.path}?{urlencode(query)}"
+
+
+def max_age(cache_control: str | None) -> float | None:
+    """Freshness the upstream allows, 0 for no-cache, None when it doesn't say."""
+    for directive in (cache_control or "").lower().split(","):
+        name, _, value = directive.strip().partition("=")
+        if name == "no-cache":
+            return 0
+        if name == "max-age" and value.isdigit():
+            return int(value)
+    return None
+
+
+class RedisResponseStore:
+    def __init__(self, redis_client: Redis, namespace: str = "http"):
+        self.redis_client = redis_client
+        self.namespace = namespace
+
+    async def get(self, key: str) -> str | None:
+        try:
+            return await self.redis_client.get(f"{self.namespace}:{key}")
+        except RedisError as e:
+            logger.warning(f"[http_cache] read failed for {key}: {e}")
+            return None
+
+    async def set(self, key: str, raw: str, ttl: float):
+        try:
+            await self.redis_client.setex(f"{self.namespace}:{key}", int(ttl), raw)
+        except RedisError as e:
+            logger.warning(f"[http_cache] write failed for {key}: {e}")
+
+
+class DiskResponseStore:
+    """One file per response, for single-host setups and CLIs without Redis."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha256(key.encode()).hexdigest())
+
+    def _read(self, key: str) -> str | None:
+        try:
+            with open(self._path(key), encoding="utf-8") as file:
+                expires_at, _, raw = file.read().partition("|")
+        except FileNotFoundError:
+            return None
+        if float(expires_at) < time.time():
+            os.remove(self._path(key))
+            return None
+        return raw
+
+    def _write(self, key: str, raw: str, ttl: float):
+        path = self._path(key)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as file:
+            file.write(f"{time.time() + ttl}|{raw}")
+        os.replace(f"{path}.tmp", path)
+
+    async def get(self, key: str) -> str | None:
+        try:
+            return await asyncio.to_thread(self._read, key)
+        except (OSError, ValueError) as e:
+            logger.warning(f"[http_cache] read failed for {key}: {e}")
+            return None
+
+    async def set(self, key: str, raw: str, ttl: float):
+        try:
+            await asyncio.to_thread(self._write, key, raw, ttl)
+        except OSError as e:
+            logger.warning(f"[http_cache] write failed for {key}: {e}")
+
+
+class HttpCache:
+    """
+    Response cache under the upstream clients, one TTL policy per endpoint.
+
+    A response is served without a request while it is fresh: for the
+    endpoint's TTL, or less if its Cache-Control says so. Once stale it is kept
+    for `retention` more seconds to be revalidated with If-None-Match /
+    If-Modified-Since, so an unchanged resource costs a 304 instead of the full
+    payload. A stale response is also served when the upstream errors.
+    Only 200 responses are stored, and nothing marked no-store.
+    """
+
+    def __init__(self, store: RedisResponseStore | DiskResponseStore, ttls: dict[str, float], retention: float):
+        self.store = store
+        self.ttls = ttls
+        self.retention = retention
+        self.stats = {"fresh": 0, "revalidated": 0, "fetched": 0, "stale": 0}
+
+    async def _save(self, key: str, response: UpstreamResponse, ttl: float) -> UpstreamResponse:
+        upstream_max_age = max_age(response.cache_control)
+        if upstream_max_age is not None:
+            ttl = min(ttl, upstream_max_age)
+        response = replace(response, fresh_until=time.time() + ttl)
+        if "no-store" not in (response.cache_control or "").lower():
+            await self.store.set(key, response.dumps(), ttl + self.retention)
+        return response
+
+    async def get(self, endpoint: str, url: str, params: dict | None, fetch: Fetch) -> UpstreamResponse:
+        """Serve the endpoint's response from the cache, revalidating it or fetching it with fetch(headers)."""
+        ttl = self.ttls.get(endpoint)
+        if not ttl:
+            return await fetch({})
+
+        key = f"{endpoint}:{cache_key(url, params)}"
+        raw = await self.store.get(key)
+        cached = UpstreamResponse.loads(raw) if raw else None
+
+        if cached is not None and cached.fresh_until > time.time():
+            self.stats["fresh"] += 1
+            return cached
+
+        try:
+            response = await fetch(cached.validators() if cached else {})
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            if cached is None:
+                raise
+            logger.warning(f"[http_cache] serving stale {key}: {e!r}")
+            self.stats["stale"] += 1
+            return cached
+
+        if response.status == 304 and cached is not None:
+            self.stats["revalidated"] += 1
+            # A 304 may carry updated validators and freshness
+            return await self._save(key, replace(
+                cached, etag=response.etag or cached.etag,
+                last_modified=response.last_modified or cached.last_modified,
+                cache_control=response.cache_control or cached.cache_control), ttl)
+
+        if response.status == 200:
+            self.stats["fetched"] += 1
+            return await self._save(key, response, ttl)
+
+        if cached is not None and (response.status >= 500 or response.status == 429):
+            logger.warning(f"[http_cache] serving stale {key}: upstream status {response.status}")
+            self.stats["stale"] += 1
+            return cached
+        return response
+
+
+def create_http_cache(redis_client: Redis | None) -> HttpCache | None:
+    """The upstream response cache configured by HTTP_CACHE_BACKEND, None when it is off."""
+    if config.HTTP_CACHE_BACKEND == "redis" and redis_client is not None:
+        store = RedisResponseStore(redis_client)
+    elif config.HTTP_CACHE_BACKEND == "disk":
+        store = DiskResponseStore(config.HTTP_CACHE_DIR)
+    else:
+        return None
+
+    ttls = {
+        "genius_artist": config.HTTP_CACHE_TTL_GENIUS_ARTIST,
+        "spotify_artist": config.HTTP_CACHE_TTL_SPOTIFY_ARTIST,
+        "spotify_top_tracks": config.HTTP_CACHE_TTL_SPOTIFY_TOP_TRACKS,
+        "tunebat": config.HTTP_CACHE_TTL_TUNEBAT
+    }
+    return HttpCache(store, ttls=ttls, retention=config.HTTP_CACHE_RETENTION)
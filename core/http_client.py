@@ -0,0 +1,23 @@
+import aiohttp
+
+from core import config
+
+
+def create_http_session() -> aiohttp.ClientSession:
+    """
+    Build the app-lifetime HTTP session shared by the Genius and Spotify clients.
+
+    The connector keeps per-host pools of keep-alive connections and caches DNS
+    lookups, so upstream calls reuse already established TCP/TLS connections.
+    """
+    connector = aiohttp.TCPConnector(
+        limit=config.HTTP_POOL_LIMIT,
+        limit_per_host=config.HTTP_POOL_LIMIT_PER_HOST,
+        ttl_dns_cache=config.HTTP_DNS_CACHE_TTL,
+        keepalive_timeout=config.HTTP_KEEPALIVE_TIMEOUT
+    )
+    timeout = aiohttp.ClientTimeout(
+        total=config.HTTP_TOTAL_TIMEOUT,
+        sock_connect=config.HTTP_CONNECT_TIMEOUT
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
@@ -0,0 +1,147 @@
+import time
+import random
+import asyncio
+
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from core.logger import logger
+
+
+# Due retries and expired leases go back to the ready list before the next job is taken
+RESERVE_SCRIPT = """
+local now = tonumber(ARGV[1])
+for _, key in ipairs({KEYS[2], KEYS[3]}) do
+    local due = redis.call('ZRANGEBYSCORE', key, '-inf', now, 'LIMIT', 0, 100)
+    for _, job_id in ipairs(due) do
+        redis.call('ZREM', key, job_id)
+        redis.call('LPUSH', KEYS[1], job_id)
+    end
+end
+local job_id = redis.call('RPOP', KEYS[1])
+if job_id then
+    redis.call('ZADD', KEYS[3], ARGV[2], job_id)
+end
+return job_id
+"""
+
+
+# Dead ids stay out until retry_dead(), whoever asks for them again
+ENQUEUE_SCRIPT = """
+local new = {}
+for _, job_id in ipairs(ARGV) do
+    if not redis.call('ZSCORE', KEYS[3], job_id) and redis.call('SADD', KEYS[2], job_id) == 1 then
+        redis.call('LPUSH', KEYS[1], job_id)
+        table.insert(new, job_id)
+    end
+end
+return new
+"""
+
+
+class JobQueue:
+    """
+    Reliable Redis job queue of string ids, one id being queued at most once.
+
+    - `queued` (set) holds every id that is waiting, delayed or running, so
+      enqueueing an id twice is a no-op
+    - `ready` (list) is FIFO, `delayed` (zset) holds retries by due time
+    - `processing` (zset) holds running jobs by lease deadline, a job whose
+      worker died is handed out again once its lease expires
+    - `dead` (zset) keeps the ids that failed max_attempts times, with the
+      last error in `errors`. Enqueueing them is a no-op until retry_dead()
+
+    Finished ids are published on a per-id channel, so requests can wait for them.
+    """
+
+    def __init__(self, redis_client: Redis, name: str, max_attempts: int, retry_base_delay: float,
+                 retry_max_delay: float, lease_timeout: float):
+        self.redis_client = redis_client
+        self.name = name
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.lease_timeout = lease_timeout
+        self._reserve = redis_client.register_script(RESERVE_SCRIPT)
+        self._enqueue = redis_client.register_script(ENQUEUE_SCRIPT)
+
+    def _key(self, part: str) -> str:
+        return f"jobs:{self.name}:{part}"
+
+    def _done_channel(self, job_id: str) -> str:
+        return self._key(f"done:{job_id}")
+
+    async def enqueue(self, job_ids: list[str]) -> list[str]:
+        """Queue the ids that are neither queued nor dead and return them."""
+        if not job_ids:
+            return []
+        return await self._enqueue(keys=[self._key("ready"), self._key("queued"), self._key("dead")],
+                                   args=job_ids)
+
+    async def is_queued(self, job_id: str) -> bool:
+        return bool(await self.redis_client.sismember(self._key("queued"), job_id))
+
+    async def reserve(self) -> str | None:
+        """Take the next job, leased to the caller for lease_timeout seconds."""
+        now = time.time()
+        return await self._reserve(
+            keys=[self._key("ready"), self._key("delayed"), self._key("processing")],
+            args=[now, now + self.lease_timeout]
+        )
+
+    async def complete(self, job_id: str):
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.zrem(self._key("processing"), job_id)
+            pipe.srem(self._key("queued"), job_id)
+            pipe.hdel(self._key("attempts"), job_id)
+            pipe.publish(self._done_channel(job_id), "done")
+            await pipe.execute()
+
+    async def fail(self, job_id: str, error: str) -> bool:
+        """Schedule a retry with exponential backoff, returning False once the job is dead."""
+        attempts = await self.redis_client.hincrby(self._key("attempts"), job_id, 1)
+
+        async with self.redis_client.pipeline(transaction=True) as pipe:
+            pipe.zrem(self._key("processing"), job_id)
+            if attempts >= self.max_attempts:
+                pipe.srem(self._key("queued"), job_id)
+                pipe.hdel(self._key("attempts"), job_id)
+                pipe.zadd(self._key("dead"), {job_id: time.time()})
+                pipe.hset(self._key("errors"), job_id, error)
+                # Waiting requests stop waiting, the job won't finish
+                pipe.publish(self._done_channel(job_id), "dead")
+            else:
+                delay = min(self.retry_max_delay, self.retry_base_delay * 2 ** (attempts - 1))
+                # Jitter keeps jobs that failed together from retrying together
+                pipe.zadd(self._key("delayed"), {job_id: time.time() + delay * random.uniform(0.5, 1)})
+            await pipe.execute()
+
+        return attempts < self.max_attempts
+
+    async def retry_dead(self) -> int:
+        """Queue every dead job again."""
+        job_ids = await self.redis_client.zrange(self._key("dead"), 0, -1)
+        if job_ids:
+            await self.redis_client.delete(self._key("dead"), self._key("errors"))
+            await self.enqueue(job_ids)
+        return len(job_ids)
+
+    async def wait(self, job_id: str, timeout: float) -> bool:
+        """Wait up to timeout seconds for a job to finish, True if it completed."""
+        pubsub = self.redis_client.pubsub()
+        try:
+            await pubsub.subscribe(self._done_channel(job_id))
+            # Subscribed first, so a job finishing right now can't be missed
+            if not await self.is_queued(job_id):
+                return await self.redis_client.zscore(self._key("dead"), job_id) is None
+
+            deadline = time.monotonic() + timeout
+            while (remaining := deadline - time.monotonic()) > 0:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=remaining)
+                if message is not None:
+                    return message["data"] == "done"
+            return False
+        except (RedisError, asyncio.TimeoutError) as e:
+            logger.warning(f"Waiting for job {self.name}:{job_id} failed: {e}")
+            return False
+        finally:
+            await pubsub.aclose()
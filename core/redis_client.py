@@ -0,0 +1,29 @@
+from core import config
+from core.logger import logger
+from redis.asyncio import Redis, ConnectionPool
+from redis.exceptions import RedisError
+
+
+def create_redis_client() -> Redis:
+    """Build the app-lifetime Redis client backed by one shared connection pool."""
+    pool = ConnectionPool(
+        host=config.REDIS_HOST,
+        port=config.REDIS_PORT,
+        max_connections=config.REDIS_MAX_CONNECTIONS,
+        health_check_interval=config.REDIS_HEALTH_CHECK_INTERVAL,
+        socket_keepalive=True,
+        encoding="utf-8",
+        decode_responses=True
+    )
+    return Redis(connection_pool=pool)
+
+
+async def check_redis(redis_client: Redis):
+    try:
+        await redis_client.ping()
+    except RedisError as e:
+        logger.warning(f"Redis is not reachable on startup: {e}")
+
+
+async def close_redis_client(redis_client: Redis):
+    await redis_client.aclose(close_connection_pool=True)
@@ -0,0 +1,55 @@
+import time
+import asyncio
+
+from typing import Any, Callable
+from concurrent.futures import ThreadPoolExecutor
+from core.throttle import Throttle
+
+
+class ScrapingExecutor:
+    """
+    Runs blocking scraping jobs (cloudscraper + BeautifulSoup) on a bounded
+    thread pool, rate-spaced by a Throttle, and keeps queue metrics.
+    """
+
+    def __init__(self, max_workers: int, throttle: Throttle):
+        self.throttle = throttle
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="scraper")
+        self.queue_depth = 0
+        self.completed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    async def run(self, func: Callable[..., Any], *args) -> Any:
+        loop = asyncio.get_running_loop()
+        submitted_at = time.monotonic()
+        started_at = submitted_at
+
+        def timed_call():
+            nonlocal started_at
+            started_at = time.monotonic()
+            return func(*args)
+
+        self.queue_depth += 1
+        try:
+            await self.throttle.wait()
+            return await loop.run_in_executor(self._executor, timed_call)
+        finally:
+            self.queue_depth -= 1
+            self.completed += 1
+
+            wait = started_at - submitted_at
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+
+    def metrics(self) -> dict:
+        return {
+            "queue_depth": self.queue_depth,
+            "completed": self.completed,
+            "avg_wait_seconds": self.total_wait / self.completed if self.completed else 0.0,
+            "max_wait_seconds": self.max_wait
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
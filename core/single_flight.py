@@ -0,0 +1,74 @@
+import asyncio
+
+from typing import Any, Awaitable, Callable
+from redis.asyncio import Redis
+from redis.exceptions import LockError, RedisError
+from core.logger import logger
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key into one in-flight task.
+
+    The shared task is shielded, so a caller that gets cancelled does not
+    cancel the work the other callers are waiting for.
+    """
+
+    def __init__(self):
+        self._calls: dict[str, asyncio.Future] = {}
+
+    def _forget(self, key: str, task: asyncio.Future):
+        if self._calls.get(key) is task:
+            del self._calls[key]
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._calls
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._calls.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(key, done))
+        return await asyncio.shield(task)
+
+
+class DistributedSingleFlight:
+    """
+    SingleFlight across workers.
+
+    Calls are first coalesced in-process, then the local leader takes a Redis
+    lock on the key. Leaders in other workers wait for that lock and only then
+    run their own call, which is expected to find the first worker's result
+    (in the DB or a cache) instead of hitting upstream again.
+    """
+
+    def __init__(self, redis_client: Redis, lock_timeout: float, wait_timeout: float):
+        self.redis_client = redis_client
+        self.lock_timeout = lock_timeout
+        self.wait_timeout = wait_timeout
+        self._local = SingleFlight()
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        return await self._local.do(key, lambda: self._locked(key, func))
+
+    async def _locked(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        lock = self.redis_client.lock(f"lock:{key}", timeout=self.lock_timeout,
+                                      blocking_timeout=self.wait_timeout, sleep=0.1)
+        try:
+            acquired = await lock.acquire()
+        except RedisError as e:
+            logger.warning(f"Could not take the lock for {key}: {e}")
+            acquired = False
+
+        if not acquired:
+            # Better a duplicate upstream fetch than a request stuck behind a dead worker
+            return await func()
+
+        try:
+            return await func()
+        finally:
+            try:
+                await lock.release()
+            except (LockError, RedisError) as e:
+                logger.warning(f"Could not release the lock for {key}: {e}")
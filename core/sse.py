@@ -0,0 +1,13 @@
+import json
+
+from typing import AsyncIterator
+
+
+async def sse_stream(events: AsyncIterator[dict]) -> AsyncIterator[str]:
+    """Format controller events as Server-Sent-Events frames."""
+    try:
+        async for event in events:
+            yield f"data: {json.dumps(event, ensure_ascii=False)}\n\n"
+    except Exception as e:
+        # Headers are already sent, so errors can only be reported in-band
+        yield f"data: {json.dumps({'error': str(e)})}\n\n"
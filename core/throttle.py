@@ -0,0 +1,32 @@
+import asyncio
+import random
+
+
+class Throttle:
+    """
+    Spaces out hits to one upstream without blocking the event loop.
+
+    Every caller reserves the next free slot under a lock and then sleeps
+    outside of it, so waiting callers never hold each other up longer
+    than their own slot.
+    """
+
+    def __init__(self, min_interval: float, max_interval: float | None = None):
+        self.min_interval = min_interval
+        self.max_interval = max_interval if max_interval is not None else min_interval
+        self._next_slot = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self) -> float:
+        loop = asyncio.get_running_loop()
+
+        async with self._lock:
+            now = loop.time()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + \
+                random.uniform(self.min_interval, self.max_interval)
+
+        delay = slot - now
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return delay
@@ -0,0 +1,108 @@
+import asyncio
+import argparse
+
+from collections import Counter, defaultdict
+from core import config
+from core.logger import logger
+from sqlalchemy import select, update, delete, bindparam
+from db.database import async_session_maker
+from db.db_manager import DatabaseManager, project_artist
+from db.models import artist, artist_word_count, track, lyrics
+from services.word_frequency import count_words
+
+
+async def backfill_artist_columns(batch_size: int):
+    """
+    Fill the projected artist columns from artist.json.
+
+    Rows are streamed in primary key order, one batch per transaction, so a
+    large table is never locked or loaded into memory as a whole.
+    """
+    last_id = 0
+    updated = 0
+
+    stmt = update(artist).where(artist.c.id == bindparam("artist_pk"))
+
+    while True:
+        async with async_session_maker() as session:
+            query = (
+                select(artist.c.id, artist.c.json)
+                .where(artist.c.id > last_id, artist.c.name.is_(None))
+                .order_by(artist.c.id)
+                .limit(batch_size)
+            )
+            rows = (await session.execute(query)).all()
+            if not rows:
+                break
+
+            params = [{"artist_pk": row.id, **project_artist(row.json or {})} for row in rows]
+            await session.execute(stmt, params)
+            await session.commit()
+
+        last_id = rows[-1].id
+        updated += len(rows)
+        logger.info(f"[backfill] artist columns: {updated} rows, last id {last_id}")
+
+    logger.info(f"[backfill] artist columns done: {updated} rows")
+
+
+async def backfill_word_counts(batch_size: int):
+    """
+    Recompute artist_word_count and artist.top_words from the stored lyrics.
+
+    Artists are walked in genius_id order and each batch is rebuilt in its own
+    transaction, so running it again gives the same counts.
+    """
+    last_id = 0
+    counted = 0
+
+    while True:
+        async with async_session_maker() as session:
+            query = (
+                select(artist.c.genius_id)
+                .where(artist.c.genius_id > last_id)
+                .order_by(artist.c.genius_id)
+                .limit(batch_size)
+            )
+            artist_ids = (await session.execute(query)).scalars().all()
+            if not artist_ids:
+                break
+
+            counts = defaultdict(Counter)
+            # Lyrics are streamed so a batch of prolific artists isn't held in memory at once
+            texts = await session.stream(
+                select(track.c.artist_id, lyrics.c.text)
+                .join_from(lyrics, track, track.c.spotify_song_id == lyrics.c.spotify_song_id)
+                .where(track.c.artist_id.in_(artist_ids), lyrics.c.text.is_not(None))
+            )
+            async for artist_id, text in texts:
+                counts[artist_id].update(count_words(text))
+
+            manager = DatabaseManager(session)
+            async with manager.transaction():
+                await session.execute(delete(artist_word_count).where(
+                    artist_word_count.c.artist_id.in_(artist_ids)))
+                for artist_id, artist_counts in counts.items():
+                    await manager.add_word_counts(artist_id, artist_counts, config.TOP_WORDS_COUNT)
+
+        last_id = artist_ids[-1]
+        counted += len(counts)
+        logger.info(f"[backfill] word counts: {counted} artists with lyrics, last genius_id {last_id}")
+
+    logger.info(f"[backfill] word counts done: {counted} artists with lyrics")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill derived data for existing rows")
+    parser.add_argument("task", choices=["artist-columns", "word-counts"])
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    if args.task == "artist-columns":
+        asyncio.run(backfill_artist_columns(args.batch_size))
+    elif args.task == "word-counts":
+        asyncio.run(backfill_word_counts(args.batch_size))
+
+
+if __name__ == "__main__":
+    main()
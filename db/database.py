@@ -1,6 +1,10 @@
+import random
 from typing import AsyncGenerator
-from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy import Select
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession, AsyncEngine
 from sqlalchemy.ext.declarative import declarative_base, DeclarativeMeta
+from core import config
 from core.config import DB_NAME, DB_HOST, DB_PASS, DB_PORT, DB_USER
 
 
@@ -8,10 +12,50 @@ DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{D
 
 Base: DeclarativeMeta = declarative_base()
 
-engine = create_async_engine(DATABASE_URL)
-async_session_maker = async_sessionmaker(engine, expire_on_commit=False)
+
+def create_db_engine(host: str, port: str | int) -> AsyncEngine:
+    url = (f"postgresql+asyncpg://{DB_USER}:{DB_PASS}@{host}:{port}/{DB_NAME}"
+           f"?prepared_statement_cache_size={config.DB_PREPARED_STATEMENT_CACHE_SIZE}")
+    return create_async_engine(
+        url,
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+        pool_recycle=config.DB_POOL_RECYCLE,
+        pool_pre_ping=config.DB_POOL_PRE_PING,
+        connect_args={"statement_cache_size": config.DB_STATEMENT_CACHE_SIZE}
+    )
+
+
+engine = create_db_engine(DB_HOST, DB_PORT)
+replica_engines = [create_db_engine(*replica.rsplit(":", 1)) for replica in config.DB_REPLICA_HOSTS]
+
+
+class RoutingSession(Session):
+    """Send SELECTs to a read replica while `session.info["replica"]` is set.
+
+    Writes, flushes and SELECT ... FOR UPDATE always go to the primary. A session
+    sticks to one replica so it holds at most one replica connection.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if (replica_engines and self.info.get("replica") and not self._flushing
+                and isinstance(clause, Select) and clause._for_update_arg is None):
+            if "replica_engine" not in self.info:
+                self.info["replica_engine"] = random.choice(replica_engines)
+            return self.info["replica_engine"].sync_engine
+        return engine.sync_engine
+
+
+async_session_maker = async_sessionmaker(
+    engine, expire_on_commit=False, sync_session_class=RoutingSession)
 
 
 async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
     async with async_session_maker() as session:
         yield session
+
+
+async def dispose_engines():
+    for engine_ in (engine, *replica_engines):
+        await engine_.dispose()
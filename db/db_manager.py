@@ -1,26 +1,155 @@
-import json
-
+import base64
+import functools
+from collections import Counter
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
 from core.logger import logger
-from typing import List
-from db.models import artist, track, track_details, lyrics, user_liked_artist, user_liked_track
+from db.models import artist, artist_genre, artist_similarity, artist_word_count, track, track_details, lyrics, user_liked_artist, user_liked_track
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, insert, update, delete
-from sqlalchemy.dialects.postgresql import insert as pg_insert
-from schemas.service_schemas import SpotifyTrack, SpotifyTrackDetails, TrackRead, ArtistRead
+from sqlalchemy import (select, insert, update, delete, func, tuple_, literal, literal_column, null, or_, union_all,
+                        cast, Float, Table, Select, Column)
+from sqlalchemy.dialects.postgresql import insert as pg_insert, aggregate_order_by
+from schemas.service_schemas import (SpotifyTrack, SpotifyTrackDetails, TrackRead, ArtistRead, StoredTrack,
+                                     TrackBundle, Lyrics, LikedTracksPage, LikedArtistsPage, LikesBatch,
+                                     LikesBatchResult, TrackLikeResult, ArtistLikeResult, TrackSearchPage,
+                                     TrackSearchResult)
+
+
+def project_artist(data: dict) -> dict:
+    """Extract the indexed artist columns from the stored Genius + Spotify payload."""
+    genius = data.get("genius") or {}
+    spotify = data.get("spotify") or {}
+    return {
+        "name": genius.get("name"),
+        "avatar_url": genius.get("avatar_photo", genius.get("image_url")),
+        "popularity": spotify.get("popularity"),
+        "followers_count": spotify.get("followers_count"),
+        "genres": spotify.get("genres") or []
+    }
+
+
+# The tsvector columns only serve the search indexes, plain reads leave them out
+track_columns = [column for column in track.c if column.key != "search_vector"]
+lyrics_columns = [column for column in lyrics.c if column.key != "search_vector"]
+# Fields of a related artist, the same whether it comes from artist_similarity or the genre fallback
+related_artist_columns = [artist.c.genius_id, artist.c.name, artist.c.avatar_url, artist.c.popularity,
+                          artist.c.followers_count, artist.c.genres]
+
+# Must match the configuration of the generated search_vector columns
+search_config = literal_column("'simple'::regconfig")
+SNIPPET_OPTIONS = "MaxFragments=2, MaxWords=15, MinWords=5, FragmentDelimiter=' … '"
+
+# (like table, liked column, column it references) for the batch like operations
+liked_track_columns = (user_liked_track, "track_id", track.c.spotify_song_id)
+liked_artist_columns = (user_liked_artist, "artist_id", artist.c.genius_id)
+
+
+def encode_cursor(liked_at: datetime, like_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{liked_at.isoformat()}|{like_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Raise ValueError if the cursor wasn't produced by encode_cursor."""
+    try:
+        liked_at, like_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(liked_at), int(like_id)
+    except ValueError as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def replica_read(method):
+    """Serve a read-only DatabaseManager query from a read replica when one is configured.
+
+    Inside a unit of work the query stays on the primary so it sees the pending writes.
+    """
+    @functools.wraps(method)
+    async def wrapper(self, *args, **kwargs):
+        if self._in_transaction:
+            return await method(self, *args, **kwargs)
+
+        self.session.info["replica"] = True
+        try:
+            return await method(self, *args, **kwargs)
+        finally:
+            self.session.info.pop("replica", None)
+    return wrapper
 
 
 class DatabaseManager:
     def __init__(self, session: AsyncSession):
         self.session = session
+        self._in_transaction = False
+
+    @asynccontextmanager
+    async def transaction(self):
+        """Group several writes into one commit, rolling all of them back on error.
+
+        Write methods called inside the block skip their own commit. A nested
+        transaction() becomes a savepoint of the outer one.
+        """
+        if self._in_transaction:
+            async with self.savepoint():
+                yield self
+            return
 
-    async def add_artist(self, genius_id: int, json: str):
-        stmt = insert(artist).values(
-            genius_id=genius_id,
-            json=json
-        )
-        await self.session.execute(stmt)
-        await self.session.commit()
-
+        self._in_transaction = True
+        try:
+            yield self
+            await self.session.commit()
+        except BaseException:
+            await self.session.rollback()
+            raise
+        finally:
+            self._in_transaction = False
+
+    @asynccontextmanager
+    async def savepoint(self, optional: bool = False):
+        """Roll back only the writes of this block on error.
+
+        With optional=True the error is logged and swallowed, so the enclosing
+        transaction still commits everything else.
+        """
+        try:
+            async with self.session.begin_nested():
+                yield self
+        except Exception as e:
+            if not optional:
+                raise
+            logger.warning(f"Optional write rolled back: {e}")
+
+    async def commit(self):
+        # Inside a unit of work the outermost transaction() commits
+        if not self._in_transaction:
+            await self.session.commit()
+
+    async def add_artist(self, genius_id: int, data: dict):
+        await self.add_artists({genius_id: data})
+
+    async def add_artists(self, artists: dict[int, dict]):
+        """Insert many artists and their genres with one multi-row statement each."""
+        artist_rows = []
+        genre_rows = []
+        for genius_id, data in artists.items():
+            projection = project_artist(data)
+            artist_rows.append({"genius_id": genius_id, "json": data, **projection})
+            genre_rows += [{"artist_id": genius_id, "genre": genre}
+                           for genre in set(projection["genres"])]
+
+        if artist_rows:
+            stmt = pg_insert(artist).values(artist_rows)
+            # A concurrent request may have inserted the same artist first
+            do_nothing_stmt = stmt.on_conflict_do_nothing(
+                index_elements=["genius_id"])
+            await self.session.execute(do_nothing_stmt)
+
+        if genre_rows:
+            genres_stmt = pg_insert(artist_genre).values(
+                genre_rows).on_conflict_do_nothing()
+            await self.session.execute(genres_stmt)
+
+        await self.commit()
+
+    @replica_read
     async def get_artist(self, artist_id: int):
         query = select(artist).where(artist.c.genius_id == artist_id)
         res = await self.session.execute(query)
@@ -28,10 +157,10 @@ class DatabaseManager:
         return artist_record._mapping if artist_record else None
 
     async def add_tracks(self, artist_id: int, tracks: list[SpotifyTrack]):
-        if not tracks:
-            return
+        await self.add_many_tracks({artist_id: tracks})
 
-        stmt = pg_insert(track).values([
+    async def add_many_tracks(self, tracks_by_artist: dict[int, list[SpotifyTrack]]):
+        rows = [
             {
                 "artist_id": artist_id,
                 "spotify_song_id": track_.spotify_song_id,
@@ -40,13 +169,15 @@ class DatabaseManager:
                 "release_date": track_.release_date,
                 "cover_url": track_.cover_url,
                 "preview_url": track_.preview_url
-            } for track_ in tracks
-        ])
+            } for artist_id, tracks in tracks_by_artist.items() for track_ in tracks
+        ]
 
-        do_nothing_stmt = stmt.on_conflict_do_nothing(
-            index_elements=["spotify_song_id"])
-        await self.session.execute(do_nothing_stmt)
-        await self.session.commit()
+        if rows:
+            stmt = pg_insert(track).values(rows)
+            do_nothing_stmt = stmt.on_conflict_do_nothing(
+                index_elements=["spotify_song_id"])
+            await self.session.execute(do_nothing_stmt)
+        await self.commit()
 
     async def add_track(self, artist_id: int, track: SpotifyTrack):
         stmt = insert(track).values(
@@ -54,82 +185,388 @@ class DatabaseManager:
             **track.model_dump()
         )
         await self.session.execute(stmt)
-        await self.session.commit()
+        await self.commit()
 
+    @replica_read
     async def get_tracks(self, artist_id: int):
-        query = select(track).where(track.c.artist_id == artist_id)
+        query = select(*track_columns).where(track.c.artist_id == artist_id)
         res = await self.session.execute(query)
         return res.fetchall()
 
+    @replica_read
     async def get_one_track(self, track_id: str):
-        query = select(track).where(track.c.spotify_song_id == track_id)
+        query = select(*track_columns).where(track.c.spotify_song_id == track_id)
         res = await self.session.execute(query)
         return res.fetchone()
 
+    async def get_track_bundle(self, track_id: str) -> TrackBundle | None:
+        """Fetch a track with its details and lyrics in a single round trip."""
+        query = (
+            select(
+                track.c.artist_id, track.c.spotify_song_id, track.c.artists, track.c.title,
+                track.c.release_date, track.c.cover_url, track.c.preview_url,
+                track_details.c.id.label("details_id"), track_details.c.key, track_details.c.bpm,
+                track_details.c.camelot, track_details.c.popularity, track_details.c.energy,
+                track_details.c.danceability, track_details.c.happiness,
+                lyrics.c.id.label("lyrics_id"), lyrics.c.text.label("lyrics_text")
+            )
+            .select_from(
+                track.outerjoin(track_details, track_details.c.spotify_song_id == track.c.spotify_song_id)
+                .outerjoin(lyrics, lyrics.c.spotify_song_id == track.c.spotify_song_id)
+            )
+            .where(track.c.spotify_song_id == track_id)
+            .limit(1)
+        )
+        res = await self.session.execute(query)
+        row = res.mappings().first()
+
+        if row is None:
+            return None
+
+        return TrackBundle(
+            track=StoredTrack(**{key: row[key] for key in StoredTrack.model_fields}),
+            details=SpotifyTrackDetails(**{key: row[key] for key in SpotifyTrackDetails.model_fields})
+            if row["details_id"] is not None else None,
+            lyrics=Lyrics(text=row["lyrics_text"]) if row["lyrics_id"] is not None else None
+        )
+
     async def add_track_details(self, spotify_song_id: str, details: SpotifyTrackDetails):
-        stmt = insert(track_details).values(
+        stmt = pg_insert(track_details).values(
             spotify_song_id=spotify_song_id,
             **details.model_dump()
-        )
+        ).on_conflict_do_nothing(index_elements=["spotify_song_id"])
         await self.session.execute(stmt)
-        await self.session.commit()
+        await self.commit()
 
+    @replica_read
     async def get_track_details(self, track_id: str):
         query = select(track_details).where(
             track_details.c.spotify_song_id == track_id)
         res = await self.session.execute(query)
         return res.fetchone()
 
-    async def add_lyrics(self, track_id: str, lyrics_text: str):
-        stmt = insert(lyrics).values(
+    async def add_lyrics(self, track_id: str, lyrics_text: str) -> bool:
+        """Store the lyrics of a track, returning False if it already had some."""
+        stmt = pg_insert(lyrics).values(
             spotify_song_id=track_id,
             text=lyrics_text
-        )
-        await self.session.execute(stmt)
-        await self.session.commit()
+        ).on_conflict_do_nothing(index_elements=["spotify_song_id"]).returning(lyrics.c.id)
+        res = await self.session.execute(stmt)
+        inserted = res.scalar_one_or_none() is not None
+        await self.commit()
+        return inserted
 
     async def update_lyrics(self, track_id: str, lyrics_text: str):
-        stmt = update(lyrics).where(lyrics.c.spotify_song_id ==
-                                    track_id).values(text=lyrics_text)
-        await self.session.execute(stmt)
-        await self.session.commit()
+        """Replace the lyrics of a track, returning the previous text and the track's artist_id.
+
+        The old row is locked while it is read, so concurrent edits are applied one at a time.
+        Returns None if the track has no lyrics yet.
+        """
+        old = select(lyrics.c.id, lyrics.c.text).where(
+            lyrics.c.spotify_song_id == track_id).with_for_update().subquery("old")
+        stmt = (
+            update(lyrics)
+            .where(lyrics.c.id == old.c.id, track.c.spotify_song_id == lyrics.c.spotify_song_id)
+            .values(text=lyrics_text)
+            .returning(old.c.text.label("old_text"), track.c.artist_id)
+        )
+        res = await self.session.execute(stmt)
+        row = res.mappings().first()
+        await self.commit()
+        return row
 
+    @replica_read
     async def get_lyrics(self, track_id: str):
-        query = select(lyrics).where(lyrics.c.spotify_song_id == track_id)
+        query = select(*lyrics_columns).where(lyrics.c.spotify_song_id == track_id)
         res = await self.session.execute(query)
         return res.fetchone()
 
-    async def get_artist_by_genres(self, artist_id: int):
-        base_artist_row = await self.get_artist(artist_id)
-
-        if not base_artist_row:
-            return []
-
-        base_json = base_artist_row['json']
-        base_genres = json.loads(base_json)['spotify'].get('genres', [])
+    async def add_word_counts(self, artist_id: int, counts: Counter, top_n: int):
+        """Add signed per-word count changes to an artist and recompute its top words.
 
-        if not base_genres:
-            return []
+        Counts that drop to zero, after lyrics were edited, are removed.
+        """
+        if not counts:
+            return
 
-        query = select(artist).where(artist.c.genius_id != artist_id)
+        rows = [{"artist_id": artist_id, "word": word, "count": count} for word, count in counts.items()]
+        # Three parameters per row, kept well under the 32767 bind parameter limit
+        for start in range(0, len(rows), 5000):
+            stmt = pg_insert(artist_word_count).values(rows[start:start + 5000])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["artist_id", "word"],
+                set_={"count": artist_word_count.c.count + stmt.excluded["count"]}
+            )
+            await self.session.execute(stmt)
+
+        if any(count < 0 for count in counts.values()):
+            await self.session.execute(delete(artist_word_count).where(
+                artist_word_count.c.artist_id == artist_id, artist_word_count.c.count <= 0))
+
+        await self.refresh_top_words(artist_id, top_n)
+        await self.commit()
+
+    async def refresh_top_words(self, artist_id: int, top_n: int):
+        top = (
+            select(artist_word_count.c.word, artist_word_count.c.count)
+            .where(artist_word_count.c.artist_id == artist_id)
+            .order_by(artist_word_count.c.count.desc(), artist_word_count.c.word)
+            .limit(top_n)
+            .subquery()
+        )
+        top_words = select(func.array_agg(aggregate_order_by(
+            top.c.word, top.c.count.desc(), top.c.word))).scalar_subquery()
+        await self.session.execute(
+            update(artist).where(artist.c.genius_id == artist_id).values(top_words=top_words))
+
+    @replica_read
+    async def get_artist_by_genres(self, artist_id: int, limit: int = 20, offset: int = 0):
+        base = artist_genre.alias("base")
+        other = artist_genre.alias("other")
+        genre_overlap = func.count()
+        base_genres = select(func.count()).where(artist_genre.c.artist_id == artist_id).scalar_subquery()
+        # Jaccard similarity of the two genre sets, on the same 0..1 scale as the precomputed scores
+        score = (cast(genre_overlap, Float)
+                 / (base_genres + func.coalesce(func.cardinality(artist.c.genres), 0) - genre_overlap)).label("score")
+
+        # Both sides of the join are served by the (genre, artist_id) index
+        query = (
+            select(*related_artist_columns, score)
+            .select_from(
+                base.join(other, other.c.genre == base.c.genre)
+                .join(artist, artist.c.genius_id == other.c.artist_id)
+            )
+            .where(base.c.artist_id == artist_id, other.c.artist_id != artist_id)
+            .group_by(artist.c.id)
+            .order_by(score.desc(), artist.c.genius_id)
+            .limit(limit)
+            .offset(offset)
+        )
         res = await self.session.execute(query)
-        rows = res.fetchall()
+        return res.mappings().all()
+
+    async def stream_artist_names(self, batch_size: int):
+        """Yield (genius_id, name, popularity) rows in batches."""
+        query = (
+            select(artist.c.genius_id, artist.c.name, artist.c.popularity)
+            .where(artist.c.name.is_not(None))
+            .execution_options(yield_per=batch_size)
+        )
+        res = await self.session.stream(query)
+        async for rows in res.partitions():
+            yield rows
+
+    async def stream_track_titles(self, batch_size: int):
+        """Yield (artist_id, spotify_song_id, title, artists) rows in batches."""
+        query = (
+            select(track.c.artist_id, track.c.spotify_song_id, track.c.title, track.c.artists)
+            .execution_options(yield_per=batch_size)
+        )
+        res = await self.session.stream(query)
+        async for rows in res.partitions():
+            yield rows
+
+    @replica_read
+    async def search_tracks(self, text: str, limit: int = 20, offset: int = 0,
+                            fuzzy: bool = False) -> TrackSearchPage:
+        """Rank stored tracks by the words of their title, artists and lyrics.
+
+        When no track contains the words, the first page falls back to trigram
+        similarity of the title and artists, so misspelt names still find something.
+        """
+        if not fuzzy:
+            rows = await self.search_fulltext(text, limit + 1, offset)
+            # Past the first page an empty result is just the end of the full-text matches
+            if rows or offset:
+                return self.search_page(rows, limit, offset, fuzzy=False)
+
+        rows = await self.search_similar(text, limit + 1, offset)
+        return self.search_page(rows, limit, offset, fuzzy=True)
+
+    async def search_fulltext(self, text: str, limit: int, offset: int):
+        query = func.websearch_to_tsquery(search_config, text)
+
+        # Each branch is served by its own GIN index, an OR across both tables couldn't be
+        matches = union_all(
+            select(track.c.spotify_song_id, func.ts_rank(track.c.search_vector, query).label("rank"))
+            .where(track.c.search_vector.bool_op("@@")(query)),
+            select(lyrics.c.spotify_song_id, func.ts_rank(lyrics.c.search_vector, query).label("rank"))
+            .where(lyrics.c.search_vector.bool_op("@@")(query))
+        ).subquery("matches")
+        rank = func.sum(matches.c.rank).label("rank")
+        ranked = (
+            select(matches.c.spotify_song_id, rank)
+            .group_by(matches.c.spotify_song_id)
+            .order_by(rank.desc(), matches.c.spotify_song_id)
+            .limit(limit)
+            .offset(offset)
+            .subquery("ranked")
+        )
 
-        similar = []
+        # Snippets are only built for the tracks of the page
+        stmt = (
+            select(track.c.artist_id, track.c.spotify_song_id, track.c.artists, track.c.title, track.c.cover_url,
+                   ranked.c.rank,
+                   func.ts_headline(search_config, lyrics.c.text, query, SNIPPET_OPTIONS).label("snippet"))
+            .select_from(
+                ranked.join(track, track.c.spotify_song_id == ranked.c.spotify_song_id)
+                .outerjoin(lyrics, lyrics.c.spotify_song_id == ranked.c.spotify_song_id)
+            )
+            .order_by(ranked.c.rank.desc(), ranked.c.spotify_song_id)
+        )
+        res = await self.session.execute(stmt)
+        return res.mappings().all()
+
+    async def search_similar(self, text: str, limit: int, offset: int):
+        rank = func.greatest(func.similarity(track.c.title, text),
+                             func.similarity(track.c.artists, text)).label("rank")
+        # % compares against pg_trgm.similarity_threshold and can use the trigram indexes
+        stmt = (
+            select(track.c.artist_id, track.c.spotify_song_id, track.c.artists, track.c.title, track.c.cover_url,
+                   rank, null().label("snippet"))
+            .where(or_(track.c.title.bool_op("%")(text), track.c.artists.bool_op("%")(text)))
+            .order_by(rank.desc(), track.c.spotify_song_id)
+            .limit(limit)
+            .offset(offset)
+        )
+        res = await self.session.execute(stmt)
+        return res.mappings().all()
+
+    def search_page(self, rows, limit: int, offset: int, fuzzy: bool) -> TrackSearchPage:
+        return TrackSearchPage(
+            items=[TrackSearchResult(**row) for row in rows[:limit]],
+            fuzzy=fuzzy,
+            next_offset=offset + limit if len(rows) > limit else None
+        )
 
-        for row in rows:
-            data = json.loads(row._mapping['json'])
-            other_genres = data.get('spotify', {}).get('genres', [])
+    @replica_read
+    async def get_similar_artists(self, artist_id: int, limit: int = 20, offset: int = 0) -> list[dict] | None:
+        """Read the precomputed neighbors of an artist, None if it has none yet.
 
-            if set(base_genres) & set(other_genres):
-                similar.append(row._mapping)
-        return similar
+        Only the ids and scores are precomputed, the artist fields are read live.
+        """
+        query = select(artist_similarity.c.neighbors).where(artist_similarity.c.artist_id == artist_id)
+        res = await self.session.execute(query)
+        neighbors = res.scalar_one_or_none()
+        if neighbors is None:
+            return None
+
+        page = neighbors[offset:offset + limit]
+        if not page:
+            return []
+        res = await self.session.execute(
+            select(*related_artist_columns).where(artist.c.genius_id.in_([n["genius_id"] for n in page])))
+        rows = {row["genius_id"]: row for row in res.mappings().all()}
+        # Neighbors deleted since the last run are left out
+        return [{**rows[n["genius_id"]], "score": n["score"]} for n in page if n["genius_id"] in rows]
+
+    async def set_similar_artists(self, neighbors: dict[int, list[dict]]):
+        rows = [{"artist_id": artist_id, "neighbors": artist_neighbors}
+                for artist_id, artist_neighbors in neighbors.items()]
+        for start in range(0, len(rows), 1000):
+            stmt = pg_insert(artist_similarity).values(rows[start:start + 1000])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["artist_id"],
+                set_={"neighbors": stmt.excluded.neighbors, "computed_at": func.now()}
+            )
+            await self.session.execute(stmt)
+        await self.commit()
+
+    @replica_read
+    async def get_refresh_candidates(self, min_age: timedelta, limit: int, artist_ids: list[int] | None = None):
+        """Artists stored more than min_age ago with their like counts, the most stale and popular first.
+
+        With artist_ids, only those artists, for the ones requested most often.
+        """
+        likes = (
+            select(user_liked_artist.c.artist_id, func.count().label("likes"))
+            .group_by(user_liked_artist.c.artist_id)
+            .subquery("likes")
+        )
+        age = func.extract("epoch", func.now() - artist.c.parse_date)
+        query = (
+            select(artist.c.genius_id, artist.c.name, artist.c.json, artist.c.popularity,
+                   age.label("age"), func.coalesce(likes.c.likes, 0).label("likes"))
+            .select_from(artist.outerjoin(likes, likes.c.artist_id == artist.c.genius_id))
+            .where(artist.c.parse_date < func.now() - min_age, artist.c.genius_id.is_not(None))
+        )
+        if artist_ids is not None:
+            query = query.where(artist.c.genius_id.in_(artist_ids))
+        else:
+            query = query.order_by(
+                (age * (1 + func.ln(1 + func.coalesce(likes.c.likes, 0))
+                        + func.coalesce(artist.c.popularity, 0) / 100.0)).desc()
+            ).limit(limit)
+        res = await self.session.execute(query)
+        return res.mappings().all()
+
+    async def refresh_artist(self, genius_id: int, data: dict, previous: dict) -> list[str]:
+        """Write the refreshed payload of an artist, only the columns that changed, and return their names.
+
+        parse_date is bumped either way, so the artist isn't picked again right away.
+        """
+        old, new = project_artist(previous), project_artist(data)
+        values = {column: value for column, value in new.items() if value != old[column]}
+        if data != previous:
+            values["json"] = data
+        await self.session.execute(
+            update(artist).where(artist.c.genius_id == genius_id).values(**values, parse_date=func.now()))
+
+        added = set(new["genres"]) - set(old["genres"])
+        removed = set(old["genres"]) - set(new["genres"])
+        if added:
+            await self.session.execute(pg_insert(artist_genre).values(
+                [{"artist_id": genius_id, "genre": genre} for genre in added]).on_conflict_do_nothing())
+        if removed:
+            await self.session.execute(delete(artist_genre).where(
+                artist_genre.c.artist_id == genius_id, artist_genre.c.genre.in_(removed)))
+
+        await self.commit()
+        return list(values)
+
+    async def refresh_tracks(self, artist_id: int, tracks: list[SpotifyTrack]) -> tuple[list[str], list[str]]:
+        """Insert the new top tracks and update the changed fields of stored ones.
+
+        Tracks that dropped out of the top are kept. Returns the new and the updated ids.
+        """
+        tracks = [track_ for track_ in tracks if track_.spotify_song_id]
+        if not tracks:
+            return [], []
+
+        fields = ["artists", "title", "release_date", "cover_url", "preview_url"]
+        res = await self.session.execute(
+            select(track.c.spotify_song_id, *(track.c[field] for field in fields))
+            .where(track.c.spotify_song_id.in_([track_.spotify_song_id for track_ in tracks])))
+        stored = {row["spotify_song_id"]: row for row in res.mappings()}
+
+        new, updated = [], []
+        for track_ in tracks:
+            row = stored.get(track_.spotify_song_id)
+            if row is None:
+                new.append(track_)
+                continue
+
+            # release_date is stored as a timestamp
+            values = {field: getattr(track_, field) for field in fields
+                      if getattr(track_, field) != (row[field].date() if field == "release_date" and row[field]
+                                                    else row[field])}
+            if values:
+                await self.session.execute(
+                    update(track).where(track.c.spotify_song_id == track_.spotify_song_id).values(**values))
+                updated.append(track_.spotify_song_id)
+
+        if new:
+            await self.add_many_tracks({artist_id: new})
+        await self.commit()
+        return [track_.spotify_song_id for track_ in new], updated
 
     async def like_track(self, user_id: int, track_id: str):
-        stmt = insert(user_liked_track).values(
-            user_id=user_id, track_id=track_id)
+        # Liking twice is a no-op, the first liked_at is kept
+        stmt = pg_insert(user_liked_track).values(
+            user_id=user_id, track_id=track_id).on_conflict_do_nothing(
+            index_elements=["user_id", "track_id"])
         await self.session.execute(stmt)
-        await self.session.commit()
+        await self.commit()
 
     async def unlike_track(self, user_id: int, track_id: str):
         stmt = delete(user_liked_track).where(
@@ -137,42 +574,59 @@ class DatabaseManager:
             user_liked_track.c.track_id == track_id
         )
         await self.session.execute(stmt)
-        await self.session.commit()
+        await self.commit()
 
-    async def get_liked_tracks(self, user_id: int) -> List[TrackRead]:
-        try:
-            query = select(track).where(
-                track.c.spotify_song_id.in_(
-                    select(user_liked_track.c.track_id).where(
-                        user_liked_track.c.user_id == user_id)
-                )
-            )
+    async def liked_page(self, query: Select, likes: Table, limit: int, cursor: str | None):
+        """Run a query over a like table newest first, one keyset page at a time.
 
-            res = await self.session.execute(query)
-            rows = res.mappings().all()
-
-            if not rows:
-                return []
-
-            tracks = [TrackRead(
-                artist_id=row['artist_id'],
-                spotify_song_id=row['spotify_song_id'],
-                artists=row['artists'],
-                title=row['title'],
-                cover_url=row['cover_url'],
-            ) for row in rows]
-
-            return tracks
+        Returns the rows of the page and the cursor of the next one, None on the last page.
+        """
+        query = (
+            query.add_columns(likes.c.id.label("like_id"), likes.c.liked_at)
+            .order_by(likes.c.liked_at.desc(), likes.c.id.desc())
+            .limit(limit + 1)
+        )
+        if cursor:
+            query = query.where(tuple_(likes.c.liked_at, likes.c.id) < tuple_(*decode_cursor(cursor)))
 
-        except Exception as e:
-            logger.exception(f"Error: {e}")
-            return []
+        res = await self.session.execute(query)
+        rows = res.mappings().all()
+
+        if len(rows) <= limit:
+            return rows, None
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1]["liked_at"], rows[-1]["like_id"])
+
+    @replica_read
+    async def get_liked_tracks(self, user_id: int, limit: int = 50, cursor: str | None = None) -> LikedTracksPage:
+        query = (
+            select(track.c.artist_id, track.c.spotify_song_id, track.c.artists, track.c.title, track.c.cover_url)
+            .join_from(user_liked_track, track, track.c.spotify_song_id == user_liked_track.c.track_id)
+            .where(user_liked_track.c.user_id == user_id)
+        )
+        rows, next_cursor = await self.liked_page(query, user_liked_track, limit, cursor)
+
+        return LikedTracksPage(items=[TrackRead(
+            artist_id=row['artist_id'],
+            spotify_song_id=row['spotify_song_id'],
+            artists=row['artists'],
+            title=row['title'],
+            cover_url=row['cover_url'],
+        ) for row in rows], next_cursor=next_cursor)
+
+    @replica_read
+    async def count_liked_tracks(self, user_id: int) -> int:
+        query = select(func.count()).select_from(user_liked_track).where(
+            user_liked_track.c.user_id == user_id)
+        res = await self.session.execute(query)
+        return res.scalar_one()
 
     async def like_artist(self, user_id: int, artist_id: int):
-        stmt = insert(user_liked_artist).values(
-            user_id=user_id, artist_id=artist_id)
+        stmt = pg_insert(user_liked_artist).values(
+            user_id=user_id, artist_id=artist_id).on_conflict_do_nothing(
+            index_elements=["user_id", "artist_id"])
         await self.session.execute(stmt)
-        await self.session.commit()
+        await self.commit()
 
     async def unlike_artist(self, user_id: int, artist_id: int):
         stmt = delete(user_liked_artist).where(
@@ -180,46 +634,96 @@ class DatabaseManager:
             user_liked_artist.c.artist_id == artist_id
         )
         await self.session.execute(stmt)
-        await self.session.commit()
+        await self.commit()
+
+    @replica_read
+    async def get_liked_artists(self, user_id: int, limit: int = 50, cursor: str | None = None) -> LikedArtistsPage:
+        # Only the projected columns are read, never the artist json
+        query = (
+            select(artist.c.genius_id, artist.c.name, artist.c.avatar_url)
+            .join_from(user_liked_artist, artist, artist.c.genius_id == user_liked_artist.c.artist_id)
+            .where(user_liked_artist.c.user_id == user_id)
+        )
+        rows, next_cursor = await self.liked_page(query, user_liked_artist, limit, cursor)
+
+        return LikedArtistsPage(items=[ArtistRead(
+            genius_id=row['genius_id'],
+            name=row['name'] or 'Unknown Artist',
+            cover_url=row['avatar_url']
+        ) for row in rows], next_cursor=next_cursor)
+
+    @replica_read
+    async def count_liked_artists(self, user_id: int) -> int:
+        query = select(func.count()).select_from(user_liked_artist).where(
+            user_liked_artist.c.user_id == user_id)
+        res = await self.session.execute(query)
+        return res.scalar_one()
+
+    async def like_many(self, likes: Table, column: str, target: Column, user_id: int, ids: list) -> dict:
+        """Like many items with one INSERT ... SELECT, returning a status per id.
+
+        Ids missing from the target table are skipped instead of failing the statement.
+        """
+        if not ids:
+            return {}
+
+        stmt = pg_insert(likes).from_select(
+            ["user_id", column],
+            select(literal(user_id), target).where(target.in_(ids))
+        ).on_conflict_do_nothing(index_elements=["user_id", column]).returning(likes.c[column])
+        res = await self.session.execute(stmt)
+        liked = set(res.scalars().all())
+
+        # Only ids that weren't inserted need telling apart, already liked or unknown
+        existing = set()
+        rest = [id_ for id_ in ids if id_ not in liked]
+        if rest:
+            res = await self.session.execute(select(target).where(target.in_(rest)))
+            existing = set(res.scalars().all())
+
+        await self.commit()
+        return {id_: "liked" if id_ in liked else "unchanged" if id_ in existing else "not_found"
+                for id_ in ids}
+
+    async def unlike_many(self, likes: Table, column: str, user_id: int, ids: list) -> dict:
+        if not ids:
+            return {}
+
+        stmt = delete(likes).where(
+            tuple_(likes.c.user_id, likes.c[column]).in_([(user_id, id_) for id_ in ids])
+        ).returning(likes.c[column])
+        res = await self.session.execute(stmt)
+        unliked = set(res.scalars().all())
+
+        await self.commit()
+        return {id_: "unliked" if id_ in unliked else "unchanged" for id_ in ids}
+
+    async def apply_likes(self, user_id: int, batch: LikesBatch) -> LikesBatchResult:
+        """Apply a batch of like and unlike operations in one transaction."""
+        async with self.transaction():
+            track_statuses = await self.apply_like_operations(
+                liked_track_columns, user_id, [(op.action, op.track_id) for op in batch.tracks])
+            artist_statuses = await self.apply_like_operations(
+                liked_artist_columns, user_id, [(op.action, op.artist_id) for op in batch.artists])
+
+        return LikesBatchResult(
+            tracks=[TrackLikeResult(**op.model_dump(), status=status)
+                    for op, status in zip(batch.tracks, track_statuses)],
+            artists=[ArtistLikeResult(**op.model_dump(), status=status)
+                     for op, status in zip(batch.artists, artist_statuses)]
+        )
 
-    async def get_liked_artists(self, user_id: int) -> List[ArtistRead]:
-        try:
-            query = select(artist).where(
-                artist.c.genius_id.in_(
-                    select(user_liked_artist.c.artist_id).where(
-                        user_liked_artist.c.user_id == user_id)
-                )
-            )
+    async def apply_like_operations(self, columns: tuple, user_id: int, operations: list[tuple]) -> list[str]:
+        likes, column, target = columns
 
-            res = await self.session.execute(query)
-            rows = res.mappings().all()
-
-            if not rows:
-                return []
-
-            artists = []
-            for row in rows:
-                try:
-                    artist_data = json.loads(
-                        row['json']) if row.get('json') else {}
-                    # print(artist_data)
-                    name = artist_data.get('genius').get(
-                        'name', 'Unknown Artist')
-                    cover_url = artist_data.get(
-                        'genius').get('avatar_photo', None)
-
-                    artist_obj = ArtistRead(
-                        genius_id=row['genius_id'],
-                        name=name,
-                        cover_url=cover_url
-                    )
-                    artists.append(artist_obj)
-                except Exception as e:
-                    logger.exception(f"Error: {e}")
-                    continue
-
-            return artists
+        # Replaying offline changes, only the last operation per item matters
+        last = {id_: index for index, (_, id_) in enumerate(operations)}
+        like_ids = [id_ for id_, index in last.items() if operations[index][0] == "like"]
+        unlike_ids = [id_ for id_, index in last.items() if operations[index][0] == "unlike"]
 
-        except Exception as e:
-            logger.exception(f"Error: {e}")
-            return []
+        statuses = {
+            **await self.like_many(likes, column, target, user_id, like_ids),
+            **await self.unlike_many(likes, column, user_id, unlike_ids)
+        }
+        return [statuses[id_] if last[id_] == index else "superseded"
+                for index, (_, id_) in enumerate(operations)]
@@ -1,5 +1,6 @@
-from sqlalchemy import Table, Text, Column, Integer, String, MetaData, Boolean, TIMESTAMP, DateTime, ForeignKey
+from sqlalchemy import Table, Text, Column, Integer, String, MetaData, Boolean, TIMESTAMP, DateTime, ForeignKey, Index, Computed
 from sqlalchemy.sql import func
+from sqlalchemy.dialects.postgresql import JSONB, ARRAY, TSVECTOR
 from fastapi_users.db import SQLAlchemyBaseUserTable
 from datetime import datetime
 from db.database import Base
@@ -14,7 +15,46 @@ artist = Table(
     Column('id', Integer, primary_key=True),
     Column('genius_id', Integer, unique=True),
     Column('parse_date', DateTime, server_default=func.now()),
-    Column("json", String)
+    Column("json", JSONB),
+    # Projections of json, kept so readers don't have to decode the whole payload
+    Column('name', String, nullable=True),
+    Column('avatar_url', String, nullable=True),
+    Column('popularity', Integer, nullable=True),
+    Column('followers_count', Integer, nullable=True),
+    Column('genres', ARRAY(String), nullable=True),
+    # Most frequent lyrics words, recomputed from artist_word_count as lyrics arrive
+    Column('top_words', ARRAY(String), nullable=True),
+    Index('ix_artist_popularity', 'popularity')
+)
+
+Index('ix_artist_name_lower', func.lower(artist.c.name))
+
+artist_genre = Table(
+    'artist_genre',
+    metadata,
+    Column('artist_id', Integer, ForeignKey(
+        artist.c.genius_id, ondelete="CASCADE"), primary_key=True),
+    Column('genre', String, primary_key=True),
+    Index('ix_artist_genre_genre_artist_id', 'genre', 'artist_id')
+)
+
+artist_similarity = Table(
+    'artist_similarity',
+    metadata,
+    Column('artist_id', Integer, ForeignKey(
+        artist.c.genius_id, ondelete="CASCADE"), primary_key=True),
+    # Top neighbors, most similar first, as {genius_id, score}
+    Column('neighbors', JSONB, nullable=False),
+    Column('computed_at', DateTime, server_default=func.now(), nullable=False)
+)
+
+artist_word_count = Table(
+    'artist_word_count',
+    metadata,
+    Column('artist_id', Integer, ForeignKey(
+        artist.c.genius_id, ondelete="CASCADE"), primary_key=True),
+    Column('word', String, primary_key=True),
+    Column('count', Integer, nullable=False)
 )
 
 track = Table(
@@ -27,7 +67,16 @@ track = Table(
     Column('title', String, nullable=False),
     Column('release_date', DateTime, nullable=True),
     Column('cover_url', String, nullable=True),
-    Column('preview_url', String, nullable=True)
+    Column('preview_url', String, nullable=True),
+    # The 'simple' configuration doesn't stem, lyrics and names come in many languages
+    Column('search_vector', TSVECTOR, Computed(
+        "setweight(to_tsvector('simple'::regconfig, coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('simple'::regconfig, coalesce(artists, '')), 'B')", persisted=True)),
+    Index('ix_track_artist_id', 'artist_id'),
+    Index('ix_track_search_vector', 'search_vector', postgresql_using='gin'),
+    # Fuzzy fallback of the search, needs the pg_trgm extension
+    Index('ix_track_title_trgm', 'title', postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'}),
+    Index('ix_track_artists_trgm', 'artists', postgresql_using='gin', postgresql_ops={'artists': 'gin_trgm_ops'})
 )
 
 track_details = Table(
@@ -41,7 +90,8 @@ track_details = Table(
     Column('popularity', String, nullable=True),
     Column('energy', String, nullable=True),
     Column('danceability', String, nullable=True),
-    Column('happiness', String, nullable=True)
+    Column('happiness', String, nullable=True),
+    Index('uq_track_details_spotify_song_id', 'spotify_song_id', unique=True)
 )
 
 lyrics = Table(
@@ -49,7 +99,11 @@ lyrics = Table(
     metadata,
     Column('id', Integer, primary_key=True),
     Column('spotify_song_id', String, ForeignKey(track.c.spotify_song_id), nullable=False),
-    Column('text', Text, nullable=True)
+    Column('text', Text, nullable=True),
+    Column('search_vector', TSVECTOR, Computed(
+        "to_tsvector('simple'::regconfig, coalesce(text, ''))", persisted=True)),
+    Index('uq_lyrics_spotify_song_id', 'spotify_song_id', unique=True),
+    Index('ix_lyrics_search_vector', 'search_vector', postgresql_using='gin')
 )
 
 user = Table(
@@ -86,7 +140,12 @@ user_liked_artist = Table(
         user.c.id, ondelete="CASCADE"), nullable=False),
     Column('artist_id', Integer, ForeignKey(
         artist.c.genius_id, ondelete="CASCADE"), nullable=False),
-    Column('liked_at', DateTime, server_default=func.now())
+    Column('liked_at', DateTime, server_default=func.now(), nullable=False),
+    # Also serves every per-user lookup through its leading column
+    Index('uq_user_liked_artist_user_id_artist_id', 'user_id', 'artist_id', unique=True),
+    Index('ix_user_liked_artist_artist_id', 'artist_id'),
+    # Keyset pagination of a user's likes, newest first
+    Index('ix_user_liked_artist_user_id_liked_at_id', 'user_id', 'liked_at', 'id')
 )
 
 user_liked_track = Table(
@@ -97,5 +156,9 @@ user_liked_track = Table(
         user.c.id, ondelete="CASCADE"), nullable=False),
     Column('track_id', String, ForeignKey(
         track.c.spotify_song_id, ondelete="CASCADE"), nullable=False),
-    Column('liked_at', DateTime, server_default=func.now())
+    Column('liked_at', DateTime, server_default=func.now(), nullable=False),
+    Index('uq_user_liked_track_user_id_track_id', 'user_id', 'track_id', unique=True),
+    Index('ix_user_liked_track_track_id', 'track_id'),
+    # Keyset pagination of a user's likes, newest first
+    Index('ix_user_liked_track_user_id_liked_at_id', 'user_id', 'liked_at', 'id')
 )
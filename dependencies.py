@@ -1,11 +1,15 @@
-from core import config
 from fastapi import Depends, Request, HTTPException, status
 from redis.asyncio import Redis
+from core.cache import LayeredCache
+from core.single_flight import DistributedSingleFlight
+from core.job_queue import JobQueue
+from core import config
 from core.rate_limiter import RateLimiter
 from sqlalchemy.ext.asyncio import AsyncSession
 from db.db_manager import DatabaseManager
 from db.database import get_async_session
-from services.controller import ArtistController, TrackController, TranslatorController, ChatController
+from services.controller import ArtistController, TrackController, TranslatorController, ChatController, RequestCounter
+from services.autocomplete import NameIndex
 from services.applications.genius import GeniusAPI, GeniusParser
 from services.applications.spotify import SpotifyAPI
 from services.applications.openai import OpenAIClient
@@ -15,10 +19,8 @@ async def get_db_manager(session: AsyncSession = Depends(get_async_session)):
     return DatabaseManager(session=session)
 
 
-async def get_redis_client() -> Redis:
-    redis_client = Redis(host=config.REDIS_HOST, port=config.REDIS_PORT,
-                         encoding="utf-8", decode_responses=True)
-    return redis_client
+async def get_redis_client(request: Request) -> Redis:
+    return request.app.state.redis
 
 
 async def get_rate_limiter(redis_client: Redis = Depends(get_redis_client)):
@@ -57,31 +59,78 @@ def rate_limiter_factory(
     return dependency
 
 
-async def get_artist_controller(manager: DatabaseManager = Depends(get_db_manager),
-                                redis_client: Redis = Depends(get_redis_client)):
-    genius = GeniusAPI(config.GENIUS_ACCESS)
-    genius_parser = GeniusParser()
-    spotify = SpotifyAPI(config.SPOTIFY_ACCESS,
-                         config.SPOTIFY_ID, config.SPOTIFY_SECRET)
+async def get_genius(request: Request) -> GeniusAPI:
+    return request.app.state.genius
+
+
+async def get_genius_parser(request: Request) -> GeniusParser:
+    return request.app.state.genius_parser
+
+
+async def get_spotify(request: Request) -> SpotifyAPI:
+    return request.app.state.spotify
+
+
+async def get_artist_cache(request: Request) -> LayeredCache:
+    return request.app.state.artist_cache
+
+
+async def get_track_cache(request: Request) -> LayeredCache:
+    return request.app.state.track_cache
 
+
+async def get_coalescer(request: Request) -> DistributedSingleFlight:
+    return request.app.state.coalescer
+
+
+async def get_name_index(request: Request) -> NameIndex:
+    return request.app.state.name_index
+
+
+async def get_enrichment_queue(request: Request) -> JobQueue | None:
+    return request.app.state.enrichment
+
+
+async def get_request_counter(request: Request) -> RequestCounter:
+    return request.app.state.request_counter
+
+
+async def get_artist_controller(manager: DatabaseManager = Depends(get_db_manager),
+                                redis_client: Redis = Depends(get_redis_client),
+                                genius: GeniusAPI = Depends(get_genius),
+                                genius_parser: GeniusParser = Depends(get_genius_parser),
+                                spotify: SpotifyAPI = Depends(get_spotify),
+                                cache: LayeredCache = Depends(get_artist_cache),
+                                coalescer: DistributedSingleFlight = Depends(get_coalescer),
+                                name_index: NameIndex = Depends(get_name_index),
+                                enrichment: JobQueue | None = Depends(get_enrichment_queue),
+                                request_counter: RequestCounter = Depends(get_request_counter)):
     return ArtistController(genius=genius, genius_parser=genius_parser, spotify=spotify,
-                            manager=manager, redis_client=redis_client)
+                            manager=manager, redis_client=redis_client, cache=cache,
+                            coalescer=coalescer, name_index=name_index, enrichment=enrichment,
+                            request_counter=request_counter)
+
 
+async def get_track_controller(manager: DatabaseManager = Depends(get_db_manager),
+                               genius: GeniusAPI = Depends(get_genius),
+                               genius_parser: GeniusParser = Depends(get_genius_parser),
+                               spotify: SpotifyAPI = Depends(get_spotify),
+                               coalescer: DistributedSingleFlight = Depends(get_coalescer),
+                               cache: LayeredCache = Depends(get_track_cache),
+                               enrichment: JobQueue | None = Depends(get_enrichment_queue)):
+    return TrackController(genius=genius, genius_parser=genius_parser, spotify=spotify, manager=manager,
+                           coalescer=coalescer, cache=cache, enrichment=enrichment,
+                           enrichment_wait=config.ENRICHMENT_WAIT_TIMEOUT)
 
-async def get_track_controller(manager: DatabaseManager = Depends(get_db_manager)):
-    genius = GeniusAPI(config.GENIUS_ACCESS)
-    genius_parser = GeniusParser()
-    spotify = SpotifyAPI(config.SPOTIFY_ACCESS,
-                         config.SPOTIFY_ID, config.SPOTIFY_SECRET)
 
-    return TrackController(genius=genius, genius_parser=genius_parser, spotify=spotify, manager=manager)
+async def get_openai_client(request: Request) -> OpenAIClient:
+    return request.app.state.openai_client
 
 
-async def get_translator_controller(redis_client: Redis = Depends(get_redis_client)):
-    openai_client = OpenAIClient(config.OPENAI_API_TOKEN)
+async def get_translator_controller(redis_client: Redis = Depends(get_redis_client),
+                                    openai_client: OpenAIClient = Depends(get_openai_client)):
     return TranslatorController(openai_client, redis_client)
 
 
-async def get_chat_controller():
-    openai_client = OpenAIClient(config.OPENAI_API_TOKEN)
+async def get_chat_controller(openai_client: OpenAIClient = Depends(get_openai_client)):
     return ChatController(openai_client)
@@ -1,20 +1,103 @@
 import time
+import httpx
 
+from typing import Literal
+from contextlib import asynccontextmanager
+from core import config
 from core.logger import logger
-from fastapi import Depends
-from fastapi import FastAPI
+from core.http_client import create_http_session
+from core.cache import LayeredCache, LocalCache
+from core.http_cache import create_http_cache
+from core.single_flight import DistributedSingleFlight
+from core.redis_client import create_redis_client, check_redis, close_redis_client
+from core.scraping import ScrapingExecutor
+from core.throttle import Throttle
+from core.sse import sse_stream
+from fastapi import Depends, Query
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from user_auth.base_config import fastapi_users, auth_backend
-from services.controller import ArtistController, TrackController, TranslatorController, ChatController
+from services.controller import ArtistController, TrackController, TranslatorController, ChatController, RequestCounter
+from services.autocomplete import NameIndex, build_name_index
+from services.enrichment import create_enrichment_queue
 from schemas.user_schemas import UserCreate, UserRead
-from schemas.service_schemas import Search, SearchSong, Translation, ChatMessage, LyricsUpdateRequest
+from schemas.service_schemas import Search, SearchSong, Translation, ChatMessage, LyricsUpdateRequest, LikesBatch
 from db.models import User
 from db.db_manager import DatabaseManager
-from dependencies import get_artist_controller, get_db_manager, get_track_controller, get_translator_controller, get_chat_controller, rate_limiter_factory
+from db.database import dispose_engines
+from services.applications.genius import GeniusAPI, GeniusParser
+from services.applications.spotify import SpotifyAPI
+from services.applications.spotify_token import create_spotify_tokens
+from services.applications.openai import OpenAIClient
+from dependencies import get_artist_controller, get_db_manager, get_track_controller, get_translator_controller, get_chat_controller, get_name_index, rate_limiter_factory
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.redis = create_redis_client()
+    await check_redis(app.state.redis)
+
+    app.state.artist_cache = LayeredCache(
+        app.state.redis, namespace="artist", ttl=config.ARTIST_CACHE_TTL,
+        stale_ttl=config.ARTIST_CACHE_STALE_TTL,
+        local=LocalCache(config.LOCAL_CACHE_MAX_SIZE, config.LOCAL_CACHE_TTL)
+    )
+    app.state.track_cache = LayeredCache(
+        app.state.redis, namespace="track", ttl=config.TRACK_CACHE_TTL,
+        stale_ttl=config.TRACK_CACHE_STALE_TTL,
+        local=LocalCache(config.LOCAL_CACHE_MAX_SIZE, config.LOCAL_CACHE_TTL)
+    )
+    app.state.coalescer = DistributedSingleFlight(
+        app.state.redis, lock_timeout=config.COALESCE_LOCK_TIMEOUT,
+        wait_timeout=config.COALESCE_WAIT_TIMEOUT
+    )
+    app.state.name_index = await build_name_index(config.AUTOCOMPLETE_MIN_SIMILARITY)
+    # Track misses are fetched by `python -m services.enrichment worker` when enabled
+    app.state.enrichment = create_enrichment_queue(app.state.redis) if config.ENRICHMENT_QUEUE_ENABLED else None
+    # Read by `python -m services.refresh` to refresh the most requested artists first
+    app.state.request_counter = RequestCounter(app.state.redis, config.REFRESH_REQUESTS_FLUSH_INTERVAL)
+    app.state.request_counter.start()
+
+    http_session = create_http_session()
+    scraper = ScrapingExecutor(
+        max_workers=config.SCRAPER_MAX_WORKERS,
+        throttle=Throttle(config.TUNEBAT_MIN_DELAY, config.TUNEBAT_MAX_DELAY)
+    )
+
+    app.state.scraper = scraper
+    app.state.http_cache = create_http_cache(app.state.redis)
+    app.state.genius = GeniusAPI(config.GENIUS_ACCESS, session=http_session, http_cache=app.state.http_cache)
+    app.state.genius_parser = GeniusParser(session=http_session)
+    # One token per process, shared with the other workers through Redis and refreshed ahead of expiry
+    spotify_tokens = create_spotify_tokens(http_session, app.state.redis)
+    spotify_tokens.start()
+    app.state.spotify = SpotifyAPI(spotify_tokens, session=http_session, scraper=scraper,
+                                   http_cache=app.state.http_cache)
+
+    openai_http_client = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=config.OPENAI_MAX_CONNECTIONS,
+                            max_keepalive_connections=config.OPENAI_MAX_CONNECTIONS),
+        timeout=config.OPENAI_TIMEOUT
+    )
+    app.state.openai_client = OpenAIClient(config.OPENAI_API_TOKEN, http_client=openai_http_client,
+                                           base_url=config.OPENAI_BASE_URL,
+                                           max_concurrency=config.OPENAI_MAX_CONCURRENCY)
+
+    yield
+
+    await app.state.openai_client.close()
+    await spotify_tokens.close()
+    await app.state.request_counter.close()
+    scraper.shutdown()
+    await http_session.close()
+    await close_redis_client(app.state.redis)
+    await dispose_engines()
 
 
 app = FastAPI(
-    title='Melon'
+    title='Melon',
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -44,8 +127,9 @@ rate_limiter = rate_limiter_factory(max_requests=5, window_seconds=30,)
 
 @app.post("/")
 async def search_artist(search: Search, artist_controller: ArtistController = Depends(get_artist_controller)):
-    artist = await artist_controller.get_artist(search.artist_name)
-    return artist
+    # The cached payload is already serialized, skip re-validating and re-encoding it
+    artist_json = await artist_controller.get_artist_json(search.artist_name)
+    return Response(content=artist_json, media_type="application/json")
 
 
 @app.post("/track/")
@@ -54,10 +138,36 @@ async def search_track(search: SearchSong, track_controller: TrackController = D
     return track
 
 
+@app.get("/autocomplete/")
+async def autocomplete(q: str = Query(..., min_length=1, max_length=100), limit: int = Query(10, ge=1, le=50),
+                       kind: Literal["artist", "track"] | None = None,
+                       name_index: NameIndex = Depends(get_name_index)):
+    return name_index.suggest(q, limit=limit, kind=kind)
+
+
+@app.get("/search/lyrics/")
+async def search_lyrics(q: str = Query(..., min_length=2, max_length=200), limit: int = Query(20, ge=1, le=50),
+                        offset: int = Query(0, ge=0, le=1000), fuzzy: bool = False,
+                        manager: DatabaseManager = Depends(get_db_manager)):
+    # Answered from stored titles and lyrics only, never from Spotify or Genius
+    return await manager.search_tracks(q, limit=limit, offset=offset, fuzzy=fuzzy)
+
+
 @app.get("/{spotify_song_id}", dependencies=[Depends(rate_limiter)])
 async def get_track_data(spotify_song_id: str, track_controller: TrackController = Depends(get_track_controller)):
-    data = await track_controller.get_track_with_data(spotify_song_id)
-    return data
+    track_json = await track_controller.get_track_json(spotify_song_id)
+    return Response(content=track_json, media_type="application/json")
+
+
+@app.get("/metrics/scraping")
+async def get_scraping_metrics():
+    return app.state.scraper.metrics()
+
+
+@app.get("/metrics/http_cache")
+async def get_http_cache_metrics():
+    http_cache = app.state.http_cache
+    return http_cache.stats if http_cache else {}
 
 
 @app.post("/translation/")
@@ -70,29 +180,48 @@ async def generate_translation(translation: Translation,
     return data
 
 
+@app.post("/translation/stream/")
+async def stream_translation(translation: Translation,
+                             translator_controller: TranslatorController = Depends(get_translator_controller)):
+    events = translator_controller.stream_text_translation(
+        translation.text, translation.language, translation.level)
+    return StreamingResponse(sse_stream(events), media_type="text/event-stream")
+
+
 @app.post("/chat/")
 async def chat_with_gpt(chat_message: ChatMessage, chat_controller: ChatController = Depends(get_chat_controller)):
     try:
-        data = chat_controller.get_chat(
+        data = await chat_controller.get_chat(
             message=chat_message.message, history=chat_message.history)
     except Exception as e:
         return {"error": str(e)}
     return data
 
 
+@app.post("/chat/stream/")
+async def stream_chat_with_gpt(chat_message: ChatMessage, chat_controller: ChatController = Depends(get_chat_controller)):
+    events = chat_controller.stream_chat(
+        message=chat_message.message, history=chat_message.history)
+    return StreamingResponse(sse_stream(events), media_type="text/event-stream")
+
+
 @app.post("/update_lyrics/")
-async def update_lyrics(data: LyricsUpdateRequest, manager: DatabaseManager = Depends(get_db_manager)):
+async def update_lyrics(data: LyricsUpdateRequest, track_controller: TrackController = Depends(get_track_controller)):
     try:
-        await manager.update_lyrics(data.id, data.lyrics)
+        await track_controller.update_lyrics(data.id, data.lyrics)
         return {"success": True}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
 
 @app.get("/related_artists/{artist_id}")
-async def get_related_artists(artist_id: int, manager: DatabaseManager = Depends(get_db_manager)):
+async def get_related_artists(artist_id: int, limit: int = Query(20, ge=1, le=100), offset: int = Query(0, ge=0),
+                              manager: DatabaseManager = Depends(get_db_manager)):
     try:
-        artists = await manager.get_artist_by_genres(artist_id=artist_id)
+        artists = await manager.get_similar_artists(artist_id=artist_id, limit=limit, offset=offset)
+        if artists is None:
+            # Artists added since the last `python -m services.similarity` run are ranked by shared genres
+            artists = await manager.get_artist_by_genres(artist_id=artist_id, limit=limit, offset=offset)
         return {"success": True, "artists": artists}
     except Exception as e:
         return {"success": False, "error": str(e)}
@@ -112,22 +241,42 @@ async def like_artist_endpoint(artist_id: int, user: User = Depends(fastapi_user
     return {"success": True}
 
 
+@app.post("/likes/batch/")
+async def apply_likes_batch(batch: LikesBatch, user: User = Depends(fastapi_users.current_user()),
+                            manager: DatabaseManager = Depends(get_db_manager)):
+    return await manager.apply_likes(user.id, batch)
+
+
 @app.get("/liked_tracks/")
-async def get_liked_tracks(user: User = Depends(fastapi_users.current_user()),
+async def get_liked_tracks(limit: int = Query(50, ge=1, le=200), cursor: str | None = None,
+                           user: User = Depends(fastapi_users.current_user()),
                            manager: DatabaseManager = Depends(get_db_manager)):
-    liked_tracks = await manager.get_liked_tracks(user.id)
-    if liked_tracks is None:
-        return []
-    return liked_tracks
+    try:
+        return await manager.get_liked_tracks(user.id, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/liked_tracks/count/")
+async def count_liked_tracks(user: User = Depends(fastapi_users.current_user()),
+                             manager: DatabaseManager = Depends(get_db_manager)):
+    return {"count": await manager.count_liked_tracks(user.id)}
 
 
 @app.get("/liked_artists/")
-async def get_liked_artists(user: User = Depends(fastapi_users.current_user()),
+async def get_liked_artists(limit: int = Query(50, ge=1, le=200), cursor: str | None = None,
+                            user: User = Depends(fastapi_users.current_user()),
                             manager: DatabaseManager = Depends(get_db_manager)):
-    liked_artists = await manager.get_liked_artists(user.id)
-    if liked_artists is None:
-        return []
-    return liked_artists
+    try:
+        return await manager.get_liked_artists(user.id, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/liked_artists/count/")
+async def count_liked_artists(user: User = Depends(fastapi_users.current_user()),
+                              manager: DatabaseManager = Depends(get_db_manager)):
+    return {"count": await manager.count_liked_artists(user.id)}
 
 
 @app.delete("/unlike_track/{track_id}")
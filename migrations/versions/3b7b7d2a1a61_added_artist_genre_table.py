@@ -0,0 +1,46 @@
+"""Added artist_genre table
+
+Revision ID: 3b7b7d2a1a61
+Revises: 4b1f0bed7981
+Create Date: 2026-10-17 16:20:11.482913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3b7b7d2a1a61'
+down_revision: Union[str, None] = '4b1f0bed7981'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('artist_genre',
+    sa.Column('artist_id', sa.Integer(), nullable=False),
+    sa.Column('genre', sa.String(), nullable=False),
+    sa.ForeignKeyConstraint(['artist_id'], ['artist.genius_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('artist_id', 'genre')
+    )
+    op.create_index('ix_artist_genre_genre_artist_id', 'artist_genre', ['genre', 'artist_id'], unique=False)
+
+    # Backfill from the Spotify genres stored in artist.json
+    op.execute(
+        """
+        INSERT INTO artist_genre (artist_id, genre)
+        SELECT DISTINCT a.genius_id, g.genre
+        FROM artist a,
+             jsonb_array_elements_text(a.json::jsonb -> 'spotify' -> 'genres') AS g(genre)
+        WHERE a.genius_id IS NOT NULL
+          AND jsonb_typeof(a.json::jsonb -> 'spotify' -> 'genres') = 'array'
+        ON CONFLICT DO NOTHING
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_artist_genre_genre_artist_id', table_name='artist_genre')
+    op.drop_table('artist_genre')
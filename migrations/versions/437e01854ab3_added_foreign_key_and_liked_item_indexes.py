@@ -0,0 +1,55 @@
+"""Added foreign key and liked item indexes
+
+Revision ID: 437e01854ab3
+Revises: 9e4c61f0b2d8
+Create Date: 2026-10-17 16:24:05.513902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '437e01854ab3'
+down_revision: Union[str, None] = '9e4c61f0b2d8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (name, table, columns, unique)
+INDEXES = [
+    ('ix_track_artist_id', 'track', ['artist_id'], False),
+    ('uq_track_details_spotify_song_id', 'track_details', ['spotify_song_id'], True),
+    ('uq_lyrics_spotify_song_id', 'lyrics', ['spotify_song_id'], True),
+    ('uq_user_liked_track_user_id_track_id', 'user_liked_track', ['user_id', 'track_id'], True),
+    ('ix_user_liked_track_track_id', 'user_liked_track', ['track_id'], False),
+    ('uq_user_liked_artist_user_id_artist_id', 'user_liked_artist', ['user_id', 'artist_id'], True),
+    ('ix_user_liked_artist_artist_id', 'user_liked_artist', ['artist_id'], False),
+]
+
+
+def upgrade() -> None:
+    # Unique indexes can't be built over existing duplicates, keep the oldest row of each
+    for _, table, columns, unique in INDEXES:
+        if unique:
+            key = ', '.join(columns)
+            op.execute(sa.text(
+                f'DELETE FROM {table} WHERE id IN ('
+                f'SELECT id FROM (SELECT id, row_number() OVER (PARTITION BY {key} ORDER BY id) AS n '
+                f'FROM {table}) ranked WHERE n > 1)'
+            ))
+
+    # CONCURRENTLY can't run inside a transaction, and it doesn't block writes
+    # while the index is built. If a build fails it leaves an INVALID index that
+    # has to be dropped before running the migration again.
+    with op.get_context().autocommit_block():
+        for name, table, columns, unique in INDEXES:
+            op.create_index(name, table, columns, unique=unique, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
@@ -0,0 +1,50 @@
+"""Added track and lyrics search vectors and trigram indexes
+
+Revision ID: 5f3a9c2e7b14
+Revises: e9ceb7fa090e
+Create Date: 2026-10-17 17:12:40.581226
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f3a9c2e7b14'
+down_revision: Union[str, None] = 'e9ceb7fa090e'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # Stored generated columns are computed for every existing row, which rewrites both tables once
+    op.add_column('track', sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed(
+        "setweight(to_tsvector('simple'::regconfig, coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('simple'::regconfig, coalesce(artists, '')), 'B')", persisted=True), nullable=True))
+    op.add_column('lyrics', sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed(
+        "to_tsvector('simple'::regconfig, coalesce(text, ''))", persisted=True), nullable=True))
+
+    with op.get_context().autocommit_block():
+        op.create_index('ix_track_search_vector', 'track', ['search_vector'], unique=False,
+                        postgresql_using='gin', postgresql_concurrently=True)
+        op.create_index('ix_lyrics_search_vector', 'lyrics', ['search_vector'], unique=False,
+                        postgresql_using='gin', postgresql_concurrently=True)
+        op.create_index('ix_track_title_trgm', 'track', ['title'], unique=False, postgresql_using='gin',
+                        postgresql_ops={'title': 'gin_trgm_ops'}, postgresql_concurrently=True)
+        op.create_index('ix_track_artists_trgm', 'track', ['artists'], unique=False, postgresql_using='gin',
+                        postgresql_ops={'artists': 'gin_trgm_ops'}, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_track_artists_trgm', table_name='track', postgresql_concurrently=True)
+        op.drop_index('ix_track_title_trgm', table_name='track', postgresql_concurrently=True)
+        op.drop_index('ix_lyrics_search_vector', table_name='lyrics', postgresql_concurrently=True)
+        op.drop_index('ix_track_search_vector', table_name='track', postgresql_concurrently=True)
+    op.drop_column('lyrics', 'search_vector')
+    op.drop_column('track', 'search_vector')
+    # pg_trgm is left installed, other database objects may depend on it
@@ -0,0 +1,50 @@
+"""Converted artist.json to JSONB and added projected columns
+
+Revision ID: 9e4c61f0b2d8
+Revises: 3b7b7d2a1a61
+Create Date: 2026-10-17 16:31:47.102388
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9e4c61f0b2d8'
+down_revision: Union[str, None] = '3b7b7d2a1a61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.alter_column('artist', 'json',
+               existing_type=sa.String(),
+               type_=postgresql.JSONB(astext_type=sa.Text()),
+               existing_nullable=True,
+               postgresql_using='json::jsonb')
+    op.add_column('artist', sa.Column('name', sa.String(), nullable=True))
+    op.add_column('artist', sa.Column('avatar_url', sa.String(), nullable=True))
+    op.add_column('artist', sa.Column('popularity', sa.Integer(), nullable=True))
+    op.add_column('artist', sa.Column('followers_count', sa.Integer(), nullable=True))
+    op.add_column('artist', sa.Column('genres', postgresql.ARRAY(sa.String()), nullable=True))
+    op.create_index('ix_artist_name_lower', 'artist', [sa.text('lower(name)')], unique=False)
+    op.create_index('ix_artist_popularity', 'artist', ['popularity'], unique=False)
+    # Existing rows are filled in batches by `python -m db.backfill artist-columns`
+
+
+def downgrade() -> None:
+    op.drop_index('ix_artist_popularity', table_name='artist')
+    op.drop_index('ix_artist_name_lower', table_name='artist')
+    op.drop_column('artist', 'genres')
+    op.drop_column('artist', 'followers_count')
+    op.drop_column('artist', 'popularity')
+    op.drop_column('artist', 'avatar_url')
+    op.drop_column('artist', 'name')
+    op.alter_column('artist', 'json',
+               existing_type=postgresql.JSONB(astext_type=sa.Text()),
+               type_=sa.String(),
+               existing_nullable=True,
+               postgresql_using='json::text')
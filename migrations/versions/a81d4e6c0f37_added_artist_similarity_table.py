@@ -0,0 +1,34 @@
+"""Added artist_similarity table
+
+Revision ID: a81d4e6c0f37
+Revises: 5f3a9c2e7b14
+Create Date: 2026-10-17 17:36:08.914352
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a81d4e6c0f37'
+down_revision: Union[str, None] = '5f3a9c2e7b14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('artist_similarity',
+    sa.Column('artist_id', sa.Integer(), nullable=False),
+    sa.Column('neighbors', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('computed_at', sa.DateTime(), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['artist_id'], ['artist.genius_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('artist_id')
+    )
+    # Filled by `python -m services.similarity`, /related_artists ranks by genres until then
+
+
+def downgrade() -> None:
+    op.drop_table('artist_similarity')
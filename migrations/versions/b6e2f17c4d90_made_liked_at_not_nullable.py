@@ -0,0 +1,33 @@
+"""Made liked_at not nullable
+
+Revision ID: b6e2f17c4d90
+Revises: a81d4e6c0f37
+Create Date: 2026-10-17 18:12:40.581306
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6e2f17c4d90'
+down_revision: Union[str, None] = 'a81d4e6c0f37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The keyset cursor compares (liked_at, id), a NULL liked_at would drop the like from every page.
+    # When it was liked is unknown, so these sort after every dated like
+    for table in ('user_liked_track', 'user_liked_artist'):
+        op.execute(f"UPDATE {table} SET liked_at = 'epoch' WHERE liked_at IS NULL")
+        op.alter_column(table, 'liked_at', existing_type=sa.DateTime(),
+                        existing_server_default=sa.text('now()'), nullable=False)
+
+
+def downgrade() -> None:
+    for table in ('user_liked_artist', 'user_liked_track'):
+        op.alter_column(table, 'liked_at', existing_type=sa.DateTime(),
+                        existing_server_default=sa.text('now()'), nullable=True)
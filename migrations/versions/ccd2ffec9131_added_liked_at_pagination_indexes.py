@@ -0,0 +1,33 @@
+"""Added liked_at pagination indexes
+
+Revision ID: ccd2ffec9131
+Revises: 437e01854ab3
+Create Date: 2026-10-17 16:41:12.870254
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'ccd2ffec9131'
+down_revision: Union[str, None] = '437e01854ab3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_user_liked_track_user_id_liked_at_id', 'user_liked_track',
+                        ['user_id', 'liked_at', 'id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_user_liked_artist_user_id_liked_at_id', 'user_liked_artist',
+                        ['user_id', 'liked_at', 'id'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_user_liked_artist_user_id_liked_at_id', table_name='user_liked_artist',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_user_liked_track_user_id_liked_at_id', table_name='user_liked_track',
+                      postgresql_concurrently=True)
@@ -0,0 +1,36 @@
+"""Added artist_word_count table and artist.top_words
+
+Revision ID: e9ceb7fa090e
+Revises: ccd2ffec9131
+Create Date: 2026-10-17 16:58:33.204617
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e9ceb7fa090e'
+down_revision: Union[str, None] = 'ccd2ffec9131'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('artist_word_count',
+    sa.Column('artist_id', sa.Integer(), nullable=False),
+    sa.Column('word', sa.String(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['artist_id'], ['artist.genius_id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('artist_id', 'word')
+    )
+    op.add_column('artist', sa.Column('top_words', postgresql.ARRAY(sa.String()), nullable=True))
+    # Counts for already stored lyrics are filled by `python -m db.backfill word-counts`
+
+
+def downgrade() -> None:
+    op.drop_column('artist', 'top_words')
+    op.drop_table('artist_word_count')
@@ -1,9 +1,12 @@
-from pydantic import BaseModel, Field
-from datetime import date
-from typing import List, Dict, Optional
+from pydantic import BaseModel, ConfigDict, Field
+from datetime import date, datetime
+from typing import List, Dict, Optional, Literal
 
 
 class GeniusArtist(BaseModel):
+    # Stored artist json holds field names, Genius responses hold the aliases
+    model_config = ConfigDict(populate_by_name=True)
+
     id: int
     name: str
     alternate_names: list[str] | None
@@ -16,6 +19,8 @@ class GeniusArtist(BaseModel):
 
 
 class SpotifyArtist(BaseModel):
+    # Unknown for artists stored before it was kept
+    id: str | None = None
     name: str
     avatar_photo: str
     popularity: int
@@ -46,6 +51,24 @@ class Lyrics(BaseModel):
     text: str | None
 
 
+class StoredTrack(BaseModel):
+    artist_id: int
+    spotify_song_id: str
+    artists: str | None
+    title: str
+    release_date: datetime | None
+    cover_url: str | None
+    preview_url: str | None
+
+
+class TrackBundle(BaseModel):
+    track: StoredTrack
+    details: SpotifyTrackDetails | None
+    lyrics: Lyrics | None
+    # pending while the enrichment worker is still fetching the details or lyrics
+    status: Literal["complete", "pending"] = "complete"
+
+
 class LyricsUpdateRequest(BaseModel):
     id: str
     lyrics: str
@@ -90,3 +113,67 @@ class ArtistRead(BaseModel):
     genius_id: int
     name: str
     cover_url: Optional[str]
+
+
+class TrackSearchResult(TrackRead):
+    rank: float
+    # Lyrics fragments around the matched words, None for fuzzy matches
+    snippet: Optional[str] = None
+
+
+class TrackSearchPage(BaseModel):
+    items: List[TrackSearchResult]
+    # Set when no words matched and the items are fuzzy title/artist matches,
+    # pass it back together with next_offset to get the next page
+    fuzzy: bool = False
+    next_offset: Optional[int] = None
+
+
+class NameSuggestion(BaseModel):
+    kind: Literal["artist", "track"]
+    name: str
+    # genius_id of the artist, or of the track's artist
+    artist_id: int
+    spotify_song_id: Optional[str] = None
+    artists: Optional[str] = None
+
+
+class LikedTracksPage(BaseModel):
+    items: List[TrackRead]
+    # Pass back as `cursor` to get the next page, None on the last one
+    next_cursor: Optional[str] = None
+
+
+class LikedArtistsPage(BaseModel):
+    items: List[ArtistRead]
+    next_cursor: Optional[str] = None
+
+
+class TrackLikeOperation(BaseModel):
+    action: Literal["like", "unlike"]
+    track_id: str
+
+
+class ArtistLikeOperation(BaseModel):
+    action: Literal["like", "unlike"]
+    artist_id: int
+
+
+class LikesBatch(BaseModel):
+    # Operations are replayed in order, the last one for an item wins
+    tracks: List[TrackLikeOperation] = Field(default_factory=list, max_length=500)
+    artists: List[ArtistLikeOperation] = Field(default_factory=list, max_length=500)
+
+
+class TrackLikeResult(TrackLikeOperation):
+    # liked, unliked, unchanged, not_found or superseded
+    status: str
+
+
+class ArtistLikeResult(ArtistLikeOperation):
+    status: str
+
+
+class LikesBatchResult(BaseModel):
+    tracks: List[TrackLikeResult]
+    artists: List[ArtistLikeResult]
@@ -1,14 +1,18 @@
-import re
+import asyncio
 import aiohttp
 
+from concurrent.futures import Executor
 from fastapi import HTTPException
-from bs4 import BeautifulSoup
+from core.http_cache import HttpCache, cached_get
 from schemas.service_schemas import GeniusArtist
+from services.lyrics_extraction import LyricsExtractor, extract_lyrics
 
 
 class GeniusAPI:
-    def __init__(self, access_token: str):
+    def __init__(self, access_token: str, session: aiohttp.ClientSession, http_cache: HttpCache | None = None):
         self._token = access_token
+        self.session = session
+        self.http_cache = http_cache
         self.request_params = {
             "access_token": self._token
         }
@@ -22,15 +26,13 @@ class GeniusAPI:
         return False
 
     async def get_artist_id(self, artist_name: str) -> int:
-        async with aiohttp.ClientSession() as session:
-            url = "http://api.genius.com/search"
-            request_params = self.request_params
-            request_params['q'] = artist_name
-            async with session.get(url=url, params=request_params) as response:
-                if response.status != 200:
-                    raise HTTPException(
-                        status_code=response.status, detail="Failed to fetch Genius data")
-                data = await response.json()
+        url = "http://api.genius.com/search"
+        request_params = {**self.request_params, 'q': artist_name}
+        async with self.session.get(url=url, params=request_params) as response:
+            if response.status != 200:
+                raise HTTPException(
+                    status_code=response.status, detail="Failed to fetch Genius data")
+            data = await response.json()
 
         hits = data.get("response", {}).get("hits", [])
 
@@ -60,13 +62,12 @@ class GeniusAPI:
             "The artist name is incorrect or there is no such artist on Genius :(")
 
     async def get_artist(self, artist_id: int) -> GeniusArtist:
-        async with aiohttp.ClientSession() as session:
-            url = f"http://api.genius.com/artists/{artist_id}"
-            async with session.get(url=url, params=self.request_params) as response:
-                if response.status != 200:
-                    raise HTTPException(
-                        status_code=response.status, detail="Failed to fetch Genius data")
-                data = await response.json()
+        url = f"http://api.genius.com/artists/{artist_id}"
+        response = await cached_get(self.http_cache, self.session, "genius_artist", url, params=self.request_params)
+        if response.status != 200:
+            raise HTTPException(
+                status_code=response.status, detail="Failed to fetch Genius data")
+        data = response.json()
 
         artist_dict: dict = data["response"]["artist"]
         if artist_dict["image_url"].startswith("https://assets.genius.com/images/default_avatar"):
@@ -75,16 +76,14 @@ class GeniusAPI:
         return artist
 
     async def get_artist_song(self, artist_name: str, track_title: str):
-        async with aiohttp.ClientSession() as session:
-            url = "http://api.genius.com/search"
-            request_params = self.request_params
-            query = f"{artist_name} {track_title}"
-            request_params['q'] = query
-            async with session.get(url=url, params=request_params) as response:
-                if response.status != 200:
-                    raise HTTPException(
-                        status_code=response.status, detail="Failed to fetch Genius data")
-                data = await response.json()
+        url = "http://api.genius.com/search"
+        query = f"{artist_name} {track_title}"
+        request_params = {**self.request_params, 'q': query}
+        async with self.session.get(url=url, params=request_params) as response:
+            if response.status != 200:
+                raise HTTPException(
+                    status_code=response.status, detail="Failed to fetch Genius data")
+            data = await response.json()
 
         hits = data.get("response", {}).get("hits", [])
 
@@ -95,26 +94,22 @@ class GeniusAPI:
 
 
 class GeniusParser:
-    async def get_songs_text(self, track_url: str) -> list[str]:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(track_url) as response:
-                html = await response.text()
-        soup = BeautifulSoup(html, 'lxml')
-        lyrics_div = soup.find_all('div', attrs={"class": re.compile(
-            r"^Lyrics__Container-sc-")})  # Lyrics-sc-7c7d0940-1 gVRfzh
-
-        if not lyrics_div:
-            return None
-
-        full_text = "\n".join(div.get_text(separator="\n").strip()
-                              for div in lyrics_div)
-
-        start_keywords = ["[Intro", "[Verse", "[Chorus", "[Bridge", "[Outro", "[Refrain",
-                          "[Post-Chorus", "[Pre-Chorus", "[Breakdown", "[Interlude:", "[Skit:"]
-        for keyword in start_keywords:
-            idx = full_text.find(keyword)
-            if idx != -1:
-                full_text = full_text[idx:]
-                break
-
-        return full_text
+    chunk_size = 64 * 1024
+
+    def __init__(self, session: aiohttp.ClientSession, executor: Executor | None = None):
+        self.session = session
+        # Optionally parse in a process pool, off the event loop, at the cost of downloading the whole page
+        self.executor = executor
+
+    async def get_songs_text(self, track_url: str) -> str | None:
+        async with self.session.get(track_url) as response:
+            if self.executor is not None:
+                html = await response.read()
+                return await asyncio.get_running_loop().run_in_executor(self.executor, extract_lyrics, html)
+
+            # The rest of the page isn't downloaded once the lyrics are parsed
+            extractor = LyricsExtractor()
+            async for chunk in response.content.iter_chunked(self.chunk_size):
+                if extractor.feed(chunk):
+                    break
+        return extractor.result()
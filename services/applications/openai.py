@@ -1,11 +1,22 @@
+import httpx
 import openai
+import asyncio
+
+from typing import AsyncIterator
 
 
 class OpenAIClient:
-    def __init__(self, openai_key: str):
-        openai.api_key = openai_key
+    def __init__(self, openai_key: str, http_client: httpx.AsyncClient,
+                 base_url: str | None = None, max_concurrency: int = 100):
+        # An empty key still lets the app start, calls then fail with an OpenAIError
+        self.client = openai.AsyncOpenAI(api_key=openai_key or "", base_url=base_url,
+                                         http_client=http_client)
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def close(self):
+        await self.client.close()
 
-    def analyze_text(self, text: str, level: str, language: str):
+    def analysis_messages(self, text: str, level: str, language: str) -> list[dict]:
         prompt = (
             f""""You are a highly skilled language teacher. 
             Your task is to translate the following text into the candidate's target language, 
@@ -16,40 +27,57 @@ class OpenAIClient:
             f"Candidate's proficiency level: {level}\n"
         )
 
-        try:
-            response = openai.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system",
-                        "content": "You are an experienced language teacher."},
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            reply = response.choices[0].message.content
-            return {
-                "analysis": reply.strip()
-            }
-        except openai.OpenAIError as e:
-            raise RuntimeError(f"Error OpenAI API: {str(e)}")
-
-    def chat(self, message: str, history: list):
-        if history is None:
-            history = []
+        return [
+            {"role": "system",
+                "content": "You are an experienced language teacher."},
+            {"role": "user", "content": prompt}
+        ]
 
+    def chat_messages(self, message: str, history: list | None) -> list[dict]:
         messages = [
             {"role": "system", "content": "You are a helpful assistant and an experienced language teacher."}]
-        messages += history
+        messages += history or []
         messages.append({"role": "user", "content": message})
+        return messages
+
+    async def complete(self, messages: list[dict]) -> str:
+        try:
+            async with self._semaphore:
+                response = await self.client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=messages
+                )
+            return response.choices[0].message.content
+        except openai.OpenAIError as e:
+            raise RuntimeError(f"Error OpenAI API: {str(e)}")
 
+    async def stream(self, messages: list[dict]) -> AsyncIterator[str]:
         try:
-            response = openai.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=messages)
-            reply = response.choices[0].message.content
-
-            return {
-                "reply": reply.strip(),
-                "history": history + [{"role": "user", "content": message}, {"role": "assistant", "content": reply}]
-            }
+            async with self._semaphore:
+                response = await self.client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=messages,
+                    stream=True
+                )
+                async for chunk in response:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
         except openai.OpenAIError as e:
             raise RuntimeError(f"Error OpenAI API: {str(e)}")
+
+    async def analyze_text(self, text: str, level: str, language: str):
+        reply = await self.complete(self.analysis_messages(text, level, language))
+        return {
+            "analysis": reply.strip()
+        }
+
+    async def chat(self, message: str, history: list):
+        if history is None:
+            history = []
+
+        reply = await self.complete(self.chat_messages(message, history))
+
+        return {
+            "reply": reply.strip(),
+            "history": history + [{"role": "user", "content": message}, {"role": "assistant", "content": reply}]
+        }
@@ -1,16 +1,17 @@
 import aiohttp
-import os
-import base64
-import time
-import random
+import asyncio
+import threading
 import cloudscraper
 
 from core.logger import logger
+from core.scraping import ScrapingExecutor
+from core.http_cache import HttpCache, UpstreamResponse, cached_get
+from services.applications.spotify_token import SpotifyTokenManager
 from bs4 import BeautifulSoup
 from schemas.service_schemas import SpotifyArtist, SpotifyTrack, SpotifyTrackDetails
 
 
-scraper = cloudscraper.create_scraper()
+_local = threading.local()
 headers = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/114.0.0.0 Safari/537.36",
     "Accept-Language": "en-US,en;q=0.9",
@@ -18,64 +19,91 @@ headers = {
 }
 
 
-class SpotifyAPI:
-    def __init__(self, access_token: str, client_id: str, client_secret: str) -> None:
-        self._token = access_token
-        self.client_id = client_id
-        self.client_secret = client_secret
-        self.dheaders = {
-            "Authorization": f"Bearer {access_token}",
-            "Content-Type": "application/x-www-form-urlencoded"
-        }
+def get_scraper() -> cloudscraper.CloudScraper:
+    # One scraper per executor thread, requests sessions are not thread-safe
+    if not hasattr(_local, "scraper"):
+        _local.scraper = cloudscraper.create_scraper()
+    return _local.scraper
 
-    async def refresh_token(self):
-        auth_base64 = base64.b64encode(
-            f"{self.client_id}:{self.client_secret}".encode()).decode()
 
-        url = f"https://accounts.spotify.com/api/token"
-        headers = {
-            "Content-Type": "application/x-www-form-urlencoded",
-            "Authorization": f"Basic {auth_base64}"
-        }
+def fetch_page(url: str, validators: dict[str, str]) -> UpstreamResponse:
+    response = get_scraper().get(url=url, headers={**headers, **validators})
+    return UpstreamResponse.from_headers(response.status_code, response.headers, response.text)
 
-        data = {
-            "grant_type": "refresh_token",
-            "refresh_token": os.environ["SPOTIFY_REFRESH"]
-        }
 
-        async with aiohttp.ClientSession() as session:
-            async with session.post(url=url, data=data, headers=headers) as response:
-                resp_text = await response.json()
+def parse_track_details(html: str) -> SpotifyTrackDetails:
+    soup = BeautifulSoup(html, "lxml")
+
+    key = soup.find("p", string="Key").find_previous_sibling(
+        "p").get_text(strip=True)
+    bpm = soup.find("p", string="BPM").find_previous_sibling(
+        "p").get_text(strip=True)
+    camelot = soup.find("p", string="Camelot").find_previous_sibling(
+        "p").get_text(strip=True)
+    popularity = soup.find("p", string="Popularity").find_previous_sibling(
+        "p").get_text(strip=True)
+    energy = soup.find(
+        "div", class_="ant-col GFAiD Vwk-7 qYBvC ant-col-xs-8 ant-col-sm-8").get_text(strip=True)
+    danceability = soup.find(
+        "div", class_="ant-col GFAiD qYBvC ant-col-xs-8 ant-col-sm-8").get_text(strip=True)
+    happiness = soup.find(
+        "div", class_="ant-col GFAiD qYBvC Vwk-7 ant-col-xs-8 ant-col-sm-8").get_text(strip=True)
 
-                self._token = resp_text["access_token"]
-                self.dheaders["Authorization"] = f"Bearer {self._token}"
+    return SpotifyTrackDetails(
+        key=key,
+        bpm=bpm,
+        camelot=camelot,
+        popularity=popularity,
+        energy=energy,
+        danceability=danceability,
+        happiness=happiness
+    )
+
+
+class SpotifyAPI:
+    def __init__(self, tokens: SpotifyTokenManager, session: aiohttp.ClientSession, scraper: ScrapingExecutor,
+                 http_cache: HttpCache | None = None) -> None:
+        self.tokens = tokens
+        self.session = session
+        self.scraper = scraper
+        self.http_cache = http_cache
+
+    async def request(self, endpoint: str, url: str, params: dict | None = None) -> UpstreamResponse:
+        """GET with the shared access token, through the cache for the endpoints that have a TTL."""
+        token = await self.tokens.get_token()
+        response = await cached_get(self.http_cache, self.session, endpoint, url, params=params,
+                                    headers={"Authorization": f"Bearer {token}"})
+        if response.status != 401:
+            return response
+
+        # Revoked before its expiry, retried once with a new one
+        await self.tokens.invalidate(token)
+        token = await self.tokens.get_token()
+        return await cached_get(self.http_cache, self.session, endpoint, url, params=params,
+                                headers={"Authorization": f"Bearer {token}"})
 
     async def get_artist_id(self, artist_name: str) -> int:
-        async with aiohttp.ClientSession() as session:
-            url = f"https://api.spotify.com/v1/search"
-            params = {
-                'q': artist_name,
-                'type': "artist"
-            }
-            async with session.get(url=url, headers=self.dheaders, params=params) as response:
-                data = await response.json()
+        url = f"https://api.spotify.com/v1/search"
+        params = {
+            'q': artist_name,
+            'type': "artist"
+        }
+        response = await self.request("spotify_search", url, params=params)
+        if response.status != 200:
+            raise Exception(
+                f"Spotify API error: {response.status}, response: {response.body}")
 
-        try:
-            artists = data["artists"]
-        except KeyError:
-            await self.refresh_token()
-            return await self.get_artist_id(artist_name)
-        first_artist_id = artists['items'][0]['id']
+        first_artist_id = response.json()["artists"]['items'][0]['id']
         return first_artist_id
 
     async def get_artist(self, artist_id: int):
-        async with aiohttp.ClientSession() as session:
-            url = f"https://api.spotify.com/v1/artists/{artist_id}"
-            async with session.get(url=url, headers=self.dheaders) as response:
-                data = await response.json()
+        url = f"https://api.spotify.com/v1/artists/{artist_id}"
+        response = await self.request("spotify_artist", url)
 
         try:
+            data = response.json()
             artist = SpotifyArtist(
+                id=data["id"],
                 name=data["name"],
                 genres=data["genres"],
                 followers_count=data["followers"]["total"],
@@ -87,23 +115,17 @@ class SpotifyAPI:
             raise Exception(f"Error while searching for an artist: {e}")
 
     async def get_track_id(self, artist_name: str, title: str) -> str:
-        async with aiohttp.ClientSession() as session:
-            url = f"https://api.spotify.com/v1/search"
-            params = {
-                'q': f"{artist_name} {title}",
-                'type': "track",
-                'limit': 1
-            }
-            async with session.get(url=url, headers=self.dheaders, params=params) as response:
-                if response.status == 401:  # If the token has expired, refresh it
-                    await self.refresh_token()
-                    return await self.get_track_id(artist_name, title)
-
-                if response.status != 200:
-                    error_data = await response.text()  # Get the error message
-                    raise Exception(
-                        f"Spotify API error: {response.status}, response: {error_data}")
-                data = await response.json()
+        url = f"https://api.spotify.com/v1/search"
+        params = {
+            'q': f"{artist_name} {title}",
+            'type': "track",
+            'limit': 1
+        }
+        response = await self.request("spotify_search", url, params=params)
+        if response.status != 200:
+            raise Exception(
+                f"Spotify API error: {response.status}, response: {response.body}")
+        data = response.json()
 
         tracks = data.get("tracks", {}).get("items", [])
         track_id = tracks[0]["id"]
@@ -119,14 +141,12 @@ class SpotifyAPI:
         except Exception as e:
             raise Exception(f"Error while searching for track_id: {str(e)}")
 
-        async with aiohttp.ClientSession() as session:
-            url = f"https://api.spotify.com/v1/tracks/{track_id}"
-            async with session.get(url=url, headers=self.dheaders) as response:
-                if response.status != 200:
-                    raise Exception(
-                        f"Spotify API request error (get_current_track): HTTP {response.status}")
-
-                data = await response.json()
+        url = f"https://api.spotify.com/v1/tracks/{track_id}"
+        response = await self.request("spotify_track", url)
+        if response.status != 200:
+            raise Exception(
+                f"Spotify API request error (get_current_track): HTTP {response.status}")
+        data = response.json()
 
         try:
             track = SpotifyTrack(
@@ -144,10 +164,9 @@ class SpotifyAPI:
                 f"Error processing track data: missing key {str(e)}")
 
     async def get_artist_top_tracks(self, artist_id: str) -> list[SpotifyTrack]:
-        async with aiohttp.ClientSession() as session:
-            url = f"https://api.spotify.com/v1/artists/{artist_id}/top-tracks?market=ES"
-            async with session.get(url=url, headers=self.dheaders) as response:
-                data = await response.json(content_type=None)
+        url = f"https://api.spotify.com/v1/artists/{artist_id}/top-tracks?market=ES"
+        response = await self.request("spotify_top_tracks", url)
+        data = response.json()
 
         tracks = data.get("tracks", [])
 
@@ -173,41 +192,20 @@ class SpotifyAPI:
 
         url = f"https://tunebat.com/Info/-/{track_id}"
 
+        async def fetch(validators: dict[str, str]) -> UpstreamResponse:
+            # Scraping and parsing are blocking, keep them off the event loop
+            return await self.scraper.run(fetch_page, url, validators)
+
         try:
-            response = scraper.get(url=url, headers=headers)
-
-            if response.status_code == 200:
-
-                soup = BeautifulSoup(response.content, "lxml")
-
-                key = soup.find("p", string="Key").find_previous_sibling(
-                    "p").get_text(strip=True)
-                bpm = soup.find("p", string="BPM").find_previous_sibling(
-                    "p").get_text(strip=True)
-                camelot = soup.find("p", string="Camelot").find_previous_sibling(
-                    "p").get_text(strip=True)
-                popularity = soup.find("p", string="Popularity").find_previous_sibling(
-                    "p").get_text(strip=True)
-                energy = soup.find(
-                    "div", class_="ant-col GFAiD Vwk-7 qYBvC ant-col-xs-8 ant-col-sm-8").get_text(strip=True)
-                danceability = soup.find(
-                    "div", class_="ant-col GFAiD qYBvC ant-col-xs-8 ant-col-sm-8").get_text(strip=True)
-                happiness = soup.find(
-                    "div", class_="ant-col GFAiD qYBvC Vwk-7 ant-col-xs-8 ant-col-sm-8").get_text(strip=True)
-
-                track_details = SpotifyTrackDetails(
-                    key=key,
-                    bpm=bpm,
-                    camelot=camelot,
-                    popularity=popularity,
-                    energy=energy,
-                    danceability=danceability,
-                    happiness=happiness
-                )
-                time.sleep(random.uniform(1, 2))
-                return track_details
+            if self.http_cache is None:
+                response = await fetch({})
             else:
+                response = await self.http_cache.get("tunebat", url, None, fetch)
+
+            if response.status != 200:
                 logger.info(
-                    f"[Tunebat] status={response.status_code} url={url}")
+                    f"[Tunebat] status={response.status} url={url}")
+                return None
+            return await asyncio.to_thread(parse_track_details, response.body)
         except Exception as e:
             logger.exception(f"An error occurred at the URL {url}: {e}")
@@ -0,0 +1,142 @@
+import time
+import base64
+import asyncio
+import aiohttp
+
+from core import config
+from core.logger import logger
+from core.single_flight import SingleFlight, DistributedSingleFlight
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+
+
+TOKEN_URL = "https://accounts.spotify.com/api/token"
+
+
+class SpotifyTokenManager:
+    """
+    Spotify access token of the process, shared with the other workers through Redis.
+
+    The token is refreshed refresh_margin seconds before it expires, by the
+    background task started with start() or, failing that, by the first call
+    finding it about to expire. Refreshes are coalesced in-process and, with
+    Redis, across workers: the others wait for the lock and then pick up the
+    new token from Redis instead of requesting their own.
+    """
+
+    redis_key = "spotify:token"
+
+    def __init__(self, session: aiohttp.ClientSession, client_id: str, client_secret: str,
+                 refresh_token: str | None, redis_client: Redis | None, refresh_margin: float,
+                 lock_timeout: float = 10, wait_timeout: float = 10):
+        self.session = session
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.refresh_token = refresh_token
+        self.redis_client = redis_client
+        self.refresh_margin = refresh_margin
+        self._token: str | None = None
+        self._expires_at = 0.0
+        self._flight = DistributedSingleFlight(redis_client, lock_timeout=lock_timeout, wait_timeout=wait_timeout) \
+            if redis_client is not None else SingleFlight()
+        self._task: asyncio.Task | None = None
+
+    def _usable(self, expires_at: float) -> bool:
+        return expires_at - self.refresh_margin > time.time()
+
+    async def get_token(self) -> str:
+        if self._token is not None and self._usable(self._expires_at):
+            return self._token
+        return await self._flight.do(self.redis_key, self._refresh)
+
+    async def _load_shared(self) -> bool:
+        """Adopt the token another worker stored, if it is still good."""
+        if self.redis_client is None:
+            return False
+        try:
+            raw = await self.redis_client.get(self.redis_key)
+        except RedisError as e:
+            logger.warning(f"[spotify] could not read the shared token: {e}")
+            return False
+
+        expires_at, sep, token = (raw or "").partition("|")
+        if not sep or not self._usable(float(expires_at)):
+            return False
+        self._token, self._expires_at = token, float(expires_at)
+        return True
+
+    async def _refresh(self) -> str:
+        if await self._load_shared():
+            return self._token
+
+        token, expires_in = await self._request_token()
+        self._token, self._expires_at = token, time.time() + expires_in
+        logger.info(f"[spotify] access token refreshed, expires in {expires_in}s")
+
+        if self.redis_client is not None:
+            try:
+                await self.redis_client.set(self.redis_key, f"{self._expires_at}|{token}", ex=int(expires_in))
+            except RedisError as e:
+                logger.warning(f"[spotify] could not share the token: {e}")
+        return token
+
+    async def _request_token(self) -> tuple[str, float]:
+        auth_base64 = base64.b64encode(f"{self.client_id}:{self.client_secret}".encode()).decode()
+        headers = {
+            "Content-Type": "application/x-www-form-urlencoded",
+            "Authorization": f"Basic {auth_base64}"
+        }
+        # Without a user refresh token the app's own client credentials are enough for catalog reads
+        data = {"grant_type": "refresh_token", "refresh_token": self.refresh_token} if self.refresh_token \
+            else {"grant_type": "client_credentials"}
+
+        async with self.session.post(url=TOKEN_URL, data=data, headers=headers) as response:
+            if response.status != 200:
+                raise Exception(f"Spotify token refresh failed: {response.status}, {await response.text()}")
+            payload = await response.json()
+        return payload["access_token"], float(payload["expires_in"])
+
+    async def invalidate(self, token: str):
+        """Drop a token Spotify rejected before its expiry, so the next call refreshes it."""
+        if token == self._token:
+            self._expires_at = 0.0
+        if self.redis_client is None:
+            return
+        try:
+            raw = await self.redis_client.get(self.redis_key)
+            if raw and raw.partition("|")[2] == token:
+                await self.redis_client.delete(self.redis_key)
+        except RedisError as e:
+            logger.warning(f"[spotify] could not drop the shared token: {e}")
+
+    async def _keep_fresh(self, retry_delay: float):
+        while True:
+            try:
+                await self.get_token()
+                delay = max(self._expires_at - self.refresh_margin - time.time(), 1)
+            except Exception as e:
+                logger.warning(f"[spotify] token refresh failed, retrying in {retry_delay}s: {e!r}")
+                delay = retry_delay
+            await asyncio.sleep(delay)
+
+    def start(self, retry_delay: float = 10):
+        """Refresh the token ahead of its expiry in the background."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._keep_fresh(retry_delay))
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+def create_spotify_tokens(session: aiohttp.ClientSession, redis_client: Redis | None) -> SpotifyTokenManager:
+    return SpotifyTokenManager(
+        session, config.SPOTIFY_ID, config.SPOTIFY_SECRET, config.SPOTIFY_REFRESH, redis_client,
+        refresh_margin=config.SPOTIFY_TOKEN_REFRESH_MARGIN,
+        lock_timeout=config.COALESCE_LOCK_TIMEOUT, wait_timeout=config.COALESCE_WAIT_TIMEOUT
+    )
@@ -0,0 +1,186 @@
+import re
+import bisect
+import unicodedata
+
+from array import array
+from collections import Counter
+from typing import Iterable
+from core.logger import logger
+from db.database import async_session_maker
+from db.db_manager import DatabaseManager
+from schemas.service_schemas import NameSuggestion, SpotifyTrack
+
+
+NON_WORD = re.compile(r"[\W_]+")
+# Each key is scanned once per query, short prefixes match far more names than a page needs
+MAX_PREFIX_SCAN = 500
+# Ambiguous names, held by several artists, never resolve locally
+AMBIGUOUS = -1
+# Up to this many new keys are inserted in place, past it re-sorting the whole list is cheaper
+MAX_INSORT_KEYS = 128
+
+
+def normalize(text: str) -> str:
+    """Casefold, drop accents and punctuation, and collapse whitespace."""
+    text = unicodedata.normalize("NFKD", text.casefold())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(NON_WORD.sub(" ", text).split())
+
+
+def trigrams(text: str) -> set[str]:
+    """Trigrams of each word padded like pg_trgm does, so word order and extra words cost little."""
+    grams = set()
+    for word in text.split(" "):
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class NameIndex:
+    """
+    In-memory autocomplete over stored artist names and track titles.
+
+    Prefixes are looked up by bisecting a sorted list of keys, one key per word
+    a name can be typed from ("the beatles" and "beatles"). Typos are matched by
+    trigram overlap. Everything is rebuilt at startup and updated as artists and
+    tracks are stored by this worker.
+    """
+
+    def __init__(self, min_similarity: float = 0.5):
+        self.min_similarity = min_similarity
+        # (kind, name, artist_id, spotify_song_id, artists, weight, trigram count), tuples
+        # and int arrays keep a catalog of millions of names affordable in every worker
+        self._entries: list[tuple] = []
+        self._ids: dict[tuple[str, str | int], int] = {}
+        self._keys: list[tuple[str, int]] = []
+        # Keys past this position were appended since the last sort()
+        self._sorted = 0
+        self._grams: dict[str, array] = {}
+        self._artist_ids: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _add(self, kind: str, id_: str | int, name: str, artist_id: int, spotify_song_id: str | None,
+             artists: str | None, weight: int):
+        key = normalize(name)
+        if not key or (kind, id_) in self._ids:
+            return
+
+        entry_id = len(self._entries)
+        grams = trigrams(key)
+        self._entries.append((kind, name, artist_id, spotify_song_id, artists, weight, len(grams)))
+        self._ids[(kind, id_)] = entry_id
+
+        words = key.split(" ")
+        self._keys += [(" ".join(words[i:]), entry_id) for i in range(len(words))]
+        for gram in grams:
+            postings = self._grams.get(gram)
+            if postings is None:
+                postings = self._grams[gram] = array("i")
+            postings.append(entry_id)
+
+    def sort(self):
+        """Put the keys appended since the last call in order."""
+        if len(self._keys) - self._sorted <= MAX_INSORT_KEYS:
+            # A request stores one artist at a time, a full sort would still compare every key
+            new_keys = self._keys[self._sorted:]
+            del self._keys[self._sorted:]
+            for key in new_keys:
+                bisect.insort(self._keys, key)
+        else:
+            self._keys.sort()
+        self._sorted = len(self._keys)
+
+    def add_artists(self, artists: Iterable[tuple[int, str, int | None]], sort: bool = True):
+        """Add (genius_id, name, popularity) rows, a bulk load sorts once at the end with sort=False."""
+        for genius_id, name, popularity in artists:
+            if not name:
+                continue
+            self._add("artist", genius_id, name, genius_id, None, None, popularity or 0)
+
+            key = normalize(name)
+            known = self._artist_ids.get(key)
+            self._artist_ids[key] = genius_id if known in (None, genius_id) else AMBIGUOUS
+        if sort:
+            self.sort()
+
+    def add_artist(self, genius_id: int, name: str, popularity: int | None = None):
+        self.add_artists([(genius_id, name, popularity)])
+
+    def add_track_rows(self, tracks: Iterable[tuple[int, str, str, str | None]], sort: bool = True):
+        """Add (artist_id, spotify_song_id, title, artists) rows."""
+        for artist_id, spotify_song_id, title, artists in tracks:
+            if not spotify_song_id or not title:
+                continue
+            self._add("track", spotify_song_id, title, artist_id, spotify_song_id, artists, 0)
+        if sort:
+            self.sort()
+
+    def add_tracks(self, artist_id: int, tracks: list[SpotifyTrack]):
+        self.add_track_rows((artist_id, track.spotify_song_id, track.title, track.artists) for track in tracks)
+
+    def resolve_artist(self, artist_name: str) -> int | None:
+        """Return the genius_id of the only stored artist with exactly this name, ignoring case and accents."""
+        genius_id = self._artist_ids.get(normalize(artist_name))
+        return None if genius_id == AMBIGUOUS else genius_id
+
+    def suggest(self, text: str, limit: int = 10, kind: str | None = None) -> list[NameSuggestion]:
+        """Prefix matches first, most popular first, then typo-tolerant matches by similarity."""
+        query = normalize(text)
+        if not query:
+            return []
+
+        prefix_ids = {}
+        start = bisect.bisect_left(self._keys, (query, -1))
+        for key, entry_id in self._keys[start:start + MAX_PREFIX_SCAN]:
+            if not key.startswith(query):
+                break
+            if kind is None or self._entries[entry_id][0] == kind:
+                # Shortest names first among equally popular ones, they are the closest completions
+                prefix_ids[entry_id] = len(key)
+
+        found = sorted(prefix_ids, key=lambda entry_id: (-self._entries[entry_id][5], prefix_ids[entry_id]))
+        if len(found) < limit and len(query) >= 3:
+            found += self._similar(query, limit - len(found), kind, exclude=prefix_ids)
+
+        return [self._suggestion(entry_id) for entry_id in found[:limit]]
+
+    def _suggestion(self, entry_id: int) -> NameSuggestion:
+        kind, name, artist_id, spotify_song_id, artists, _, _ = self._entries[entry_id]
+        return NameSuggestion(kind=kind, name=name, artist_id=artist_id,
+                              spotify_song_id=spotify_song_id, artists=artists)
+
+    def _similar(self, query: str, limit: int, kind: str | None, exclude: dict) -> list[int]:
+        grams = trigrams(query)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self._grams.get(gram, ()))
+
+        scored = []
+        for entry_id, count in shared.items():
+            entry_kind, _, _, _, _, weight, gram_count = self._entries[entry_id]
+            if entry_id in exclude or (kind and entry_kind != kind):
+                continue
+            # Share of the typed trigrams found in the name, shorter names win ties
+            similarity = count / len(grams)
+            if similarity >= self.min_similarity:
+                scored.append((-similarity, -weight, gram_count, entry_id))
+
+        scored.sort()
+        return [entry_id for *_, entry_id in scored[:limit]]
+
+
+async def build_name_index(min_similarity: float, batch_size: int = 10000) -> NameIndex:
+    """Load every stored artist name and track title, streamed in batches."""
+    index = NameIndex(min_similarity)
+    async with async_session_maker() as session:
+        manager = DatabaseManager(session)
+        async for rows in manager.stream_artist_names(batch_size):
+            index.add_artists(rows, sort=False)
+        async for rows in manager.stream_track_titles(batch_size):
+            index.add_track_rows(rows, sort=False)
+    index.sort()
+
+    logger.info(f"[autocomplete] indexed {len(index)} artist names and track titles")
+    return index
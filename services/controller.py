@@ -1,63 +1,179 @@
 import json
-
+import asyncio
+
+from collections import Counter
+from core import config
+from core.cache import LayeredCache, LocalCache, Uncached
+from core.job_queue import JobQueue
+from core.concurrency import gather_branches
+from core.single_flight import SingleFlight, DistributedSingleFlight
 from core.logger import logger
-from redis import Redis
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
 from hashlib import sha256
 from fastapi import HTTPException
 from services.applications.openai import OpenAIClient
 from services.applications.spotify import SpotifyAPI
 from services.applications.genius import GeniusAPI, GeniusParser
-from schemas.service_schemas import AllStats, SpotifyTrack, GeniusArtist, SpotifyArtist
+from services.word_frequency import count_words, diff_word_counts
+from services.autocomplete import NameIndex
+from schemas.service_schemas import AllStats, SpotifyTrack, GeniusArtist, SpotifyArtist, TrackBundle, Lyrics
 from db.db_manager import DatabaseManager
+from db.database import async_session_maker
+
+
+# Sorted set of genius_id -> decayed request count, read by the refresh scheduler
+ARTIST_REQUESTS_KEY = "refresh:artist_requests"
+
+
+class RequestCounter:
+    """
+    Artist requests counted in memory and added to ARTIST_REQUESTS_KEY in batches.
+
+    Counting is off the request path: record() only bumps a local counter, and
+    the background task started with start() flushes it every flush_interval
+    seconds. Counts of a failed flush are dropped, they only order the refresh.
+    """
+
+    def __init__(self, redis_client: Redis, flush_interval: float):
+        self.redis_client = redis_client
+        self.flush_interval = flush_interval
+        self._counts: Counter[int] = Counter()
+        self._task: asyncio.Task | None = None
+
+    def record(self, genius_artist_id: int):
+        self._counts[genius_artist_id] += 1
+
+    async def flush(self):
+        counts, self._counts = self._counts, Counter()
+        if not counts:
+            return
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for genius_artist_id, count in counts.items():
+                    pipe.zincrby(ARTIST_REQUESTS_KEY, count, str(genius_artist_id))
+                await pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Could not flush the request counts of {len(counts)} artists: {e}")
+
+    async def _flush_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_periodically())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
 
 
 class ArtistController:
     def __init__(self, genius: GeniusAPI, genius_parser: GeniusParser, spotify: SpotifyAPI,
-                 manager: DatabaseManager, redis_client: Redis) -> None:
+                 manager: DatabaseManager, redis_client: Redis, cache: LayeredCache | None = None,
+                 coalescer: SingleFlight | DistributedSingleFlight | None = None,
+                 name_index: NameIndex | None = None, enrichment: JobQueue | None = None,
+                 request_counter: RequestCounter | None = None) -> None:
         self.genius = genius
         self.spotify = spotify
         self.genius_parser = genius_parser
         self.manager = manager
         self.redis_client = redis_client
-
-    def process_json(self, json_str: str) -> str:
-        return json_str.replace('header_photo', 'header_image_url').replace('avatar_photo', 'image_url', 1)
+        self.cache = cache or LayeredCache(
+            redis_client, namespace="artist", ttl=config.ARTIST_CACHE_TTL,
+            stale_ttl=config.ARTIST_CACHE_STALE_TTL,
+            local=LocalCache(config.LOCAL_CACHE_MAX_SIZE, config.LOCAL_CACHE_TTL)
+        )
+        self.coalescer = coalescer or SingleFlight()
+        self.name_index = name_index
+        self.enrichment = enrichment
+        self.request_counter = request_counter
 
     async def get_artist(self, artist_name: str) -> AllStats:
+        return AllStats.model_validate_json(await self.get_artist_json(artist_name))
+
+    async def get_artist_json(self, artist_name: str) -> str:
+        """Return the serialized AllStats of an artist, served from cache when possible."""
         key = artist_name.lower().strip()
 
-        cache_data = await self.redis_client.get(key)
+        # Artists we already store are resolved in memory, without a Genius search
+        genius_artist_id = self.name_index.resolve_artist(key) if self.name_index else None
 
-        if cache_data:
-            genius_artist_id = int(cache_data)
-        else:
-            genius_artist_id = await self.genius.get_artist_id(key)
+        if genius_artist_id is None:
+            cache_data = await self.redis_client.get(key)
 
-            await self.redis_client.set(key, genius_artist_id, 3600)
+            if cache_data:
+                genius_artist_id = int(cache_data)
+            else:
+                genius_artist_id = await self.genius.get_artist_id(key)
 
-        artist_ = await self.manager.get_artist(genius_artist_id)
-        tracks = await self.manager.get_tracks(genius_artist_id)
+                await self.redis_client.set(key, genius_artist_id, 3600)
 
-        if artist_ and tracks:
-            genius_artist_data = json.loads(self.process_json(artist_.json))
-            spotify_artist_data = json.loads(artist_.json)
-            spotify_tracks = [SpotifyTrack(
-                **track._asdict()).model_dump() for track in tracks]
+        if self.request_counter:
+            self.request_counter.record(genius_artist_id)
 
-            all_stats = AllStats(
-                genius=GeniusArtist(**genius_artist_data["genius"]),
-                spotify=SpotifyArtist(**spotify_artist_data["spotify"]),
-                spotify_tracks=spotify_tracks,
-                most_popular_words=None
-            )
-            return all_stats
+        return await self.cache.get_or_load(
+            str(genius_artist_id),
+            loader=lambda: self.load_artist(artist_name, genius_artist_id),
+            refresher=lambda: self.reload_artist(genius_artist_id)
+        )
+
+    async def build_artist_json(self, manager: DatabaseManager, genius_artist_id: int) -> str | None:
+        artist_ = await manager.get_artist(genius_artist_id)
+        tracks = await manager.get_tracks(genius_artist_id)
 
-        spotify_artist_id = await self.spotify.get_artist_id(artist_name)
+        if not (artist_ and tracks):
+            return None
 
-        spotify_artist = await self.spotify.get_artist(spotify_artist_id)
-        genius_artist = await self.genius.get_artist(genius_artist_id)
+        artist_data = artist_.json
+        spotify_tracks = [SpotifyTrack(
+            **track._asdict()).model_dump() for track in tracks]
 
-        spotify_tracks = await self.spotify.get_artist_top_tracks(spotify_artist_id)
+        all_stats = AllStats(
+            genius=GeniusArtist(**artist_data["genius"]),
+            spotify=SpotifyArtist(**artist_data["spotify"]),
+            spotify_tracks=spotify_tracks,
+            # Precomputed as lyrics are stored, None until the artist has any
+            most_popular_words=artist_.top_words
+        )
+        return all_stats.model_dump_json(by_alias=True)
+
+    async def reload_artist(self, genius_artist_id: int) -> str | None:
+        # Runs in the background after the request is gone, so it needs its own session
+        async with async_session_maker() as session:
+            return await self.build_artist_json(DatabaseManager(session), genius_artist_id)
+
+    async def load_artist(self, artist_name: str, genius_artist_id: int) -> str:
+        # Concurrent cache misses for the same artist, in any worker, share one load.
+        # Misses are rare behind the cache, so the DB check happens under the lock too.
+        async def fetch() -> str:
+            # The shared load serves every waiter, so it can't borrow the session of the request that started it
+            async with async_session_maker() as session:
+                return await self.fetch_artist(DatabaseManager(session), artist_name, genius_artist_id)
+
+        return await self.coalescer.do(f"artist:{genius_artist_id}", fetch)
+
+    async def fetch_artist(self, manager: DatabaseManager, artist_name: str, genius_artist_id: int) -> str:
+        # Another worker may have stored the artist while we were waiting for the lock.
+        # The transaction keeps the check on the primary, a lagging replica would miss that write.
+        async with manager.transaction():
+            artist_json = await self.build_artist_json(manager, genius_artist_id)
+        if artist_json:
+            return artist_json
+
+        # The Genius branch does not depend on the Spotify chain, so both run at once
+        genius_artist, (spotify_artist, spotify_tracks) = await gather_branches(
+            asyncio.wait_for(self.genius.get_artist(genius_artist_id), config.UPSTREAM_TIMEOUT),
+            self.fetch_spotify_artist(artist_name)
+        )
 
         most_popular_words = None
 
@@ -73,60 +189,174 @@ class ArtistController:
             "spotify": spotify_artist.model_dump()
         }
 
-        await self.manager.add_artist(genius_id=all_stats.genius.id, json=json.dumps(data, ensure_ascii=False))
-        await self.manager.add_tracks(artist_id=all_stats.genius.id, tracks=spotify_tracks)
+        async with manager.transaction():
+            await manager.add_artist(genius_id=all_stats.genius.id, data=data)
+            await manager.add_tracks(artist_id=all_stats.genius.id, tracks=spotify_tracks)
 
-        return all_stats
+        if self.name_index:
+            self.name_index.add_artist(genius_artist.id, genius_artist.name, spotify_artist.popularity)
+            self.name_index.add_tracks(genius_artist.id, spotify_tracks)
+
+        if self.enrichment:
+            # Details and lyrics are fetched ahead, so the track pages are warm when opened
+            try:
+                await self.enrichment.enqueue(
+                    [track.spotify_song_id for track in spotify_tracks if track.spotify_song_id])
+            except RedisError as e:
+                logger.warning(f"Could not enqueue the tracks of artist {genius_artist.id}: {e}")
+
+        # The returned payload replaces whatever both cache tiers held for this artist
+        return all_stats.model_dump_json(by_alias=True)
+
+    async def fetch_spotify_artist(self, artist_name: str) -> tuple[SpotifyArtist, list[SpotifyTrack]]:
+        spotify_artist_id = await asyncio.wait_for(
+            self.spotify.get_artist_id(artist_name), config.UPSTREAM_TIMEOUT)
+
+        spotify_artist, spotify_tracks = await gather_branches(
+            asyncio.wait_for(self.spotify.get_artist(spotify_artist_id), config.UPSTREAM_TIMEOUT),
+            asyncio.wait_for(self.spotify.get_artist_top_tracks(spotify_artist_id), config.UPSTREAM_TIMEOUT)
+        )
+        return spotify_artist, spotify_tracks
 
 
 class TrackController:
     def __init__(self, genius: GeniusAPI, genius_parser: GeniusParser, spotify: SpotifyAPI,
-                 manager: DatabaseManager) -> None:
+                 manager: DatabaseManager,
+                 coalescer: SingleFlight | DistributedSingleFlight | None = None,
+                 cache: LayeredCache | None = None, enrichment: JobQueue | None = None,
+                 enrichment_wait: float = 0) -> None:
         self.genius = genius
         self.spotify = spotify
         self.genius_parser = genius_parser
         self.manager = manager
+        self.coalescer = coalescer or SingleFlight()
+        self.cache = cache
+        self.enrichment = enrichment
+        self.enrichment_wait = enrichment_wait
+
+    async def get_track_with_data(self, spotify_song_id: str) -> TrackBundle:
+        return TrackBundle.model_validate_json(await self.get_track_json(spotify_song_id))
+
+    async def get_track_json(self, spotify_song_id: str) -> str:
+        """Return the serialized TrackBundle of a track, served from cache when possible."""
+        if self.cache is None:
+            return await self.load_track(spotify_song_id)
+
+        return await self.cache.get_or_load(
+            spotify_song_id,
+            loader=lambda: self.load_track(spotify_song_id),
+            refresher=lambda: self.reload_track(spotify_song_id)
+        )
 
-    async def get_track_with_data(self, spotify_song_id: str):
-        track = await self.manager.get_one_track(spotify_song_id)
-        track_ = track._asdict()
+    async def reload_track(self, spotify_song_id: str) -> str | None:
+        # Runs in the background after the request is gone, so it needs its own session
+        async with async_session_maker() as session:
+            bundle = await DatabaseManager(session).get_track_bundle(spotify_song_id)
+        if bundle and bundle.details and bundle.lyrics:
+            return bundle.model_dump_json()
+        return None
 
-        track_details = await self.manager.get_track_details(spotify_song_id)
-        lyrics = await self.manager.get_lyrics(spotify_song_id)
+    async def load_track(self, spotify_song_id: str) -> str:
+        bundle = await self.manager.get_track_bundle(spotify_song_id)
+        if bundle is None:
+            raise HTTPException(status_code=404, detail="Track not found")
 
-        if track_details and lyrics:
-            data = {
-                "track": track_,
-                "details": track_details._asdict(),
-                "lyrics": lyrics._asdict()
-            }
-            return data
+        if bundle.details and bundle.lyrics:
+            return bundle.model_dump_json()
 
-        artists = track_.get("artists")
-        title = track_.get("title")
+        if self.enrichment:
+            return await self.wait_for_enrichment(bundle)
 
-        if not artists or not title:
-            raise Exception(
-                f"The track does not contain 'artists' or 'title': {track_}")
+        return await self.fetch_track_shared(spotify_song_id)
 
-        track_details = await self.spotify.get_track_details(spotify_song_id)
-        if not track_details:
-            raise Exception(
-                f"Failed to retrieve track details for ID {spotify_song_id}")
+    async def fetch_track_shared(self, spotify_song_id: str) -> str:
+        # Concurrent misses for the same track, in any worker, share one Tunebat/Genius fetch
+        async def fetch() -> str:
+            # The shared fetch serves every waiter, so it can't borrow the session of the request that started it
+            async with async_session_maker() as session:
+                return await self.fetch_track_data(DatabaseManager(session), spotify_song_id)
 
-        track_url = await self.genius.get_artist_song(artists, title)
+        return await self.coalescer.do(f"track:{spotify_song_id}", fetch)
 
-        lyrics = await self.genius_parser.get_songs_text(track_url)
+    async def wait_for_enrichment(self, bundle: TrackBundle) -> str:
+        """Hand the fetch to the enrichment worker and wait for it at most enrichment_wait seconds.
 
-        await self.manager.add_track_details(spotify_song_id, details=track_details)
-        await self.manager.add_lyrics(spotify_song_id, lyrics)
+        Past that, whatever is stored is returned as pending and isn't cached.
+        """
+        spotify_song_id = bundle.track.spotify_song_id
+        try:
+            await self.enrichment.enqueue([spotify_song_id])
+            finished = self.enrichment_wait > 0 and await self.enrichment.wait(spotify_song_id, self.enrichment_wait)
+        except RedisError as e:
+            # Without the queue the request fetches the track itself, as it did before
+            logger.warning(f"Could not enqueue track {spotify_song_id}: {e}")
+            return await self.fetch_track_shared(spotify_song_id)
+
+        if finished:
+            stored = await self.manager.get_track_bundle(spotify_song_id)
+            if stored.details and stored.lyrics:
+                return stored.model_dump_json()
+            bundle = stored
+
+        bundle.status = "pending"
+        return Uncached(bundle.model_dump_json())
+
+    async def fetch_track_data(self, manager: DatabaseManager, spotify_song_id: str) -> str:
+        # Another worker may have stored the track while we were waiting for the lock
+        bundle = await manager.get_track_bundle(spotify_song_id)
+        if bundle.details and bundle.lyrics:
+            return bundle.model_dump_json()
+
+        artists = bundle.track.artists
+        title = bundle.track.title
 
-        data = {
-            "track": track_,
-            "details": track_details,
-            "lyrics": lyrics
-        }
-        return data
+        if not artists or not title:
+            raise Exception(
+                f"The track does not contain 'artists' or 'title': {bundle.track}")
+
+        # Only the parts missing from the database are fetched and written
+        track_details = bundle.details
+        if not track_details:
+            track_details = await self.spotify.get_track_details(spotify_song_id)
+            if not track_details:
+                raise Exception(
+                    f"Failed to retrieve track details for ID {spotify_song_id}")
+
+        lyrics = bundle.lyrics.text if bundle.lyrics else None
+        if lyrics is None:
+            track_url = await self.genius.get_artist_song(artists, title)
+            lyrics = await self.genius_parser.get_songs_text(track_url)
+
+        lyrics_stored = bundle.lyrics is not None
+        async with manager.transaction():
+            if not bundle.details:
+                await manager.add_track_details(spotify_song_id, details=track_details)
+            if not bundle.lyrics:
+                # Failing to store lyrics must not lose the details, they are retried on the next request
+                async with manager.savepoint(optional=True):
+                    # Songs Genius doesn't know are stored without lyrics, there are no words to count
+                    if await manager.add_lyrics(spotify_song_id, lyrics) and lyrics:
+                        await manager.add_word_counts(
+                            bundle.track.artist_id, count_words(lyrics), config.TOP_WORDS_COUNT)
+                    lyrics_stored = True
+
+        bundle.details = track_details
+        bundle.lyrics = Lyrics(text=lyrics)
+        if not lyrics_stored:
+            # Cached, the lyrics would be served while the database still lacks them
+            return Uncached(bundle.model_dump_json())
+        return bundle.model_dump_json()
+
+    async def update_lyrics(self, spotify_song_id: str, lyrics: str):
+        async with self.manager.transaction():
+            previous = await self.manager.update_lyrics(spotify_song_id, lyrics)
+            if previous:
+                # Only the words that changed between the two versions are applied
+                await self.manager.add_word_counts(
+                    previous["artist_id"], diff_word_counts(previous["old_text"], lyrics), config.TOP_WORDS_COUNT)
+
+        if self.cache:
+            await self.cache.invalidate(spotify_song_id)
 
     async def get_track_data_without_saving(self, artist_name: str, title: str):
         spotify_song_id = await self.spotify.get_track_id(artist_name, title)
@@ -168,7 +398,7 @@ class TranslatorController:
                 await self.redis_client.delete(cache_key)
 
         try:
-            result = self.openai_client.analyze_text(
+            result = await self.openai_client.analyze_text(
                 text=text,
                 level=level,
                 language=language
@@ -180,15 +410,57 @@ class TranslatorController:
 
         return result
 
+    async def stream_text_translation(self, text: str, language: str, level: str):
+        text_hash = sha256(text.strip().lower().encode()).hexdigest()
+        cache_key = f"result:{text_hash}:{language}:{level}"
+
+        cache_data = await self.redis_client.get(cache_key)
+        if cache_data is not None:
+            try:
+                result = json.loads(cache_data)
+                yield {"delta": result["analysis"]}
+                yield {"done": True, **result}
+                return
+            except (json.JSONDecodeError, KeyError) as e:
+                logger.exception(f"Error decoding cached data: {e}")
+                await self.redis_client.delete(cache_key)
+
+        chunks = []
+        messages = self.openai_client.analysis_messages(text, level, language)
+        async for delta in self.openai_client.stream(messages):
+            chunks.append(delta)
+            yield {"delta": delta}
+
+        result = {"analysis": "".join(chunks).strip()}
+        await self.redis_client.set(cache_key, json.dumps(result), ex=3600)
+
+        yield {"done": True, **result}
+
 
 class ChatController:
     def __init__(self, openai_client: OpenAIClient):
         self.openai_client = openai_client
 
-    def get_chat(self, message: str, history: list):
+    async def get_chat(self, message: str, history: list):
         try:
-            result = self.openai_client.chat(
+            result = await self.openai_client.chat(
                 message=message, history=history)
         except RuntimeError as e:
             raise HTTPException(status_code=400, detail=str(e))
         return result
+
+    async def stream_chat(self, message: str, history: list):
+        history = history or []
+
+        chunks = []
+        messages = self.openai_client.chat_messages(message, history)
+        async for delta in self.openai_client.stream(messages):
+            chunks.append(delta)
+            yield {"delta": delta}
+
+        reply = "".join(chunks)
+        yield {
+            "done": True,
+            "reply": reply.strip(),
+            "history": history + [{"role": "user", "content": message}, {"role": "assistant", "content": reply}]
+        }
@@ -0,0 +1,168 @@
+import asyncio
+import argparse
+
+from concurrent.futures import ProcessPoolExecutor
+
+from core import config
+from core.http_client import create_http_session
+from core.http_cache import create_http_cache
+from core.job_queue import JobQueue
+from core.logger import logger
+from core.redis_client import create_redis_client, close_redis_client
+from core.scraping import ScrapingExecutor
+from core.single_flight import DistributedSingleFlight
+from core.throttle import Throttle
+from fastapi import HTTPException
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from db.database import async_session_maker, dispose_engines
+from db.db_manager import DatabaseManager
+from services.applications.genius import GeniusAPI, GeniusParser
+from services.applications.spotify import SpotifyAPI
+from services.applications.spotify_token import create_spotify_tokens
+from services.controller import TrackController
+
+
+def create_enrichment_queue(redis_client: Redis) -> JobQueue:
+    """Queue of spotify_song_ids whose details and lyrics are still to be fetched."""
+    return JobQueue(
+        redis_client, name="enrichment",
+        max_attempts=config.ENRICHMENT_MAX_ATTEMPTS,
+        retry_base_delay=config.ENRICHMENT_RETRY_BASE_DELAY,
+        retry_max_delay=config.ENRICHMENT_RETRY_MAX_DELAY,
+        lease_timeout=config.ENRICHMENT_LEASE_TIMEOUT
+    )
+
+
+class EnrichmentWorker:
+    """
+    Fetches track details and lyrics for the queued tracks, outside of any user request.
+
+    A job runs the same coalesced fetch as an inline request, so it only fills
+    what is missing and is safe to run twice.
+    """
+
+    def __init__(self, queue: JobQueue, genius: GeniusAPI, genius_parser: GeniusParser, spotify: SpotifyAPI,
+                 coalescer: DistributedSingleFlight, concurrency: int, job_timeout: float,
+                 poll_interval: float = 1.0):
+        self.queue = queue
+        self.genius = genius
+        self.genius_parser = genius_parser
+        self.spotify = spotify
+        self.coalescer = coalescer
+        self.concurrency = concurrency
+        self.job_timeout = job_timeout
+        self.poll_interval = poll_interval
+        self.stats = {"completed": 0, "retried": 0, "dead": 0}
+
+    async def process(self, spotify_song_id: str):
+        async with async_session_maker() as session:
+            controller = TrackController(genius=self.genius, genius_parser=self.genius_parser,
+                                         spotify=self.spotify, manager=DatabaseManager(session),
+                                         coalescer=self.coalescer)
+            await controller.load_track(spotify_song_id)
+
+    async def run_job(self, spotify_song_id: str):
+        try:
+            await asyncio.wait_for(self.process(spotify_song_id), self.job_timeout)
+        except HTTPException as e:
+            if e.status_code != 404:
+                raise
+            # The track is gone, there is nothing left to enrich
+            logger.info(f"[enrichment] track {spotify_song_id} not found, dropped")
+        except Exception as e:
+            if await self.queue.fail(spotify_song_id, repr(e)):
+                self.stats["retried"] += 1
+                logger.warning(f"[enrichment] {spotify_song_id} failed, will retry: {e!r}")
+            else:
+                self.stats["dead"] += 1
+                logger.error(f"[enrichment] {spotify_song_id} failed for good: {e!r}")
+            return
+
+        await self.queue.complete(spotify_song_id)
+        self.stats["completed"] += 1
+
+    async def worker(self):
+        while True:
+            try:
+                job_id = await self.queue.reserve()
+            except RedisError as e:
+                logger.warning(f"[enrichment] could not reserve a job: {e}")
+                job_id = None
+
+            if job_id is None:
+                await asyncio.sleep(self.poll_interval)
+                continue
+
+            try:
+                await self.run_job(job_id)
+            except RedisError as e:
+                # The lease expires and the job is handed out again
+                logger.warning(f"[enrichment] could not record the result of {job_id}: {e}")
+
+    async def run(self):
+        logger.info(f"[enrichment] worker started with concurrency {self.concurrency}")
+        await asyncio.gather(*(self.worker() for _ in range(self.concurrency)))
+
+
+async def run_worker(args: argparse.Namespace):
+    redis_client = create_redis_client()
+    http_session = create_http_session()
+    scraper = ScrapingExecutor(
+        max_workers=config.SCRAPER_MAX_WORKERS,
+        throttle=Throttle(config.TUNEBAT_MIN_DELAY, config.TUNEBAT_MAX_DELAY)
+    )
+    http_cache = create_http_cache(redis_client)
+    spotify_tokens = create_spotify_tokens(http_session, redis_client)
+    spotify_tokens.start()
+    parse_pool = ProcessPoolExecutor(args.parse_processes) if args.parse_processes > 0 else None
+
+    try:
+        worker = EnrichmentWorker(
+            queue=create_enrichment_queue(redis_client),
+            genius=GeniusAPI(config.GENIUS_ACCESS, session=http_session, http_cache=http_cache),
+            genius_parser=GeniusParser(session=http_session, executor=parse_pool),
+            spotify=SpotifyAPI(spotify_tokens, session=http_session, scraper=scraper, http_cache=http_cache),
+            coalescer=DistributedSingleFlight(redis_client, lock_timeout=config.COALESCE_LOCK_TIMEOUT,
+                                              wait_timeout=config.COALESCE_WAIT_TIMEOUT),
+            concurrency=args.concurrency,
+            job_timeout=config.ENRICHMENT_JOB_TIMEOUT
+        )
+        await worker.run()
+    finally:
+        await spotify_tokens.close()
+        scraper.shutdown()
+        if parse_pool is not None:
+            parse_pool.shutdown(cancel_futures=True)
+        await http_session.close()
+        await close_redis_client(redis_client)
+        await dispose_engines()
+
+
+async def retry_dead():
+    redis_client = create_redis_client()
+    try:
+        count = await create_enrichment_queue(redis_client).retry_dead()
+        logger.info(f"[enrichment] {count} dead jobs queued again")
+    finally:
+        await close_redis_client(redis_client)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch track details and lyrics in the background")
+    commands = parser.add_subparsers(dest="command", required=True)
+    worker = commands.add_parser("worker", help="process the enrichment queue")
+    worker.add_argument("--concurrency", type=int, default=config.ENRICHMENT_CONCURRENCY)
+    worker.add_argument("--parse-processes", type=int, default=config.ENRICHMENT_PARSE_PROCESSES,
+                        help="processes parsing the Genius pages, 0 parses them in the worker itself")
+    commands.add_parser("retry-dead", help="queue the jobs that ran out of retries again")
+    args = parser.parse_args()
+
+    if args.command == "worker":
+        asyncio.run(run_worker(args))
+    elif args.command == "retry-dead":
+        asyncio.run(retry_dead())
+
+
+if __name__ == "__main__":
+    main()
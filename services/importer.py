@@ -0,0 +1,249 @@
+import os
+import sys
+import json
+import asyncio
+import argparse
+
+from typing import Iterable, Iterator
+from core import config
+from core.concurrency import gather_branches
+from core.http_client import create_http_session
+from core.http_cache import create_http_cache
+from core.job_queue import JobQueue
+from core.logger import logger
+from core.redis_client import create_redis_client, close_redis_client
+from core.scraping import ScrapingExecutor
+from core.throttle import Throttle
+from redis.exceptions import RedisError
+from db.database import async_session_maker
+from db.db_manager import DatabaseManager
+from schemas.service_schemas import SpotifyTrack
+from services.applications.genius import GeniusAPI
+from services.applications.spotify import SpotifyAPI
+from services.applications.spotify_token import create_spotify_tokens
+from services.enrichment import create_enrichment_queue
+
+
+class Checkpoint:
+    """Append-only JSON lines log of processed artist names, used to resume an import."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done: set[str] = set()
+
+    def load(self):
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, encoding="utf-8") as file:
+            for line in file:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # A crash may leave the last line half-written
+                    continue
+                if entry.get("status") in ("imported", "skipped"):
+                    self.done.add(entry["name"])
+
+    def record(self, entries: list[dict]):
+        with open(self.path, "a", encoding="utf-8") as file:
+            for entry in entries:
+                file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            file.flush()
+            os.fsync(file.fileno())
+
+
+class ArtistImporter:
+    """
+    Resolves artist names against Genius and Spotify with bounded parallelism
+    and per-upstream rate limits, and writes them in multi-row batches.
+    """
+
+    def __init__(self, genius: GeniusAPI, spotify: SpotifyAPI, checkpoint: Checkpoint,
+                 concurrency: int, batch_size: int, genius_throttle: Throttle, spotify_throttle: Throttle,
+                 enrichment: JobQueue | None = None):
+        self.genius = genius
+        self.spotify = spotify
+        self.checkpoint = checkpoint
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.genius_throttle = genius_throttle
+        self.spotify_throttle = spotify_throttle
+        self.enrichment = enrichment
+
+        self._artists: dict[int, dict] = {}
+        self._tracks: dict[int, list[SpotifyTrack]] = {}
+        self._names: list[dict] = []
+        self._flush_lock = asyncio.Lock()
+        self.stats = {"imported": 0, "skipped": 0, "failed": 0}
+
+    async def call_genius(self, func, *args):
+        await self.genius_throttle.wait()
+        return await asyncio.wait_for(func(*args), config.UPSTREAM_TIMEOUT)
+
+    async def call_spotify(self, func, *args):
+        await self.spotify_throttle.wait()
+        return await asyncio.wait_for(func(*args), config.UPSTREAM_TIMEOUT)
+
+    async def is_stored(self, genius_artist_id: int) -> bool:
+        async with async_session_maker() as session:
+            manager = DatabaseManager(session)
+            # On the primary, the batch this run just wrote may not have reached the replicas yet
+            async with manager.transaction():
+                return await manager.get_artist(genius_artist_id) is not None
+
+    async def fetch_spotify_artist(self, artist_name: str):
+        spotify_artist_id = await self.call_spotify(self.spotify.get_artist_id, artist_name)
+        return await gather_branches(
+            self.call_spotify(self.spotify.get_artist, spotify_artist_id),
+            self.call_spotify(self.spotify.get_artist_top_tracks, spotify_artist_id)
+        )
+
+    async def import_artist(self, artist_name: str):
+        key = artist_name.lower().strip()
+        genius_artist_id = await self.call_genius(self.genius.get_artist_id, key)
+
+        if genius_artist_id in self._artists or await self.is_stored(genius_artist_id):
+            self.stats["skipped"] += 1
+            self.checkpoint.record([{"name": key, "status": "skipped", "genius_id": genius_artist_id}])
+            return
+
+        genius_artist, (spotify_artist, spotify_tracks) = await gather_branches(
+            self.call_genius(self.genius.get_artist, genius_artist_id),
+            self.fetch_spotify_artist(artist_name)
+        )
+
+        self._artists[genius_artist.id] = {
+            "genius": genius_artist.model_dump(),
+            "spotify": spotify_artist.model_dump()
+        }
+        self._tracks[genius_artist.id] = spotify_tracks
+        self._names.append({"name": key, "status": "imported", "genius_id": genius_artist.id})
+
+        if len(self._artists) >= self.batch_size:
+            await self.flush()
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._artists:
+                return
+
+            artists, self._artists = self._artists, {}
+            tracks, self._tracks = self._tracks, {}
+            names, self._names = self._names, []
+
+            try:
+                async with async_session_maker() as session:
+                    manager = DatabaseManager(session)
+                    async with manager.transaction():
+                        await manager.add_artists(artists)
+                        await manager.add_many_tracks(tracks)
+            except Exception as e:
+                # The whole batch is rolled back, so every artist in it is failed and retried by the next run
+                self.stats["failed"] += len(names)
+                logger.warning(f"[import] failed to write a batch of {len(names)} artists: {e!r}")
+                self.checkpoint.record([{**entry, "status": "failed", "error": repr(e)} for entry in names])
+                return
+
+            if self.enrichment:
+                try:
+                    await self.enrichment.enqueue([track.spotify_song_id for artist_tracks in tracks.values()
+                                                   for track in artist_tracks if track.spotify_song_id])
+                except RedisError as e:
+                    logger.warning(f"[import] could not enqueue the imported tracks: {e}")
+
+            # Only committed artists are checkpointed, a crash before this line re-imports them
+            self.checkpoint.record(names)
+            self.stats["imported"] += len(names)
+            logger.info(f"[import] {self.stats}")
+
+    async def worker(self, queue: asyncio.Queue):
+        while True:
+            artist_name = await queue.get()
+            if artist_name is None:
+                return
+
+            try:
+                await self.import_artist(artist_name)
+            except Exception as e:
+                self.stats["failed"] += 1
+                logger.warning(f"[import] failed to import '{artist_name}': {e!r}")
+                self.checkpoint.record([{"name": artist_name.lower().strip(), "status": "failed",
+                                         "error": repr(e)}])
+
+    async def run(self, artist_names: Iterable[str]):
+        self.checkpoint.load()
+
+        queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        workers = [asyncio.create_task(self.worker(queue))
+                   for _ in range(self.concurrency)]
+
+        for artist_name in artist_names:
+            if artist_name.lower().strip() in self.checkpoint.done:
+                continue
+            await queue.put(artist_name)
+
+        for _ in workers:
+            await queue.put(None)
+        await asyncio.gather(*workers)
+        await self.flush()
+
+        logger.info(f"[import] finished: {self.stats}")
+
+
+def read_artist_names(path: str) -> Iterator[str]:
+    file = sys.stdin if path == "-" else open(path, encoding="utf-8")
+    try:
+        for line in file:
+            if line.strip():
+                yield line.strip()
+    finally:
+        if file is not sys.stdin:
+            file.close()
+
+
+async def import_artists(args: argparse.Namespace):
+    http_session = create_http_session()
+    scraper = ScrapingExecutor(max_workers=1, throttle=Throttle(
+        config.TUNEBAT_MIN_DELAY, config.TUNEBAT_MAX_DELAY))
+    redis_client = None
+    if config.ENRICHMENT_QUEUE_ENABLED or config.HTTP_CACHE_BACKEND == "redis":
+        redis_client = create_redis_client()
+    http_cache = create_http_cache(redis_client)
+
+    try:
+        importer = ArtistImporter(
+            genius=GeniusAPI(config.GENIUS_ACCESS, session=http_session, http_cache=http_cache),
+            spotify=SpotifyAPI(create_spotify_tokens(http_session, redis_client), session=http_session,
+                               scraper=scraper, http_cache=http_cache),
+            checkpoint=Checkpoint(args.checkpoint),
+            concurrency=args.concurrency,
+            batch_size=args.batch_size,
+            genius_throttle=Throttle(1 / args.genius_rate),
+            spotify_throttle=Throttle(1 / args.spotify_rate),
+            # Imported top tracks are enriched by the worker as well
+            enrichment=create_enrichment_queue(redis_client) if config.ENRICHMENT_QUEUE_ENABLED else None
+        )
+        await importer.run(read_artist_names(args.source))
+    finally:
+        scraper.shutdown()
+        await http_session.close()
+        if redis_client:
+            await close_redis_client(redis_client)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import artists and their top tracks into the catalog")
+    parser.add_argument("source", help="file with one artist name per line, or - for stdin")
+    parser.add_argument("--checkpoint", default="import.checkpoint")
+    parser.add_argument("--concurrency", type=int, default=config.IMPORT_CONCURRENCY)
+    parser.add_argument("--batch-size", type=int, default=config.IMPORT_BATCH_SIZE)
+    parser.add_argument("--genius-rate", type=float, default=config.GENIUS_RATE_LIMIT,
+                        help="max Genius requests per second")
+    parser.add_argument("--spotify-rate", type=float, default=config.SPOTIFY_RATE_LIMIT,
+                        help="max Spotify requests per second")
+    asyncio.run(import_artists(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
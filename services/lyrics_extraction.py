@@ -0,0 +1,111 @@
+import re
+
+from lxml import etree
+
+
+LYRICS_CONTAINER = re.compile(r"^Lyrics__Container-sc-")
+SKIPPED_TAGS = {"script", "style"}
+START_KEYWORDS = ["[Intro", "[Verse", "[Chorus", "[Bridge", "[Outro", "[Refrain",
+                  "[Post-Chorus", "[Pre-Chorus", "[Breakdown", "[Interlude:", "[Skit:"]
+
+
+def is_lyrics_container(element) -> bool:
+    if element.tag != "div":
+        return False
+    if element.get("data-lyrics-container") == "true":
+        return True
+    return any(LYRICS_CONTAINER.match(name) for name in element.get("class", "").split())
+
+
+def container_strings(element) -> list[str]:
+    """Every text node under the element in document order, like BeautifulSoup's strings."""
+    strings = []
+    if element.tag not in SKIPPED_TAGS and isinstance(element.tag, str) and element.text:
+        strings.append(element.text)
+    for child in element:
+        strings += container_strings(child)
+        if child.tail:
+            strings.append(child.tail)
+    return strings
+
+
+def trim_header(full_text: str) -> str:
+    # The first container starts with the contributors and title header, the lyrics with a section tag
+    for keyword in START_KEYWORDS:
+        idx = full_text.find(keyword)
+        if idx != -1:
+            return full_text[idx:]
+    return full_text
+
+
+class LyricsExtractor:
+    """
+    Incremental extraction of the lyrics from a Genius song page.
+
+    The page is fed in chunks as it downloads. Elements outside the lyrics are
+    dropped as soon as they are parsed, and feeding stops once the element
+    holding the lyrics containers is closed, so the rest of the page, its
+    sidebar and footer scripts, is never parsed or even downloaded.
+    """
+
+    def __init__(self):
+        self._parser = etree.HTMLPullParser(events=("start", "end"), encoding="utf-8")
+        self._containers: list[str] = []
+        self._depth = 0
+        self._lyrics_root = None
+        self._pending = b""
+        self.done = False
+
+    def feed(self, chunk: bytes) -> bool:
+        """Parse the next chunk, returning True once the lyrics are complete."""
+        if self.done:
+            return True
+
+        # libxml2 loses track of a closing script tag split across two feeds, so tags are fed whole
+        data = self._pending + chunk
+        cut = data.rfind(b"<")
+        if cut > data.rfind(b">"):
+            data, self._pending = data[:cut], data[cut:]
+        else:
+            self._pending = b""
+        if not data:
+            return False
+
+        self._parser.feed(data)
+        for event, element in self._parser.read_events():
+            if event == "start":
+                if is_lyrics_container(element):
+                    self._depth += 1
+                    if self._lyrics_root is None:
+                        self._lyrics_root = element.getparent()
+                continue
+
+            if is_lyrics_container(element):
+                self._depth -= 1
+                if self._depth == 0:
+                    self._containers.append("\n".join(container_strings(element)).strip())
+                    element.clear(keep_tail=True)
+            elif element is self._lyrics_root:
+                self.done = True
+                break
+            elif self._depth == 0 and self._lyrics_root is None:
+                # Nothing before the lyrics is needed, keep the tree from growing
+                element.clear(keep_tail=True)
+        return self.done
+
+    def result(self) -> str | None:
+        if not self._containers:
+            return None
+        return trim_header("\n".join(self._containers))
+
+
+def extract_lyrics(html: bytes | str, chunk_size: int = 64 * 1024) -> str | None:
+    """Extract the lyrics of a whole page, stopping at the end of the lyrics. Picklable for process pools."""
+    if isinstance(html, str):
+        html = html.encode("utf-8")
+
+    extractor = LyricsExtractor()
+    for start in range(0, len(html), chunk_size):
+        if extractor.feed(html[start:start + chunk_size]):
+            break
+    return extractor.result()
@@ -0,0 +1,243 @@
+import math
+import asyncio
+import argparse
+
+from datetime import timedelta
+from core import config
+from core.cache import LayeredCache, LocalCache
+from core.concurrency import gather_branches
+from core.http_client import create_http_session
+from core.http_cache import create_http_cache
+from core.job_queue import JobQueue
+from core.logger import logger
+from core.redis_client import create_redis_client, close_redis_client
+from core.scraping import ScrapingExecutor
+from core.throttle import Throttle
+from redis.asyncio import Redis
+from redis.exceptions import RedisError
+from db.database import async_session_maker, dispose_engines
+from db.db_manager import DatabaseManager
+from services.applications.genius import GeniusAPI
+from services.applications.spotify import SpotifyAPI
+from services.applications.spotify_token import create_spotify_tokens
+from services.controller import ARTIST_REQUESTS_KEY
+from services.enrichment import create_enrichment_queue
+
+
+def refresh_priority(age: float, popularity: int | None, likes: int, requests: float) -> float:
+    """Hours since the last refresh, scaled up by how much the artist is liked, requested and popular."""
+    # EXTRACT(epoch ...) comes back as a Decimal
+    return float(age) / 3600 * (1 + math.log1p(likes) + math.log1p(requests) + (popularity or 0) / 100)
+
+
+class Budget:
+    """Requests one upstream may still receive in this run."""
+
+    def __init__(self, limit: int):
+        self.left = limit
+
+    def fits(self, cost: int) -> bool:
+        return cost <= self.left
+
+    def take(self, cost: int):
+        self.left -= cost
+
+
+class ArtistRefresher:
+    """
+    Refreshes stored artists and their top tracks in the background.
+
+    Each run picks the artists stored longest ago, weighted by likes, recent
+    requests and popularity, as many as the Genius and Spotify budgets allow.
+    Only the fields that changed and the new tracks are written, and the
+    cached payloads of a changed artist and of its updated tracks are
+    dropped, so the next request rebuilds them from the database.
+    """
+
+    def __init__(self, genius: GeniusAPI, spotify: SpotifyAPI, redis_client: Redis, cache: LayeredCache,
+                 track_cache: LayeredCache | None, enrichment: JobQueue | None, genius_budget: int,
+                 spotify_budget: int, min_age: float, candidates: int, concurrency: int):
+        self.genius = genius
+        self.spotify = spotify
+        self.redis_client = redis_client
+        self.cache = cache
+        self.track_cache = track_cache
+        self.enrichment = enrichment
+        self.genius_budget = genius_budget
+        self.spotify_budget = spotify_budget
+        self.min_age = timedelta(seconds=min_age)
+        self.candidates = candidates
+        self.concurrency = concurrency
+        self.genius_throttle = Throttle(1 / config.GENIUS_RATE_LIMIT)
+        self.spotify_throttle = Throttle(1 / config.SPOTIFY_RATE_LIMIT)
+
+    async def call_genius(self, func, *args):
+        await self.genius_throttle.wait()
+        return await asyncio.wait_for(func(*args), config.UPSTREAM_TIMEOUT)
+
+    async def call_spotify(self, func, *args):
+        await self.spotify_throttle.wait()
+        return await asyncio.wait_for(func(*args), config.UPSTREAM_TIMEOUT)
+
+    async def request_counts(self) -> dict[int, float]:
+        try:
+            counts = await self.redis_client.zrevrange(ARTIST_REQUESTS_KEY, 0, self.candidates - 1, withscores=True)
+        except RedisError as e:
+            logger.warning(f"[refresh] could not read the request counts: {e}")
+            return {}
+        return {int(artist_id): score for artist_id, score in counts}
+
+    async def pick(self) -> list[dict]:
+        """Stale artists, highest priority first."""
+        requests = await self.request_counts()
+
+        async with async_session_maker() as session:
+            manager = DatabaseManager(session)
+            rows = [dict(row) for row in await manager.get_refresh_candidates(self.min_age, self.candidates)]
+            # Requested artists are candidates even when popularity and likes alone don't rank them
+            picked = {row["genius_id"] for row in rows}
+            requested = [artist_id for artist_id in requests if artist_id not in picked]
+            if requested:
+                rows += [dict(row) for row in await manager.get_refresh_candidates(
+                    self.min_age, len(requested), artist_ids=requested)]
+
+        return sorted(rows, reverse=True, key=lambda row: refresh_priority(
+            row["age"], row["popularity"], row["likes"], requests.get(row["genius_id"], 0)))
+
+    def plan(self, rows: list[dict]) -> list[dict]:
+        """Take the artists in order while both budgets have room for them."""
+        genius, spotify = Budget(self.genius_budget), Budget(self.spotify_budget)
+        planned = []
+        for row in rows:
+            # Artists stored without their Spotify id need a search first
+            spotify_cost = 2 if (row["json"].get("spotify") or {}).get("id") else 3
+            if not genius.fits(1) or not spotify.fits(spotify_cost):
+                if genius.left < 1 or spotify.left < 2:
+                    break
+                continue
+            genius.take(1)
+            spotify.take(spotify_cost)
+            planned.append(row)
+        return planned
+
+    async def refresh(self, row: dict) -> bool:
+        """Refresh one artist, returning True if anything changed."""
+        genius_id, previous = row["genius_id"], row["json"]
+
+        spotify_id = (previous.get("spotify") or {}).get("id")
+        if spotify_id is None:
+            spotify_id = await self.call_spotify(self.spotify.get_artist_id, row["name"])
+
+        genius_artist, spotify_artist, spotify_tracks = await gather_branches(
+            self.call_genius(self.genius.get_artist, genius_id),
+            self.call_spotify(self.spotify.get_artist, spotify_id),
+            self.call_spotify(self.spotify.get_artist_top_tracks, spotify_id)
+        )
+        data = {"genius": genius_artist.model_dump(), "spotify": spotify_artist.model_dump()}
+
+        async with async_session_maker() as session:
+            manager = DatabaseManager(session)
+            async with manager.transaction():
+                changed = await manager.refresh_artist(genius_id, data, previous)
+                new, updated = await manager.refresh_tracks(genius_id, spotify_tracks)
+
+        if not (changed or new or updated):
+            return False
+        logger.info(f"[refresh] artist {genius_id}: changed {changed}, {len(new)} new and {len(updated)} updated tracks")
+
+        try:
+            await self.cache.invalidate(str(genius_id))
+            if self.track_cache and updated:
+                await self.track_cache.invalidate(*updated)
+            if self.enrichment and new:
+                await self.enrichment.enqueue(new)
+        except RedisError as e:
+            logger.warning(f"[refresh] artist {genius_id} refreshed, but Redis failed: {e}")
+        return True
+
+    async def decay_requests(self, factor: float):
+        """Scale the request counts down, so old traffic weighs less than recent traffic."""
+        try:
+            async with self.redis_client.pipeline(transaction=True) as pipe:
+                pipe.zunionstore(ARTIST_REQUESTS_KEY, {ARTIST_REQUESTS_KEY: factor})
+                pipe.zremrangebyscore(ARTIST_REQUESTS_KEY, "-inf", "(0.1")
+                await pipe.execute()
+        except RedisError as e:
+            logger.warning(f"[refresh] could not decay the request counts: {e}")
+
+    async def run_once(self) -> dict:
+        planned = self.plan(await self.pick())
+        stats = {"planned": len(planned), "changed": 0, "unchanged": 0, "failed": 0}
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def refresh(row: dict):
+            async with semaphore:
+                try:
+                    stats["changed" if await self.refresh(row) else "unchanged"] += 1
+                except Exception as e:
+                    stats["failed"] += 1
+                    logger.warning(f"[refresh] artist {row['genius_id']} failed: {e!r}")
+
+        await asyncio.gather(*(refresh(row) for row in planned))
+        logger.info(f"[refresh] run done: {stats}")
+        return stats
+
+
+async def run_scheduler(args: argparse.Namespace):
+    redis_client = create_redis_client()
+    http_session = create_http_session()
+    scraper = ScrapingExecutor(max_workers=1, throttle=Throttle(
+        config.TUNEBAT_MIN_DELAY, config.TUNEBAT_MAX_DELAY))
+    http_cache = create_http_cache(redis_client)
+    spotify_tokens = create_spotify_tokens(http_session, redis_client)
+
+    try:
+        refresher = ArtistRefresher(
+            genius=GeniusAPI(config.GENIUS_ACCESS, session=http_session, http_cache=http_cache),
+            spotify=SpotifyAPI(spotify_tokens, session=http_session, scraper=scraper, http_cache=http_cache),
+            redis_client=redis_client,
+            cache=LayeredCache(redis_client, namespace="artist", ttl=config.ARTIST_CACHE_TTL,
+                               stale_ttl=config.ARTIST_CACHE_STALE_TTL,
+                               local=LocalCache(config.LOCAL_CACHE_MAX_SIZE, config.LOCAL_CACHE_TTL)),
+            track_cache=LayeredCache(redis_client, namespace="track", ttl=config.TRACK_CACHE_TTL,
+                                     stale_ttl=config.TRACK_CACHE_STALE_TTL,
+                                     local=LocalCache(config.LOCAL_CACHE_MAX_SIZE, config.LOCAL_CACHE_TTL)),
+            enrichment=create_enrichment_queue(redis_client) if config.ENRICHMENT_QUEUE_ENABLED else None,
+            genius_budget=args.genius_budget,
+            spotify_budget=args.spotify_budget,
+            min_age=args.min_age,
+            candidates=config.REFRESH_CANDIDATES,
+            concurrency=args.concurrency
+        )
+        decay = 0.5 ** (args.interval / config.REFRESH_REQUESTS_HALF_LIFE)
+
+        while True:
+            await refresher.run_once()
+            if args.once:
+                break
+            await refresher.decay_requests(decay)
+            await asyncio.sleep(args.interval)
+    finally:
+        scraper.shutdown()
+        await http_session.close()
+        await close_redis_client(redis_client)
+        await dispose_engines()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh the stale stored artists and their top tracks")
+    parser.add_argument("--once", action="store_true", help="run a single refresh and exit")
+    parser.add_argument("--interval", type=float, default=config.REFRESH_INTERVAL,
+                        help="seconds between two runs")
+    parser.add_argument("--min-age", type=float, default=config.REFRESH_MIN_AGE,
+                        help="seconds an artist stays untouched after being stored or refreshed")
+    parser.add_argument("--genius-budget", type=int, default=config.REFRESH_GENIUS_BUDGET,
+                        help="max Genius requests per run")
+    parser.add_argument("--spotify-budget", type=int, default=config.REFRESH_SPOTIFY_BUDGET,
+                        help="max Spotify requests per run")
+    parser.add_argument("--concurrency", type=int, default=config.REFRESH_CONCURRENCY)
+    asyncio.run(run_scheduler(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+import asyncio
+import argparse
+import numpy as np
+import scipy.sparse as sp
+
+from core import config
+from core.logger import logger
+from sqlalchemy import select
+from db.database import async_session_maker
+from db.db_manager import DatabaseManager
+from db.models import artist, artist_similarity, track, user_liked_artist
+from services.autocomplete import normalize
+
+
+def incidence(rows: list[int], cols: list[int], shape: tuple[int, int]) -> sp.csr_matrix:
+    """Binary rows × cols matrix, a pair listed several times counts once."""
+    matrix = sp.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=shape)
+    matrix.data[:] = 1
+    return matrix
+
+
+def overlap(matrix: sp.csr_matrix, sizes: np.ndarray, rows: np.ndarray, metric: str) -> sp.coo_matrix:
+    """Pairwise jaccard or cosine similarity of the given rows against all rows."""
+    shared = (matrix[rows] @ matrix.T).tocoo()
+    size_a = sizes[rows][shared.row]
+    size_b = sizes[shared.col]
+    if metric == "jaccard":
+        shared.data = shared.data / (size_a + size_b - shared.data)
+    else:
+        shared.data = shared.data / np.sqrt(size_a * size_b)
+    return shared
+
+
+def top_k(block: sp.coo_matrix, k: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Keep the k highest scores of every row, most similar first, ties broken by column."""
+    order = np.lexsort((block.col, -block.data, block.row))
+    row, col, data = block.row[order], block.col[order], block.data[order]
+    # Position of each entry within its row, rows being contiguous after the sort
+    rank = np.arange(len(row)) - np.searchsorted(row, row)
+    keep = rank < k
+    return row[keep], col[keep], data[keep]
+
+
+class SimilarityGraph:
+    """
+    Weighted artist similarity from three sparse signals:
+
+    - genre jaccard, from artist.genres
+    - co-likes, cosine over the users who liked both artists
+    - collaborations, cosine over the names credited on each artist's tracks,
+      the artist's own name included, so featuring each other counts too
+    """
+
+    def __init__(self, artist_ids: list[int], genres: list[list[str]], likes: list[tuple[int, int]],
+                 credits: list[tuple[int, str]], weights: tuple[float, float, float]):
+        position = {genius_id: i for i, genius_id in enumerate(artist_ids)}
+        n = len(artist_ids)
+
+        vocabulary = {}
+        genre_rows, genre_cols = [], []
+        for i, artist_genres in enumerate(genres):
+            for genre in artist_genres or ():
+                genre_rows.append(i)
+                genre_cols.append(vocabulary.setdefault(genre, len(vocabulary)))
+        self.genres = incidence(genre_rows, genre_cols, (n, len(vocabulary)))
+
+        users = {}
+        like_rows, like_cols = [], []
+        for user_id, artist_id in likes:
+            if artist_id in position:
+                like_rows.append(position[artist_id])
+                like_cols.append(users.setdefault(user_id, len(users)))
+        self.likes = incidence(like_rows, like_cols, (n, len(users)))
+
+        names = {}
+        credit_rows, credit_cols = [], []
+        for artist_id, name in credits:
+            if artist_id in position and name:
+                credit_rows.append(position[artist_id])
+                credit_cols.append(names.setdefault(name, len(names)))
+        self.credits = incidence(credit_rows, credit_cols, (n, len(names)))
+
+        self.sizes = [np.asarray(matrix.sum(axis=1)).ravel()
+                      for matrix in (self.genres, self.likes, self.credits)]
+        self.weights = weights
+
+    def neighbors(self, rows: np.ndarray, k: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Top k (row, neighbor row, score) triples for a block of artist rows."""
+        genre_weight, likes_weight, collaboration_weight = self.weights
+        block = (
+            genre_weight * overlap(self.genres, self.sizes[0], rows, "jaccard").tocsr()
+            + likes_weight * overlap(self.likes, self.sizes[1], rows, "cosine").tocsr()
+            + collaboration_weight * overlap(self.credits, self.sizes[2], rows, "cosine").tocsr()
+        ).tocoo()
+
+        # An artist isn't its own neighbor
+        other = rows[block.row] != block.col
+        block = sp.coo_matrix((block.data[other], (block.row[other], block.col[other])), shape=block.shape)
+
+        row, col, score = top_k(block, k)
+        return rows[row], col, score
+
+
+async def load_graph(weights: tuple[float, float, float], batch_size: int):
+    """Read the artists and the three signals, the like and track tables streamed in batches."""
+    async with async_session_maker() as session:
+        res = await session.execute(
+            select(artist.c.genius_id, artist.c.name, artist.c.genres)
+            .where(artist.c.genius_id.is_not(None))
+            .order_by(artist.c.genius_id)
+        )
+        artists = [dict(row) for row in res.mappings()]
+
+        likes = []
+        stream = await session.stream(
+            select(user_liked_artist.c.user_id, user_liked_artist.c.artist_id)
+            .execution_options(yield_per=batch_size))
+        async for rows in stream.partitions():
+            likes += rows
+
+        # track.artists holds the credited names joined with ", "
+        credits = [(row["genius_id"], normalize(row["name"] or "")) for row in artists]
+        stream = await session.stream(
+            select(track.c.artist_id, track.c.artists)
+            .where(track.c.artists.is_not(None))
+            .execution_options(yield_per=batch_size))
+        async for rows in stream.partitions():
+            credits += [(artist_id, normalize(name)) for artist_id, names in rows for name in names.split(", ")]
+
+    graph = SimilarityGraph([row["genius_id"] for row in artists], [row["genres"] for row in artists],
+                            likes, credits, weights)
+    return graph, artists
+
+
+async def build_similarity(k: int, chunk_size: int, batch_size: int, missing_only: bool):
+    """
+    Recompute the top neighbors of every artist, or only of those without any yet.
+
+    Artist rows are scored in chunks, so the pairwise matrices never hold more
+    than chunk_size rows at a time.
+    """
+    weights = (config.SIMILARITY_GENRE_WEIGHT, config.SIMILARITY_LIKES_WEIGHT,
+               config.SIMILARITY_COLLABORATION_WEIGHT)
+    graph, artists = await load_graph(weights, batch_size)
+
+    rows = np.arange(len(artists))
+    if missing_only:
+        async with async_session_maker() as session:
+            res = await session.execute(select(artist_similarity.c.artist_id))
+            computed = set(res.scalars().all())
+        rows = np.array([i for i, row in enumerate(artists) if row["genius_id"] not in computed], dtype=int)
+
+    written = 0
+    for start in range(0, len(rows), chunk_size):
+        artist_rows, neighbor_rows, scores = graph.neighbors(rows[start:start + chunk_size], k)
+
+        neighbors = {int(artists[i]["genius_id"]): [] for i in rows[start:start + chunk_size]}
+        for i, j, score in zip(artist_rows, neighbor_rows, scores):
+            # The artist fields are joined when read, so renamed or refreshed artists show up as they are now
+            neighbors[int(artists[i]["genius_id"])].append(
+                {"genius_id": int(artists[j]["genius_id"]), "score": round(float(score), 4)})
+
+        async with async_session_maker() as session:
+            await DatabaseManager(session).set_similar_artists(neighbors)
+
+        written += len(neighbors)
+        logger.info(f"[similarity] {written}/{len(rows)} artists")
+
+    logger.info(f"[similarity] done: {written} artists")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute the related artists of every artist")
+    parser.add_argument("--top-k", type=int, default=config.SIMILARITY_TOP_K)
+    parser.add_argument("--chunk-size", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--missing-only", action="store_true",
+                        help="only artists added since the last run, their neighbors are left as they are")
+    args = parser.parse_args()
+    asyncio.run(build_similarity(args.top_k, args.chunk_size, args.batch_size, args.missing_only))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+import re
+from collections import Counter
+
+
+# Section headers like [Chorus] or [Verse 2: Artist] aren't part of the lyrics
+SECTION_HEADER = re.compile(r"\[[^\]]*\]")
+# Runs of letters in any script, keeping inner apostrophes (don't, l'amour)
+WORD = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)*")
+
+# Vocal fillers are frequent in every language and say nothing about an artist
+FILLERS = {
+    "oh", "ooh", "oooh", "ah", "ahh", "aah", "uh", "huh", "mm", "mmm", "hmm", "yeah", "yea", "ya", "yo",
+    "hey", "ay", "ayy", "eh", "la", "na", "da", "woah", "whoa", "wo", "ha", "hah"
+}
+
+STOPWORDS = {
+    "en": {
+        "a", "about", "after", "again", "all", "am", "an", "and", "any", "are", "as", "at", "be", "because",
+        "been", "before", "but", "by", "can", "can't", "could", "did", "do", "does", "don't", "down", "for",
+        "from", "get", "got", "had", "has", "have", "he", "her", "here", "him", "his", "how", "i", "i'd",
+        "i'll", "i'm", "i've", "if", "in", "into", "is", "isn't", "it", "it's", "its", "just", "let", "like",
+        "me", "my", "no", "not", "now", "of", "off", "on", "one", "only", "or", "our", "out", "over", "same",
+        "she", "so", "some", "than", "that", "that's", "the", "their", "them", "then", "there", "these",
+        "they", "this", "those", "to", "too", "up", "us", "was", "we", "were", "what", "when", "where",
+        "which", "who", "why", "will", "with", "won't", "would", "you", "you're", "your", "ain't", "gonna",
+        "wanna", "gotta", "cause", "em"
+    },
+    "es": {
+        "a", "al", "algo", "como", "con", "cuando", "de", "del", "donde", "el", "ella", "en", "entre", "era",
+        "es", "esa", "ese", "eso", "esta", "este", "esto", "está", "estoy", "fue", "ha", "hay", "la", "las",
+        "le", "les", "lo", "los", "me", "mi", "mis", "muy", "más", "nada", "ni", "no", "nos", "o", "para",
+        "pero", "por", "porque", "que", "qué", "se", "si", "sin", "sobre", "soy", "su", "sus", "sí", "también",
+        "te", "ti", "tu", "tus", "tú", "un", "una", "uno", "y", "ya", "yo", "él"
+    },
+    "fr": {
+        "a", "au", "aux", "avec", "ce", "ces", "c'est", "dans", "de", "des", "du", "elle", "en", "est", "et",
+        "eux", "il", "ils", "j'ai", "je", "la", "le", "les", "leur", "lui", "ma", "mais", "me", "mes", "moi",
+        "mon", "ne", "nous", "on", "ou", "où", "par", "pas", "pour", "qu'il", "que", "qui", "sa", "se", "ses",
+        "si", "son", "sur", "ta", "te", "tes", "toi", "ton", "tu", "un", "une", "vos", "votre", "vous", "y"
+    },
+    "de": {
+        "aber", "alle", "als", "am", "an", "auch", "auf", "aus", "bei", "bin", "bist", "da", "das", "dass",
+        "dein", "dem", "den", "der", "des", "dich", "die", "dir", "du", "ein", "eine", "einen", "er", "es",
+        "für", "hab", "habe", "hat", "ich", "ihr", "im", "in", "ist", "ja", "kein", "mal", "man", "mein",
+        "mich", "mir", "mit", "nicht", "noch", "nur", "oder", "sich", "sie", "sind", "so", "und", "uns",
+        "von", "war", "was", "wenn", "wie", "wir", "zu", "zum"
+    },
+    "pt": {
+        "a", "ao", "as", "com", "como", "da", "das", "de", "do", "dos", "e", "ela", "ele", "em", "era", "essa",
+        "esse", "eu", "foi", "isso", "já", "lhe", "mais", "mas", "me", "meu", "minha", "na", "nao", "não",
+        "nem", "no", "nos", "o", "os", "ou", "para", "pra", "por", "que", "se", "sem", "seu", "sua", "são",
+        "te", "tem", "teu", "tu", "um", "uma", "você", "vou", "é"
+    },
+    "ru": {
+        "а", "без", "бы", "был", "была", "в", "во", "вот", "все", "всё", "вы", "да", "для", "до", "его", "ее",
+        "её", "если", "есть", "ещё", "же", "за", "и", "из", "или", "им", "их", "к", "как", "когда", "кто",
+        "ли", "мне", "мой", "меня", "мы", "на", "не", "нет", "ни", "но", "ну", "о", "он", "она", "они", "от",
+        "по", "с", "со", "так", "там", "то", "тебя", "тебе", "ты", "у", "уже", "что", "чтобы", "это", "я"
+    },
+}
+
+
+def tokenize(text: str) -> list[str]:
+    text = SECTION_HEADER.sub(" ", text).replace("’", "'")
+    return WORD.findall(text.casefold())
+
+
+def detect_language(tokens: list[str]) -> str:
+    """Pick the language whose stopwords cover most of the tokens, English when nothing matches."""
+    hits = {language: sum(token in stopwords for token in tokens) for language, stopwords in STOPWORDS.items()}
+    language = max(hits, key=hits.get)
+    return language if hits[language] else "en"
+
+
+def count_words(text: str, language: str | None = None) -> Counter:
+    """Count the meaningful words of one lyrics text, without stopwords, fillers and single letters."""
+    tokens = tokenize(text)
+    ignored = STOPWORDS[language or detect_language(tokens)] | FILLERS
+    # Counter counts an iterable in C, so this stays a single pass over the tokens
+    return Counter(token for token in tokens if len(token) > 1 and token not in ignored)
+
+
+def diff_word_counts(old_text: str | None, new_text: str) -> Counter:
+    """Signed per-word change between two versions of a lyrics text, zero entries dropped."""
+    delta = count_words(new_text)
+    if old_text:
+        delta.subtract(count_words(old_text))
+    return Counter({word: count for word, count in delta.items() if count})
@@ -1,8 +1,47 @@
 import pytest
-from unittest.mock import AsyncMock
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock
 from services.controller import ArtistController, TrackController
 
 
+class ScriptedSession:
+    """Stands in for an AsyncSession under a DatabaseManager.
+
+    Records the executed statements and answers each execute() with the next
+    scripted list of rows, readable as mappings or as scalars. Once the script
+    runs out, results are plain mocks.
+    """
+
+    def __init__(self, *results):
+        self.info = {}
+        self.results = list(results)
+        self.statements = []
+        self.commits = 0
+        self.rollbacks = 0
+
+    async def execute(self, stmt, *args, **kwargs):
+        self.statements.append(stmt)
+        res = MagicMock()
+        if self.results:
+            rows = self.results.pop(0)
+            res.mappings.return_value.all.return_value = rows
+            res.scalars.return_value.all.return_value = rows
+            res.scalar_one_or_none.return_value = rows[0] if rows else None
+        return res
+
+    async def commit(self):
+        self.commits += 1
+
+    async def rollback(self):
+        self.rollbacks += 1
+
+
+@pytest.fixture
+def scripted_session():
+    """Build a ScriptedSession from the rows each execute() returns in turn."""
+    return ScriptedSession
+
+
 @pytest.fixture
 def mock_genius():
     return AsyncMock()
@@ -20,7 +59,11 @@ def mock_spotify():
 
 @pytest.fixture
 def mock_db():
-    return AsyncMock()
+    manager = AsyncMock()
+    # transaction() and savepoint() are used as `async with` blocks
+    manager.transaction = MagicMock()
+    manager.savepoint = MagicMock()
+    return manager
 
 
 @pytest.fixture
@@ -29,7 +72,18 @@ def mock_redis():
 
 
 @pytest.fixture
-def artist_controller(mock_genius, mock_parser, mock_spotify, mock_db, mock_redis):
+def own_sessions(monkeypatch, mock_db):
+    """The sessions the controllers open for shared loads hand out mock_db too."""
+    @asynccontextmanager
+    async def session_maker():
+        yield None
+
+    monkeypatch.setattr("services.controller.async_session_maker", session_maker)
+    monkeypatch.setattr("services.controller.DatabaseManager", lambda session: mock_db)
+
+
+@pytest.fixture
+def artist_controller(mock_genius, mock_parser, mock_spotify, mock_db, mock_redis, own_sessions):
     return ArtistController(
         genius=mock_genius,
         genius_parser=mock_parser,
@@ -40,7 +94,7 @@ def artist_controller(mock_genius, mock_parser, mock_spotify, mock_db, mock_redi
 
 
 @pytest.fixture
-def track_controller(mock_genius, mock_parser, mock_spotify, mock_db):
+def track_controller(mock_genius, mock_parser, mock_spotify, mock_db, own_sessions):
     return TrackController(
         genius=mock_genius,
         genius_parser=mock_parser,
@@ -0,0 +1,60 @@
+from schemas.service_schemas import SpotifyTrack
+from services.autocomplete import NameIndex, normalize
+
+
+def name_index() -> NameIndex:
+    index = NameIndex(min_similarity=0.5)
+    index.add_artists([(1, "The Beatles", 80), (2, "Beyoncé", 90), (3, "Beck", 60)])
+    index.add_track_rows([(1, "t1", "Let It Be", "The Beatles"), (2, "t2", "Halo", "Beyoncé")])
+    return index
+
+
+def test_normalize():
+    assert normalize("  Beyoncé & JAY-Z ") == "beyonce jay z"
+
+
+def test_suggest_prefix_by_popularity():
+    suggestions = name_index().suggest("be", kind="artist")
+
+    assert [s.name for s in suggestions] == ["Beyoncé", "The Beatles", "Beck"]
+
+
+def test_suggest_from_any_word():
+    suggestions = name_index().suggest("it be")
+
+    assert suggestions[0].kind == "track"
+    assert suggestions[0].spotify_song_id == "t1"
+
+
+def test_suggest_tolerates_typos():
+    suggestions = name_index().suggest("beatels")
+
+    assert suggestions[0].name == "The Beatles"
+
+
+def test_resolve_artist():
+    index = name_index()
+
+    assert index.resolve_artist("beyonce") == 2
+    assert index.resolve_artist("beyon") is None
+
+    # A name held by two artists is left to Genius
+    index.add_artist(4, "Beck", 10)
+    assert index.resolve_artist("beck") is None
+
+
+def test_add_tracks_incrementally():
+    index = name_index()
+    index.add_tracks(2, [SpotifyTrack(spotify_song_id="t3", artists="Beyoncé", title="Halo (Live)",
+                                      release_date="2009-01-01", cover_url=None, preview_url=None)])
+
+    assert [s.spotify_song_id for s in index.suggest("halo", kind="track")] == ["t2", "t3"]
+
+
+def test_keys_stay_sorted_across_incremental_and_bulk_adds():
+    index = name_index()
+    index.add_artists([(100 + i, f"Artist {i}", i) for i in range(200)])
+    index.add_artist(5, "Aaron", 1)
+    index.add_artist(6, "Zed", 1)
+
+    assert index._keys == sorted(index._keys)
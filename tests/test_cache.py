@@ -0,0 +1,107 @@
+import time
+import pytest
+import asyncio
+
+from redis.exceptions import ConnectionError as RedisConnectionError
+from core.cache import LayeredCache, LocalCache, Uncached
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def setex(self, key, ttl, value):
+        self.data[key] = value
+
+    async def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+
+@pytest.fixture
+def cache():
+    return LayeredCache(FakeRedis(), namespace="artist", ttl=60, stale_ttl=600,
+                        local=LocalCache(max_size=10, ttl=10))
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_load_once(cache):
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return '{"name": "Test Artist"}'
+
+    results = await asyncio.gather(*(cache.get_or_load("1", loader) for _ in range(10)))
+
+    assert calls == 1
+    assert set(results) == {'{"name": "Test Artist"}'}
+    assert "cache:artist:1" in cache.redis_client.data
+
+
+@pytest.mark.asyncio
+async def test_redis_tier_is_shared(cache):
+    await cache.set("1", "payload")
+
+    other_worker = LayeredCache(cache.redis_client, namespace="artist", ttl=60, stale_ttl=600,
+                                local=LocalCache(max_size=10, ttl=10))
+
+    async def loader():
+        raise AssertionError("must be served from Redis")
+
+    assert await other_worker.get_or_load("1", loader) == "payload"
+
+
+@pytest.mark.asyncio
+async def test_stale_entry_is_served_and_revalidated(cache):
+    cache.redis_client.data["cache:artist:1"] = f"{time.time() - 1}|old"
+
+    async def refresher():
+        return "new"
+
+    assert await cache.get_or_load("1", refresher) == "old"
+
+    await asyncio.sleep(0.01)
+    assert await cache.get_or_load("1", refresher) == "new"
+
+
+@pytest.mark.asyncio
+async def test_invalidate_drops_both_tiers(cache):
+    await cache.set("1", "payload")
+    await cache.set("2", "payload")
+    await cache.set("3", "payload")
+    await cache.invalidate("1")
+    await cache.invalidate("2", "3")
+
+    assert all(cache.local.get(key) is None for key in ("1", "2", "3"))
+    assert cache.redis_client.data == {}
+
+
+@pytest.mark.asyncio
+async def test_invalidate_survives_redis_errors():
+    class DownRedis(FakeRedis):
+        async def delete(self, *keys):
+            raise RedisConnectionError("down")
+
+    cache = LayeredCache(DownRedis(), namespace="artist", ttl=60, stale_ttl=600,
+                         local=LocalCache(max_size=10, ttl=10))
+    await cache.set("1", "payload")
+
+    await cache.invalidate("1")
+
+    assert cache.local.get("1") is None
+
+
+@pytest.mark.asyncio
+async def test_uncached_payload_is_not_stored(cache):
+    async def loader():
+        return Uncached('{"status": "pending"}')
+
+    assert await cache.get_or_load("1", loader) == '{"status": "pending"}'
+    assert cache.redis_client.data == {}
+    assert cache.local.get("1") is None
@@ -1,9 +1,38 @@
 import pytest
-import json
+import asyncio
 
+from collections import Counter
+from core.cache import Uncached
 from core.logger import logger
-from unittest.mock import MagicMock
-from schemas.service_schemas import GeniusArtist, SpotifyArtist, SpotifyTrackDetails
+from fastapi import HTTPException
+from unittest.mock import AsyncMock, MagicMock
+from services.autocomplete import NameIndex
+from services.controller import TrackController, RequestCounter, ARTIST_REQUESTS_KEY
+from schemas.service_schemas import GeniusArtist, SpotifyArtist, SpotifyTrackDetails, StoredTrack, TrackBundle, Lyrics
+
+
+def stored_track() -> StoredTrack:
+    return StoredTrack(
+        artist_id=1234,
+        spotify_song_id="id123",
+        artists="Test Artist",
+        title="Test Song",
+        release_date=None,
+        cover_url=None,
+        preview_url=None
+    )
+
+
+def track_details() -> SpotifyTrackDetails:
+    return SpotifyTrackDetails(
+        key="C#m",
+        bpm="120",
+        camelot="12A",
+        popularity="85",
+        energy="85",
+        danceability="85",
+        happiness="85"
+    )
 
 
 @pytest.mark.asyncio
@@ -33,7 +62,7 @@ async def test_get_artist(artist_controller, mock_db, mock_genius, mock_spotify,
     mock_redis.get.return_value = None
 
     mock_genius.get_artist_id.return_value = genius_id
-    mock_db.get_artist.return_value = MagicMock(json=json.dumps(artist_json))
+    mock_db.get_artist.return_value = MagicMock(json=artist_json, top_words=["love", "night"])
     mock_db.get_tracks.return_value = [
         MagicMock(_asdict=lambda: {
             "spotify_song_id": "id123",
@@ -60,6 +89,7 @@ async def test_get_artist(artist_controller, mock_db, mock_genius, mock_spotify,
     assert "genius" in res_dict
     assert "spotify" in res_dict
     assert "spotify_tracks" in res_dict
+    assert res_dict["most_popular_words"] == ["love", "night"]
 
     # Checks that the method was actually called once
     mock_genius.get_artist_id.assert_awaited_once()
@@ -154,7 +184,7 @@ async def test_get_artist_id_with_redis(artist_controller, mock_db, mock_genius,
 
     mock_redis.get.return_value = str(genius_id)
 
-    mock_db.get_artist.return_value = MagicMock(json=json.dumps(artist_json))
+    mock_db.get_artist.return_value = MagicMock(json=artist_json, top_words=None)
     mock_db.get_tracks.return_value = [
         MagicMock(_asdict=lambda: {
             "spotify_song_id": "id123",
@@ -182,9 +212,10 @@ async def test_get_artist_id_with_redis(artist_controller, mock_db, mock_genius,
     assert "spotify" in res_dict
     assert "spotify_tracks" in res_dict
 
-    # Checks that the method was actually called once
-    mock_genius.get_artist_id.assert_awaited_once()
-    mock_redis.get.assert_awaited_once()
+    # The cached name -> id mapping spares the Genius search
+    mock_genius.get_artist_id.assert_not_awaited()
+    # The same client backs the artist cache, which is read too
+    mock_redis.get.assert_any_await("test artist")
 
     mock_db.get_artist.assert_awaited_once()
     mock_db.get_tracks.assert_awaited_once()
@@ -208,7 +239,7 @@ async def test_get_track_data_without_saving(track_controller, mock_spotify, moc
     mock_genius.get_artist_song.return_value = "http://genius.com/test-song"
     mock_parser.get_songs_text.return_value = "These are the lyrics"
 
-    result = await track_controller.get_one_track("Test Artist", "Test Track")
+    result = await track_controller.get_track_data_without_saving("Test Artist", "Test Track")
     
     assert "track" in result
     assert "details" in result
@@ -222,49 +253,30 @@ async def test_get_track_data_without_saving(track_controller, mock_spotify, moc
 
 @pytest.mark.asyncio
 async def test_get_track_with_data_from_db(track_controller, mock_db):
-    mock_track = MagicMock() 
-    mock_track._asdict.return_value = {
-        "spotify_song_id": "id123",
-        "artists": "Test Artist",
-        "title": "Test Song"
-    }
-    mock_db.get_one_track.return_value = mock_track
-    
-    mock_track_details = MagicMock()
-    mock_track_details._asdict.return_value = {"bpm": 122}
-    mock_db.get_track_details.return_value = mock_track_details
-    
-    mock_lyrics = MagicMock()
-    mock_lyrics._asdict.return_value = {"lyrics": "These are the lyrics"}
-    mock_db.get_lyrics.return_value = mock_lyrics
+    mock_db.get_track_bundle.return_value = TrackBundle(
+        track=stored_track(),
+        details=track_details(),
+        lyrics=Lyrics(text="These are the lyrics")
+    )
 
     result = await track_controller.get_track_with_data("id123")
 
-    assert "track" in result
-    assert result["track"]["artists"] == "Test Artist"
+    assert result.track.artists == "Test Artist"
 
     logger.info(result)
 
-    assert "details" in result
-    assert "lyrics" in result 
-    
-    mock_db.get_one_track.assert_awaited_once()
+    assert result.details.bpm == "120"
+    assert result.lyrics.text == "These are the lyrics"
+
+    # Track, details and lyrics come from a single query
+    mock_db.get_track_bundle.assert_awaited_once()
 
 
 @pytest.mark.asyncio
 async def test_get_track_with_data_from_api(track_controller, mock_spotify, mock_genius, mock_parser, mock_db):
-    mock_track = MagicMock() 
-    mock_track._asdict.return_value = {
-        "spotify_song_id": "id123",
-        "artists": "Test Artist",
-        "title": "Test Song"
-    }
-    mock_db.get_one_track.return_value = mock_track
-   
-    mock_db.get_track_details.return_value = None
-    mock_db.get_lyrics.return_value = None
+    mock_db.get_track_bundle.return_value = TrackBundle(track=stored_track(), details=None, lyrics=None)
 
-    mock_spotify.get_track_details.return_value = {"bpm": 122}
+    mock_spotify.get_track_details.return_value = track_details()
     mock_genius.get_artist_song.return_value = "http://genius.com/song"
     mock_parser.get_songs_text.return_value = "Lyrics from API"
 
@@ -272,11 +284,211 @@ async def test_get_track_with_data_from_api(track_controller, mock_spotify, mock
 
     logger.info(result)
 
-    assert result["lyrics"] == "Lyrics from API"
+    assert result.lyrics.text == "Lyrics from API"
 
     mock_spotify.get_track_details.assert_awaited_once()
     mock_genius.get_artist_song.assert_awaited_once()
     mock_parser.get_songs_text.assert_awaited_once()
 
     mock_db.add_track_details.assert_awaited_once()
-    mock_db.add_lyrics.assert_awaited_once()
\ No newline at end of file
+    mock_db.add_lyrics.assert_awaited_once()
+    # New lyrics feed the artist's word counts
+    artist_id, counts, _ = mock_db.add_word_counts.await_args.args
+    assert artist_id == stored_track().artist_id
+    assert counts == Counter({"lyrics": 1, "api": 1})
+
+
+@pytest.mark.asyncio
+async def test_track_with_rolled_back_lyrics_is_not_cached(track_controller, mock_spotify, mock_genius, mock_parser,
+                                                           mock_db):
+    mock_db.get_track_bundle.return_value = TrackBundle(track=stored_track(), details=None, lyrics=None)
+    mock_spotify.get_track_details.return_value = track_details()
+    mock_genius.get_artist_song.return_value = "http://genius.com/song"
+    mock_parser.get_songs_text.return_value = "Lyrics from API"
+    mock_db.add_lyrics.side_effect = Exception("lyrics write failed")
+    # savepoint(optional=True) swallows the error
+    mock_db.savepoint.return_value.__aexit__.return_value = True
+
+    result = await track_controller.get_track_json("id123")
+
+    assert isinstance(result, Uncached)
+    assert TrackBundle.model_validate_json(result).lyrics.text == "Lyrics from API"
+    mock_db.add_track_details.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_track_without_lyrics_is_stored(track_controller, mock_spotify, mock_genius, mock_parser, mock_db):
+    mock_db.get_track_bundle.return_value = TrackBundle(track=stored_track(), details=None, lyrics=None)
+    mock_spotify.get_track_details.return_value = track_details()
+    mock_genius.get_artist_song.return_value = None
+    mock_parser.get_songs_text.return_value = None
+    mock_db.add_lyrics.return_value = True
+    # Let an error raised under the savepoint fail the test instead of being swallowed
+    mock_db.savepoint.return_value.__aexit__.return_value = False
+
+    result = await track_controller.get_track_json("id123")
+
+    assert not isinstance(result, Uncached)
+    assert TrackBundle.model_validate_json(result).lyrics.text is None
+    mock_db.add_lyrics.assert_awaited_once_with("id123", None)
+    mock_db.add_word_counts.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_get_track_with_data_fetches_only_missing_lyrics(track_controller, mock_spotify, mock_genius,
+                                                               mock_parser, mock_db):
+    mock_db.get_track_bundle.return_value = TrackBundle(track=stored_track(), details=track_details(), lyrics=None)
+
+    mock_genius.get_artist_song.return_value = "http://genius.com/song"
+    mock_parser.get_songs_text.return_value = "Lyrics from API"
+
+    result = await track_controller.get_track_with_data("id123")
+
+    assert result.details == track_details()
+    assert result.lyrics.text == "Lyrics from API"
+
+    mock_spotify.get_track_details.assert_not_awaited()
+    mock_db.add_track_details.assert_not_awaited()
+    mock_db.add_lyrics.assert_awaited_once_with("id123", "Lyrics from API")
+    mock_db.savepoint.assert_called_once_with(optional=True)
+
+
+@pytest.mark.asyncio
+async def test_get_track_with_data_not_found(track_controller, mock_db):
+    mock_db.get_track_bundle.return_value = None
+
+    with pytest.raises(HTTPException) as exc_info:
+        await track_controller.get_track_with_data("missing")
+
+    assert exc_info.value.status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_get_artist_upstream_failure_is_not_saved(artist_controller, mock_db, mock_genius, mock_spotify, mock_redis):
+    mock_redis.get.return_value = None
+
+    mock_genius.get_artist_id.return_value = 1234
+    mock_db.get_artist.return_value = None
+    mock_db.get_tracks.return_value = []
+
+    mock_genius.get_artist.side_effect = HTTPException(status_code=404, detail="Failed to fetch Genius data")
+    mock_spotify.get_artist_top_tracks.return_value = []
+
+    # The original exception surfaces, not an ExceptionGroup from the task group
+    with pytest.raises(HTTPException):
+        await artist_controller.get_artist("Test Artist")
+
+    mock_db.add_artist.assert_not_called()
+    mock_db.add_tracks.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_track_misses_are_coalesced(track_controller, mock_spotify, mock_genius, mock_parser, mock_db):
+    mock_db.get_track_bundle.side_effect = lambda spotify_song_id: TrackBundle(
+        track=stored_track(), details=None, lyrics=None)
+
+    async def slow_details(spotify_song_id):
+        await asyncio.sleep(0.01)
+        return track_details()
+
+    mock_spotify.get_track_details.side_effect = slow_details
+    mock_genius.get_artist_song.return_value = "http://genius.com/song"
+    mock_parser.get_songs_text.return_value = "Lyrics from API"
+
+    results = await asyncio.gather(*(track_controller.get_track_with_data("id123") for _ in range(5)))
+
+    assert all(result.lyrics.text == "Lyrics from API" for result in results)
+    mock_spotify.get_track_details.assert_awaited_once()
+    mock_db.add_track_details.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_shared_track_fetch_uses_its_own_session(mock_genius, mock_parser, mock_spotify, mock_db, own_sessions):
+    request_db = AsyncMock()
+    request_db.get_track_bundle.return_value = TrackBundle(track=stored_track(), details=None, lyrics=None)
+    track_controller = TrackController(genius=mock_genius, genius_parser=mock_parser, spotify=mock_spotify,
+                                       manager=request_db)
+    mock_db.get_track_bundle.return_value = TrackBundle(track=stored_track(), details=None, lyrics=None)
+    mock_spotify.get_track_details.return_value = track_details()
+    mock_genius.get_artist_song.return_value = "http://genius.com/song"
+    mock_parser.get_songs_text.return_value = "Lyrics from API"
+
+    await track_controller.get_track_with_data("id123")
+
+    mock_db.add_track_details.assert_awaited_once()
+    request_db.add_track_details.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_update_lyrics_applies_word_count_diff(track_controller, mock_db):
+    mock_db.update_lyrics.return_value = {"old_text": "love love night", "artist_id": 1234}
+
+    await track_controller.update_lyrics("id123", "love night dance")
+
+    mock_db.update_lyrics.assert_awaited_once_with("id123", "love night dance")
+    artist_id, counts, _ = mock_db.add_word_counts.await_args.args
+    assert artist_id == 1234
+    assert counts == Counter({"love": -1, "dance": 1})
+
+
+@pytest.mark.asyncio
+async def test_stored_artist_is_resolved_without_genius(artist_controller, mock_genius, mock_redis):
+    artist_controller.name_index = NameIndex()
+    artist_controller.name_index.add_artist(1234, "Test Artist", 80)
+    artist_controller.cache = AsyncMock()
+    artist_controller.cache.get_or_load.return_value = "{}"
+
+    await artist_controller.get_artist_json("test artist ")
+
+    assert artist_controller.cache.get_or_load.await_args.args[0] == "1234"
+    mock_genius.get_artist_id.assert_not_awaited()
+    mock_redis.get.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_track_miss_is_queued_and_pending(track_controller, mock_db, mock_spotify):
+    mock_db.get_track_bundle.return_value = TrackBundle(track=stored_track(), details=None, lyrics=None)
+    track_controller.enrichment = AsyncMock()
+    track_controller.enrichment_wait = 1
+    track_controller.enrichment.wait.return_value = False
+
+    result = await track_controller.get_track_with_data("id123")
+
+    track_controller.enrichment.enqueue.assert_awaited_once_with(["id123"])
+    assert result.status == "pending"
+    mock_spotify.get_track_details.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_track_miss_waits_for_enrichment(track_controller, mock_db):
+    mock_db.get_track_bundle.side_effect = [
+        TrackBundle(track=stored_track(), details=None, lyrics=None),
+        TrackBundle(track=stored_track(), details=track_details(), lyrics=Lyrics(text="Lyrics from worker"))
+    ]
+    track_controller.enrichment = AsyncMock()
+    track_controller.enrichment_wait = 1
+    track_controller.enrichment.wait.return_value = True
+
+    result = await track_controller.get_track_with_data("id123")
+
+    assert result.status == "complete"
+    assert result.lyrics.text == "Lyrics from worker"
+
+
+@pytest.mark.asyncio
+async def test_artist_requests_are_counted_in_batches():
+    fakeredis = pytest.importorskip("fakeredis")
+    redis_client = fakeredis.FakeAsyncRedis(decode_responses=True)
+    counter = RequestCounter(redis_client, flush_interval=60)
+
+    for genius_artist_id in (1, 2, 1, 1):
+        counter.record(genius_artist_id)
+    # Nothing reaches Redis on the request path
+    assert await redis_client.zscore(ARTIST_REQUESTS_KEY, "1") is None
+
+    await counter.flush()
+    counter.record(2)
+    await counter.close()
+
+    assert await redis_client.zscore(ARTIST_REQUESTS_KEY, "1") == 3
+    assert await redis_client.zscore(ARTIST_REQUESTS_KEY, "2") == 2
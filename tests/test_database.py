@@ -0,0 +1,43 @@
+import pytest
+
+from types import SimpleNamespace
+from sqlalchemy import select, insert
+from db import database
+from db.database import RoutingSession
+from db.models import artist
+
+
+@pytest.fixture
+def engines(monkeypatch):
+    primary = SimpleNamespace(sync_engine="primary")
+    replicas = [SimpleNamespace(sync_engine="replica-1"), SimpleNamespace(sync_engine="replica-2")]
+    monkeypatch.setattr(database, "engine", primary)
+    monkeypatch.setattr(database, "replica_engines", replicas)
+    return primary, replicas
+
+
+def test_flagged_selects_go_to_one_replica(engines):
+    session = RoutingSession()
+    session.info["replica"] = True
+
+    bind = session.get_bind(clause=select(artist))
+
+    assert bind.startswith("replica")
+    assert all(session.get_bind(clause=select(artist.c.name)) == bind for _ in range(10))
+
+
+def test_writes_locks_and_unflagged_reads_go_to_primary(engines):
+    session = RoutingSession()
+    assert session.get_bind(clause=select(artist)) == "primary"
+
+    session.info["replica"] = True
+    assert session.get_bind(clause=select(artist).with_for_update()) == "primary"
+    assert session.get_bind(clause=insert(artist).values(genius_id=1)) == "primary"
+
+
+def test_without_replicas_everything_goes_to_primary(engines, monkeypatch):
+    monkeypatch.setattr(database, "replica_engines", [])
+    session = RoutingSession()
+    session.info["replica"] = True
+
+    assert session.get_bind(clause=select(artist)) == "primary"
@@ -0,0 +1,188 @@
+import pytest
+
+from datetime import datetime, timedelta
+from sqlalchemy.dialects import postgresql
+from db.db_manager import DatabaseManager, encode_cursor, decode_cursor, replica_read
+from schemas.service_schemas import LikesBatch
+
+
+def liked_artist_rows(count: int) -> list[dict]:
+    now = datetime(2026, 1, 1)
+    return [{"genius_id": i, "name": f"Artist {i}", "avatar_url": None,
+             "like_id": 100 - i, "liked_at": now - timedelta(minutes=i)} for i in range(count)]
+
+
+def test_cursor_round_trip():
+    liked_at = datetime(2026, 1, 1, 12, 30, 15, 123456)
+    assert decode_cursor(encode_cursor(liked_at, 42)) == (liked_at, 42)
+
+    with pytest.raises(ValueError):
+        decode_cursor("not a cursor")
+
+
+@pytest.mark.asyncio
+async def test_liked_artists_page_has_next_cursor(scripted_session):
+    rows = liked_artist_rows(3)
+    manager = DatabaseManager(scripted_session(rows))
+
+    page = await manager.get_liked_artists(user_id=1, limit=2)
+
+    assert [item.genius_id for item in page.items] == [0, 1]
+    assert decode_cursor(page.next_cursor) == (rows[1]["liked_at"], rows[1]["like_id"])
+
+
+@pytest.mark.asyncio
+async def test_liked_artists_last_page(scripted_session):
+    manager = DatabaseManager(scripted_session(liked_artist_rows(2)))
+
+    page = await manager.get_liked_artists(user_id=1, limit=2, cursor=encode_cursor(datetime(2026, 1, 2), 7))
+
+    assert len(page.items) == 2
+    assert page.next_cursor is None
+    assert "(user_liked_artist.liked_at, user_liked_artist.id) <" in str(manager.session.statements[0])
+
+
+@pytest.mark.asyncio
+async def test_apply_likes_batch(scripted_session):
+    session = scripted_session(
+        ["a"],        # tracks inserted
+        ["b"],        # remaining tracks that exist
+        ["d"],        # tracks deleted
+        [],           # artists inserted
+        [],           # remaining artists that exist
+    )
+    manager = DatabaseManager(session)
+    batch = LikesBatch(
+        tracks=[{"action": "unlike", "track_id": "a"}, {"action": "like", "track_id": "a"},
+                {"action": "like", "track_id": "b"}, {"action": "like", "track_id": "c"},
+                {"action": "unlike", "track_id": "d"}],
+        artists=[{"action": "like", "artist_id": 7}]
+    )
+
+    result = await manager.apply_likes(user_id=1, batch=batch)
+
+    assert [item.status for item in result.tracks] == ["superseded", "liked", "unchanged", "not_found", "unliked"]
+    assert [item.status for item in result.artists] == ["not_found"]
+    # One commit for the whole batch
+    assert session.commits == 1
+
+    insert_sql = str(session.statements[0].compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (user_id, track_id) DO NOTHING RETURNING" in insert_sql
+
+
+class ReplicaProbe(DatabaseManager):
+    @replica_read
+    async def read(self):
+        return self.session.info.get("replica")
+
+
+@pytest.mark.asyncio
+async def test_replica_read_flags_the_session_outside_transactions(scripted_session):
+    manager = ReplicaProbe(scripted_session())
+
+    assert await manager.read() is True
+    assert "replica" not in manager.session.info
+
+    # Inside a unit of work the read has to see the pending writes
+    async with manager.transaction():
+        assert await manager.read() is None
+
+
+def search_rows(count: int, snippet: str | None = "<b>love</b> me") -> list[dict]:
+    return [{"artist_id": 1, "spotify_song_id": f"id{i}", "artists": "Artist", "title": f"Song {i}",
+             "cover_url": None, "rank": 1.0 - i / 10, "snippet": snippet} for i in range(count)]
+
+
+@pytest.mark.asyncio
+async def test_search_tracks_fulltext_page(scripted_session):
+    session = scripted_session(search_rows(3))
+    manager = DatabaseManager(session)
+
+    page = await manager.search_tracks("love", limit=2)
+
+    assert [item.spotify_song_id for item in page.items] == ["id0", "id1"]
+    assert page.items[0].snippet == "<b>love</b> me"
+    assert page.next_offset == 2
+    assert not page.fuzzy
+
+    sql = str(session.statements[0].compile(dialect=postgresql.dialect()))
+    assert "track.search_vector @@ websearch_to_tsquery('simple'::regconfig" in sql
+    assert "lyrics.search_vector @@ websearch_to_tsquery('simple'::regconfig" in sql
+    assert "ts_headline" in sql
+
+
+@pytest.mark.asyncio
+async def test_search_tracks_falls_back_to_trigrams(scripted_session):
+    session = scripted_session([], search_rows(1, snippet=None))
+    manager = DatabaseManager(session)
+
+    page = await manager.search_tracks("lvoe", limit=2)
+
+    assert page.fuzzy
+    assert page.next_offset is None
+    assert page.items[0].snippet is None
+    assert "similarity(track.title" in str(session.statements[1].compile(dialect=postgresql.dialect()))
+
+
+@pytest.mark.asyncio
+async def test_search_tracks_no_fallback_past_first_page(scripted_session):
+    manager = DatabaseManager(scripted_session([]))
+
+    page = await manager.search_tracks("love", limit=2, offset=2)
+
+    assert page.items == []
+    assert not page.fuzzy
+
+
+@pytest.mark.asyncio
+async def test_refresh_artist_writes_changed_columns(scripted_session):
+    session = scripted_session([], [], [])
+    manager = DatabaseManager(session)
+    previous = {"genius": {"name": "A"}, "spotify": {"popularity": 50, "followers_count": 10, "genres": ["pop", "rock"]}}
+    data = {"genius": {"name": "A"}, "spotify": {"id": "sp1", "popularity": 60, "followers_count": 10,
+                                                 "genres": ["pop", "dance"]}}
+
+    changed = await manager.refresh_artist(1, data, previous)
+
+    assert changed == ["popularity", "genres", "json"]
+    update_sql = str(session.statements[0].compile(dialect=postgresql.dialect()))
+    assert "popularity=" in update_sql and "parse_date=now()" in update_sql
+    assert "name=" not in update_sql and "followers_count=" not in update_sql
+    # Genres are synced both ways
+    assert "INSERT INTO artist_genre" in str(session.statements[1])
+    assert "DELETE FROM artist_genre" in str(session.statements[2])
+
+
+@pytest.mark.asyncio
+async def test_similar_artists_join_live_rows_in_neighbor_order(scripted_session):
+    neighbors = [{"genius_id": 2, "score": 0.9}, {"genius_id": 3, "score": 0.7},
+                 {"genius_id": 4, "score": 0.5}, {"genius_id": 5, "score": 0.1}]
+    live = [{"genius_id": 4, "name": "Four", "popularity": 40}, {"genius_id": 3, "name": "Three", "popularity": 30}]
+    session = scripted_session([neighbors], live)
+    manager = DatabaseManager(session)
+
+    artists = await manager.get_similar_artists(artist_id=1, limit=3, offset=0)
+
+    # Artist 2 was deleted since the neighbors were computed
+    assert artists == [{"genius_id": 3, "name": "Three", "popularity": 30, "score": 0.7},
+                       {"genius_id": 4, "name": "Four", "popularity": 40, "score": 0.5}]
+    assert "artist.genius_id IN" in str(session.statements[1])
+
+
+@pytest.mark.asyncio
+async def test_similar_artists_none_until_computed(scripted_session):
+    assert await DatabaseManager(scripted_session([])).get_similar_artists(artist_id=1) is None
+    assert await DatabaseManager(scripted_session([[{"genius_id": 2, "score": 0.9}]])).get_similar_artists(
+        artist_id=1, offset=5) == []
+
+
+@pytest.mark.asyncio
+async def test_set_similar_artists_upserts(scripted_session):
+    session = scripted_session()
+    manager = DatabaseManager(session)
+
+    await manager.set_similar_artists({1: [{"genius_id": 2, "score": 0.9}], 2: []})
+
+    sql = str(session.statements[0].compile(dialect=postgresql.dialect()))
+    assert "ON CONFLICT (artist_id) DO UPDATE SET neighbors = excluded.neighbors" in sql
+    assert session.commits == 1
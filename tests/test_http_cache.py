@@ -0,0 +1,82 @@
+import time
+import pytest
+import aiohttp
+
+from core.http_cache import HttpCache, DiskResponseStore, UpstreamResponse, cache_key
+
+
+class Upstream:
+    def __init__(self, *responses: UpstreamResponse | Exception):
+        self.responses = list(responses)
+        self.requests = []
+
+    async def fetch(self, validators: dict[str, str]) -> UpstreamResponse:
+        self.requests.append(validators)
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def http_cache(tmp_path, ttl: float = 60) -> HttpCache:
+    return HttpCache(DiskResponseStore(str(tmp_path)), ttls={"artist": ttl}, retention=3600)
+
+
+def test_cache_key_ignores_param_order_and_token():
+    assert cache_key("https://API.genius.com/artists/1?b=2", {"a": 1, "access_token": "x"}) == \
+        cache_key("https://api.genius.com/artists/1?a=1&b=2")
+
+
+@pytest.mark.asyncio
+async def test_fresh_response_is_served_without_request(tmp_path):
+    cache = http_cache(tmp_path)
+    upstream = Upstream(UpstreamResponse(200, '{"name": "A"}', etag='"v1"'))
+
+    await cache.get("artist", "https://api/1", None, upstream.fetch)
+    response = await cache.get("artist", "https://api/1", None, upstream.fetch)
+
+    assert response.json() == {"name": "A"}
+    assert len(upstream.requests) == 1
+    assert cache.stats["fresh"] == 1
+
+
+@pytest.mark.asyncio
+async def test_stale_response_is_revalidated(tmp_path):
+    cache = http_cache(tmp_path, ttl=0.01)
+    upstream = Upstream(UpstreamResponse(200, '{"name": "A"}', etag='"v1"'), UpstreamResponse(304, ""))
+
+    await cache.get("artist", "https://api/1", None, upstream.fetch)
+    time.sleep(0.02)
+    response = await cache.get("artist", "https://api/1", None, upstream.fetch)
+
+    assert upstream.requests[1] == {"If-None-Match": '"v1"'}
+    assert response.status == 200
+    assert response.json() == {"name": "A"}
+    assert response.fresh_until > time.time()
+
+
+@pytest.mark.asyncio
+async def test_stale_response_is_served_on_upstream_error(tmp_path):
+    cache = http_cache(tmp_path, ttl=0.01)
+    upstream = Upstream(UpstreamResponse(200, '{"name": "A"}'), aiohttp.ClientError("down"),
+                        UpstreamResponse(503, "unavailable"))
+
+    await cache.get("artist", "https://api/1", None, upstream.fetch)
+    time.sleep(0.02)
+
+    assert (await cache.get("artist", "https://api/1", None, upstream.fetch)).body == '{"name": "A"}'
+    assert (await cache.get("artist", "https://api/1", None, upstream.fetch)).body == '{"name": "A"}'
+    assert cache.stats["stale"] == 2
+
+
+@pytest.mark.asyncio
+async def test_errors_and_no_store_are_not_cached(tmp_path):
+    cache = http_cache(tmp_path)
+    upstream = Upstream(UpstreamResponse(404, "missing"), UpstreamResponse(200, "{}", cache_control="no-store"),
+                        UpstreamResponse(200, "{}"))
+
+    assert (await cache.get("artist", "https://api/1", None, upstream.fetch)).status == 404
+    await cache.get("artist", "https://api/1", None, upstream.fetch)
+    await cache.get("artist", "https://api/1", None, upstream.fetch)
+
+    assert len(upstream.requests) == 3
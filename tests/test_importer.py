@@ -0,0 +1,65 @@
+import json
+import pytest
+
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock
+from core.throttle import Throttle
+from schemas.service_schemas import GeniusArtist, SpotifyArtist
+from services.importer import ArtistImporter, Checkpoint
+
+
+def importer(tmp_path, genius=None, spotify=None, batch_size: int = 10) -> ArtistImporter:
+    return ArtistImporter(genius=genius or AsyncMock(), spotify=spotify or AsyncMock(),
+                          checkpoint=Checkpoint(str(tmp_path / "import.checkpoint")), concurrency=2,
+                          batch_size=batch_size, genius_throttle=Throttle(0), spotify_throttle=Throttle(0))
+
+
+def upstreams() -> tuple[AsyncMock, AsyncMock]:
+    genius, spotify = AsyncMock(), AsyncMock()
+    genius.get_artist_id.side_effect = lambda name: len(name)
+    genius.get_artist.side_effect = lambda genius_id: GeniusArtist(
+        id=genius_id, name=f"Artist {genius_id}", alternate_names=[], instagram_name=None, twitter_name=None,
+        followers_count=1, header_image_url=None, image_url=None, url="http://genius.com/artist")
+    spotify.get_artist.return_value = SpotifyArtist(name="Artist", avatar_photo="http://spotify.jpg", popularity=1,
+                                                    followers_count=1, genres=[])
+    spotify.get_artist_top_tracks.return_value = []
+    return genius, spotify
+
+
+def test_checkpoint_resumes_only_finished_names(tmp_path):
+    checkpoint = Checkpoint(str(tmp_path / "import.checkpoint"))
+    checkpoint.record([{"name": "a", "status": "imported"}, {"name": "b", "status": "skipped"},
+                       {"name": "c", "status": "failed", "error": "boom"}])
+    with open(checkpoint.path, "a", encoding="utf-8") as file:
+        file.write('{"name": "d", "sta')
+
+    checkpoint.load()
+
+    assert checkpoint.done == {"a", "b"}
+
+
+@pytest.mark.asyncio
+async def test_failed_batch_is_checkpointed_as_failed(tmp_path, monkeypatch):
+    @asynccontextmanager
+    async def broken_session():
+        raise ConnectionError("database is down")
+        yield
+
+    monkeypatch.setattr("services.importer.async_session_maker", broken_session)
+    monkeypatch.setattr(ArtistImporter, "is_stored", AsyncMock(return_value=False))
+    genius, spotify = upstreams()
+    artist_importer = importer(tmp_path, genius, spotify, batch_size=2)
+
+    # Neither the batch flush nor the final one raises, the run goes on
+    await artist_importer.run(["ab", "abc", "abcd"])
+
+    with open(artist_importer.checkpoint.path, encoding="utf-8") as file:
+        entries = [json.loads(line) for line in file]
+    assert sorted(entry["name"] for entry in entries) == ["ab", "abc", "abcd"]
+    assert all(entry["status"] == "failed" for entry in entries)
+    assert artist_importer.stats == {"imported": 0, "skipped": 0, "failed": 3}
+
+    # A rerun retries the whole batch
+    resumed = importer(tmp_path)
+    resumed.checkpoint.load()
+    assert resumed.checkpoint.done == set()
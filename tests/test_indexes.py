@@ -0,0 +1,118 @@
+import os
+import json
+import pytest
+import importlib.util
+
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from alembic.migration import MigrationContext
+from alembic.operations import Operations
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from db.db_manager import DatabaseManager
+from db.models import artist, metadata, user, user_liked_artist
+
+
+TEST_DATABASE_URL = os.environ.get("TEST_DATABASE_URL")
+MIGRATIONS = Path(__file__).parent.parent / "migrations" / "versions"
+
+requires_postgres = pytest.mark.skipif(
+    not TEST_DATABASE_URL, reason="EXPLAIN needs a Postgres database in TEST_DATABASE_URL")
+
+
+async def captured(session, method, *args):
+    await method(DatabaseManager(session), *args)
+    return session.statements[0]
+
+
+def compile_sql(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+@asynccontextmanager
+async def empty_schema():
+    # Everything, including the DDL, is rolled back so the database is left untouched
+    engine = create_async_engine(TEST_DATABASE_URL)
+    async with engine.connect() as conn:
+        transaction = await conn.begin()
+        # The trigram indexes need their operator classes
+        await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        await conn.run_sync(metadata.create_all)
+        # The tables are empty, so force the planner to show which index it would use
+        await conn.execute(text("SET LOCAL enable_seqscan = off"))
+        try:
+            yield conn
+        finally:
+            await transaction.rollback()
+    await engine.dispose()
+
+
+@requires_postgres
+@pytest.mark.asyncio
+@pytest.mark.parametrize("method, args, index_name", [
+    (DatabaseManager.get_tracks, (1,), "ix_track_artist_id"),
+    (DatabaseManager.get_track_details, ("id123",), "uq_track_details_spotify_song_id"),
+    (DatabaseManager.get_lyrics, ("id123",), "uq_lyrics_spotify_song_id"),
+    (DatabaseManager.get_liked_tracks, (1,), "ix_user_liked_track_user_id_liked_at_id"),
+    (DatabaseManager.get_liked_artists, (1,), "ix_user_liked_artist_user_id_liked_at_id"),
+    (DatabaseManager.count_liked_tracks, (1,), "user_liked_track_user_id"),
+    (DatabaseManager.search_fulltext, ("love night", 21, 0), "ix_lyrics_search_vector"),
+])
+async def test_lookup_uses_index(scripted_session, method, args, index_name):
+    stmt = await captured(scripted_session(), method, *args)
+
+    async with empty_schema() as conn:
+        res = await conn.execute(text(f"EXPLAIN (FORMAT JSON) {compile_sql(stmt)}"))
+        plan = res.scalar()
+
+    plan = plan if isinstance(plan, str) else json.dumps(plan)
+    assert index_name in plan
+    assert "Seq Scan" not in plan
+
+
+@pytest.mark.asyncio
+async def test_like_is_idempotent_upsert(scripted_session):
+    track_stmt = await captured(scripted_session(), DatabaseManager.like_track, 1, "id123")
+    artist_stmt = await captured(scripted_session(), DatabaseManager.like_artist, 1, 42)
+
+    assert "ON CONFLICT (user_id, track_id) DO NOTHING" in compile_sql(track_stmt)
+    assert "ON CONFLICT (user_id, artist_id) DO NOTHING" in compile_sql(artist_stmt)
+
+
+def run_migration(conn, filename: str):
+    spec = importlib.util.spec_from_file_location(filename, MIGRATIONS / filename)
+    migration = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(migration)
+    with Operations.context(MigrationContext.configure(conn)):
+        migration.upgrade()
+
+
+@requires_postgres
+@pytest.mark.asyncio
+async def test_likes_without_liked_at_are_paged():
+    now = datetime(2026, 1, 1)
+    liked_at = [now, None, now - timedelta(minutes=1), None, None]
+
+    async with empty_schema() as conn:
+        # The schema as it was before liked_at became NOT NULL
+        await conn.execute(text("ALTER TABLE user_liked_artist ALTER COLUMN liked_at DROP NOT NULL"))
+        await conn.execute(user.insert().values(id=1, email="a@b.c", username="a", hashed_password="x",
+                                               registered_at=now))
+        await conn.execute(artist.insert(), [{"genius_id": i, "name": f"Artist {i}"} for i in range(len(liked_at))])
+        await conn.execute(user_liked_artist.insert(),
+                           [{"user_id": 1, "artist_id": i, "liked_at": at} for i, at in enumerate(liked_at)])
+        await conn.run_sync(run_migration, "b6e2f17c4d90_made_liked_at_not_nullable.py")
+
+        manager = DatabaseManager(AsyncSession(bind=conn))
+        seen, cursor = [], None
+        while True:
+            page = await manager.get_liked_artists(user_id=1, limit=2, cursor=cursor)
+            seen += [item.genius_id for item in page.items]
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+
+    # Dated likes newest first, then the undated ones by id
+    assert seen == [0, 2, 4, 3, 1]
@@ -0,0 +1,108 @@
+import time
+import pytest
+import asyncio
+
+from core.job_queue import JobQueue
+
+fakeredis = pytest.importorskip("fakeredis", reason="the queue scripts need fakeredis[lua]")
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeAsyncRedis(decode_responses=True)
+
+
+def job_queue(redis_client, max_attempts: int = 3, retry_base_delay: float = 10,
+              lease_timeout: float = 60) -> JobQueue:
+    return JobQueue(redis_client, name="test", max_attempts=max_attempts, retry_base_delay=retry_base_delay,
+                    retry_max_delay=15, lease_timeout=lease_timeout)
+
+
+@pytest.mark.asyncio
+async def test_reserve_leases_queued_ids_in_order(redis_client):
+    queue = job_queue(redis_client)
+
+    assert await queue.enqueue(["a", "b"]) == ["a", "b"]
+    assert await queue.enqueue(["a", "c"]) == ["c"]
+
+    assert [await queue.reserve() for _ in range(4)] == ["a", "b", "c", None]
+    deadline = await redis_client.zscore("jobs:test:processing", "a")
+    assert time.time() + 59 < deadline <= time.time() + 60
+
+    await queue.complete("a")
+    assert not await queue.is_queued("a")
+    assert await queue.enqueue(["a"]) == ["a"]
+
+
+@pytest.mark.asyncio
+async def test_expired_lease_is_handed_out_again(redis_client):
+    queue = job_queue(redis_client, lease_timeout=0.01)
+    await queue.enqueue(["a"])
+
+    assert await queue.reserve() == "a"
+    await asyncio.sleep(0.02)
+    # The worker holding "a" died, its lease is over
+    assert await queue.reserve() == "a"
+
+
+@pytest.mark.asyncio
+async def test_failed_job_is_retried_with_backoff(redis_client):
+    queue = job_queue(redis_client)
+    await queue.enqueue(["a"])
+    await queue.reserve()
+
+    assert await queue.fail("a", "boom")
+    first = await redis_client.zscore("jobs:test:delayed", "a") - time.time()
+    assert 4.9 < first <= 10
+    assert await queue.reserve() is None
+
+    # Due now, the next reserve moves it back to the ready list
+    await redis_client.zadd("jobs:test:delayed", {"a": time.time() - 1})
+    assert await queue.reserve() == "a"
+
+    assert await queue.fail("a", "boom")
+    # The delay doubles, capped at retry_max_delay
+    second = await redis_client.zscore("jobs:test:delayed", "a") - time.time()
+    assert 7.4 < second <= 15
+
+
+@pytest.mark.asyncio
+async def test_dead_job_stays_dead_until_retried(redis_client):
+    queue = job_queue(redis_client, max_attempts=2)
+    await queue.enqueue(["a"])
+
+    await queue.reserve()
+    assert await queue.fail("a", "first")
+    await redis_client.zadd("jobs:test:delayed", {"a": time.time() - 1})
+    await queue.reserve()
+    assert not await queue.fail("a", "last")
+
+    assert await redis_client.zscore("jobs:test:dead", "a") is not None
+    assert await redis_client.hget("jobs:test:errors", "a") == "last"
+    # Requests asking for the track again don't bring it back
+    assert await queue.enqueue(["a"]) == []
+    assert await queue.reserve() is None
+
+    assert await queue.retry_dead() == 1
+    assert await queue.reserve() == "a"
+
+
+@pytest.mark.asyncio
+async def test_wait_reports_how_the_job_ended(redis_client):
+    queue = job_queue(redis_client, max_attempts=1)
+    await queue.enqueue(["a", "b", "c"])
+
+    async def finish():
+        await asyncio.sleep(0.05)
+        await queue.complete("a")
+        await queue.fail("b", "boom")
+
+    task = asyncio.create_task(finish())
+    assert await queue.wait("a", timeout=1)
+    assert not await queue.wait("b", timeout=1)
+    await task
+
+    assert not await queue.wait("c", timeout=0.05)
+    # Already finished, or dead, before the wait started
+    assert await queue.wait("a", timeout=1)
+    assert not await queue.wait("b", timeout=1)
@@ -0,0 +1,50 @@
+import os
+import pytest
+
+from benchmarks.lyrics_extraction import extract_lyrics_soup
+from services.lyrics_extraction import LyricsExtractor, extract_lyrics
+
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "genius")
+PAGES = sorted(name for name in os.listdir(FIXTURES) if name.endswith(".html"))
+
+
+def read_page(name: str) -> bytes:
+    with open(os.path.join(FIXTURES, name), "rb") as file:
+        return file.read()
+
+
+@pytest.mark.parametrize("name", PAGES)
+def test_matches_soup_extraction(name):
+    html = read_page(name)
+
+    lyrics = extract_lyrics(html)
+
+    assert lyrics == extract_lyrics_soup(html.decode("utf-8"))
+    assert lyrics.startswith("[")
+    assert "Contributors" not in lyrics
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1024])
+def test_chunk_boundaries_do_not_matter(chunk_size):
+    html = read_page(PAGES[0])
+
+    assert extract_lyrics(html, chunk_size=chunk_size) == extract_lyrics(html)
+
+
+def test_stops_after_lyrics():
+    html = read_page(PAGES[0])
+    extractor = LyricsExtractor()
+
+    fed = 0
+    while not extractor.feed(html[fed:fed + 1024]):
+        fed += 1024
+
+    # The sidebar, footer and trailing scripts are never fed
+    assert fed + 1024 < html.index(b"PageFooterdesktop__Container")
+
+
+def test_page_without_lyrics():
+    html = b"<html><body><div class='SongHeader'>Instrumental</div></body></html>"
+
+    assert extract_lyrics(html) is None
@@ -0,0 +1,76 @@
+import json
+import httpx
+import pytest
+
+from services.applications.openai import OpenAIClient
+from services.controller import ChatController, TranslatorController
+
+
+def completion(content: str) -> dict:
+    return {
+        "id": "chatcmpl-1",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "gpt-4o-mini",
+        "choices": [{"index": 0, "finish_reason": "stop",
+                     "message": {"role": "assistant", "content": content}}]
+    }
+
+
+def completion_chunk(content: str) -> str:
+    chunk = {
+        "id": "chatcmpl-1",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": "gpt-4o-mini",
+        "choices": [{"index": 0, "finish_reason": None, "delta": {"content": content}}]
+    }
+    return f"data: {json.dumps(chunk)}\n\n"
+
+
+def fake_openai_server(request: httpx.Request) -> httpx.Response:
+    body = json.loads(request.content)
+    if body.get("stream"):
+        stream = "".join(completion_chunk(part) for part in ["Hola", ", ", "amigo"])
+        return httpx.Response(200, text=stream + "data: [DONE]\n\n",
+                              headers={"content-type": "text/event-stream"})
+    return httpx.Response(200, json=completion(" Hola, amigo "))
+
+
+@pytest.fixture
+def openai_client():
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(fake_openai_server))
+    return OpenAIClient("test-key", http_client=http_client, base_url="http://fake-openai/v1")
+
+
+@pytest.mark.asyncio
+async def test_chat(openai_client):
+    chat_controller = ChatController(openai_client)
+
+    result = await chat_controller.get_chat(message="Hello", history=[])
+
+    assert result["reply"] == "Hola, amigo"
+    assert result["history"][0] == {"role": "user", "content": "Hello"}
+
+
+@pytest.mark.asyncio
+async def test_stream_chat(openai_client):
+    chat_controller = ChatController(openai_client)
+
+    events = [event async for event in chat_controller.stream_chat(message="Hello", history=[])]
+
+    assert [event["delta"] for event in events[:-1]] == ["Hola", ", ", "amigo"]
+    assert events[-1]["done"] is True
+    assert events[-1]["reply"] == "Hola, amigo"
+
+
+@pytest.mark.asyncio
+async def test_stream_translation_is_cached(openai_client, mock_redis):
+    mock_redis.get.return_value = None
+    translator_controller = TranslatorController(openai_client, mock_redis)
+
+    events = [event async for event in translator_controller.stream_text_translation("Hello", "es", "A1")]
+
+    assert events[-1]["analysis"] == "Hola, amigo"
+    mock_redis.set.assert_awaited_once()
+    assert json.loads(mock_redis.set.call_args.args[1]) == {"analysis": "Hola, amigo"}
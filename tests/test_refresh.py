@@ -0,0 +1,58 @@
+import pytest
+
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock
+from services.refresh import ArtistRefresher, refresh_priority
+
+
+def refresher(genius_budget: int, spotify_budget: int) -> ArtistRefresher:
+    return ArtistRefresher(genius=None, spotify=None, redis_client=None, cache=None, track_cache=None,
+                           enrichment=None, genius_budget=genius_budget, spotify_budget=spotify_budget, min_age=0,
+                           candidates=100, concurrency=1)
+
+
+def test_priority_grows_with_staleness_and_demand():
+    day = 86400
+    assert refresh_priority(2 * day, 50, 0, 0) > refresh_priority(day, 50, 0, 0)
+    assert refresh_priority(day, 50, 10, 0) > refresh_priority(day, 50, 0, 0)
+    assert refresh_priority(day, 50, 0, 100) > refresh_priority(day, 90, 0, 0)
+
+
+def test_plan_stays_within_budgets():
+    rows = [{"genius_id": 1, "json": {"spotify": {"id": "a"}}},
+            {"genius_id": 2, "json": {"spotify": {}}},
+            {"genius_id": 3, "json": {"spotify": {"id": "c"}}},
+            {"genius_id": 4, "json": {"spotify": {"id": "d"}}}]
+
+    planned = refresher(genius_budget=10, spotify_budget=6).plan(rows)
+
+    # The artist without a Spotify id needs a search, the last one doesn't fit
+    assert [row["genius_id"] for row in planned] == [1, 2]
+    assert [row["genius_id"] for row in refresher(genius_budget=2, spotify_budget=100).plan(rows)] == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_refresh_drops_cached_artist_and_updated_tracks(monkeypatch):
+    manager = AsyncMock()
+    manager.transaction = MagicMock()
+    manager.refresh_artist.return_value = []
+    manager.refresh_tracks.return_value = (["new1"], ["id1", "id2"])
+
+    @asynccontextmanager
+    async def session_maker():
+        yield None
+
+    monkeypatch.setattr("services.refresh.async_session_maker", session_maker)
+    monkeypatch.setattr("services.refresh.DatabaseManager", lambda session: manager)
+    genius, spotify = AsyncMock(), AsyncMock()
+    genius.get_artist.return_value = MagicMock()
+    spotify.get_artist.return_value = MagicMock()
+    artist_refresher = ArtistRefresher(genius=genius, spotify=spotify, redis_client=None, cache=AsyncMock(),
+                                       track_cache=AsyncMock(), enrichment=AsyncMock(), genius_budget=1,
+                                       spotify_budget=2, min_age=0, candidates=100, concurrency=1)
+
+    assert await artist_refresher.refresh({"genius_id": 1, "name": "A", "json": {"spotify": {"id": "sp1"}}})
+
+    artist_refresher.cache.invalidate.assert_awaited_once_with("1")
+    artist_refresher.track_cache.invalidate.assert_awaited_once_with("id1", "id2")
+    artist_refresher.enrichment.enqueue.assert_awaited_once_with(["new1"])
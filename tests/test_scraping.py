@@ -0,0 +1,33 @@
+import time
+import pytest
+import asyncio
+
+from core.scraping import ScrapingExecutor
+from core.throttle import Throttle
+
+
+@pytest.mark.asyncio
+async def test_scraping_executor_does_not_block_loop():
+    executor = ScrapingExecutor(max_workers=2, throttle=Throttle(0.05))
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    ticker_task = asyncio.create_task(ticker())
+    results = await asyncio.gather(*(executor.run(time.sleep, 0.1) for _ in range(3)))
+    ticker_task.cancel()
+    executor.shutdown()
+
+    assert results == [None, None, None]
+    # The loop kept ticking while the blocking calls were running
+    assert ticks > 10
+
+    metrics = executor.metrics()
+    assert metrics["queue_depth"] == 0
+    assert metrics["completed"] == 3
+    # Third job waits for its throttle slot and a free worker thread
+    assert metrics["max_wait_seconds"] > 0.05
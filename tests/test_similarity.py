@@ -0,0 +1,58 @@
+import pytest
+import numpy as np
+import scipy.sparse as sp
+
+from unittest.mock import AsyncMock
+from main import get_related_artists
+from services.similarity import SimilarityGraph, top_k
+
+
+def test_top_k_keeps_best_per_row():
+    block = sp.coo_matrix(np.array([[0.1, 0.5, 0.3], [0.2, 0.0, 0.2]]))
+
+    row, col, score = top_k(block, 2)
+
+    assert row.tolist() == [0, 0, 1, 1]
+    assert col.tolist() == [1, 2, 0, 2]
+    assert np.allclose(score, [0.5, 0.3, 0.2, 0.2])
+
+
+def test_similarity_graph_combines_signals():
+    graph = SimilarityGraph(
+        artist_ids=[1, 2, 3, 4],
+        genres=[["pop", "dance"], ["pop", "dance"], ["pop", "rock"], ["jazz"]],
+        likes=[(10, 1), (10, 3), (11, 1), (11, 3), (12, 99)],
+        credits=[(1, "a"), (2, "b"), (3, "c"), (4, "d"), (4, "a")],
+        weights=(0.5, 0.3, 0.2)
+    )
+
+    rows, neighbors, scores = graph.neighbors(np.array([0]), k=10)
+
+    assert rows.tolist() == [0, 0, 0]
+    # Same genres, shared fans with one genre in common, then a featuring only
+    assert neighbors.tolist() == [1, 2, 3]
+    assert np.allclose(scores, [0.5, 0.5 / 3 + 0.3, 0.2 / np.sqrt(2)])
+
+
+@pytest.mark.asyncio
+async def test_related_artists_fall_back_to_genres():
+    manager = AsyncMock()
+    manager.get_similar_artists.return_value = None
+    manager.get_artist_by_genres.return_value = [{"genius_id": 2, "score": 0.5}]
+
+    response = await get_related_artists(1, limit=20, offset=0, manager=manager)
+
+    assert response == {"success": True, "artists": [{"genius_id": 2, "score": 0.5}]}
+    manager.get_artist_by_genres.assert_awaited_once_with(artist_id=1, limit=20, offset=0)
+
+
+@pytest.mark.asyncio
+async def test_related_artists_prefer_precomputed_neighbors():
+    manager = AsyncMock()
+    manager.get_similar_artists.return_value = []
+
+    response = await get_related_artists(1, limit=20, offset=40, manager=manager)
+
+    # An empty page past the last neighbor isn't a reason to rank by genres
+    assert response == {"success": True, "artists": []}
+    manager.get_artist_by_genres.assert_not_awaited()
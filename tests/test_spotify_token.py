@@ -0,0 +1,57 @@
+import time
+import pytest
+import asyncio
+
+from unittest.mock import AsyncMock
+from core.single_flight import SingleFlight
+from services.applications.spotify_token import SpotifyTokenManager
+
+
+def token_manager(redis_client=None) -> SpotifyTokenManager:
+    tokens = SpotifyTokenManager(session=None, client_id="id", client_secret="secret", refresh_token=None,
+                                 redis_client=redis_client, refresh_margin=60)
+    calls = 0
+
+    async def request_token():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return f"token-{calls}", 3600
+
+    tokens._request_token = request_token
+    return tokens
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_refresh():
+    tokens = token_manager()
+
+    results = await asyncio.gather(*(tokens.get_token() for _ in range(10)))
+
+    assert results == ["token-1"] * 10
+    assert await tokens.get_token() == "token-1"
+
+
+@pytest.mark.asyncio
+async def test_refreshes_ahead_of_expiry_and_after_invalidation():
+    tokens = token_manager()
+    assert await tokens.get_token() == "token-1"
+
+    # Within the margin the token is replaced before Spotify would reject it
+    tokens._expires_at = time.time() + 30
+    assert await tokens.get_token() == "token-2"
+
+    await tokens.invalidate("token-2")
+    assert await tokens.get_token() == "token-3"
+
+
+@pytest.mark.asyncio
+async def test_token_shared_by_another_worker_is_used():
+    redis_client = AsyncMock()
+    redis_client.get.return_value = f"{time.time() + 3600}|shared"
+    tokens = token_manager(redis_client)
+    # The Redis lock is DistributedSingleFlight's business, coalesce in-process only here
+    tokens._flight = SingleFlight()
+
+    assert await tokens.get_token() == "shared"
+    redis_client.set.assert_not_awaited()
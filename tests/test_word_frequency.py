@@ -0,0 +1,28 @@
+from collections import Counter
+from services.word_frequency import tokenize, detect_language, count_words, diff_word_counts
+
+
+def test_tokenize_skips_section_headers():
+    text = "[Chorus: Artist]\nDon’t stop me now, 2 times!\n[Verse 1]\nL'amour"
+
+    assert tokenize(text) == ["don't", "stop", "me", "now", "times", "l'amour"]
+
+
+def test_count_words_drops_stopwords_and_fillers():
+    text = "Oh yeah, I love the night, the night is young and I love you"
+
+    assert count_words(text) == Counter({"love": 2, "night": 2, "young": 1})
+
+
+def test_count_words_detects_language():
+    text = "Y yo te quiero con el corazón, el corazón es tuyo"
+
+    assert detect_language(tokenize(text)) == "es"
+    assert count_words(text) == Counter({"corazón": 2, "quiero": 1, "tuyo": 1})
+
+
+def test_diff_word_counts():
+    delta = diff_word_counts("love love night", "love night night dance")
+
+    assert delta == Counter({"love": -1, "night": 1, "dance": 1})
+    assert diff_word_counts(None, "love") == Counter({"love": 1})